@@ -8,9 +8,34 @@ import json
 
 import requests
 from requests.auth import HTTPDigestAuth
+from urllib3.util import retry
 
 PROJECT_SITE = "https://review.openstack.org/changes/"
 
+# NOTE: This script runs in its own virtualenv without goal_tools
+# installed, so it cannot use goal_tools.apis.Client. Use the same
+# pooled session and retry policy here instead.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+TIMEOUT = 60
+
+
+def build_session(pool_size=4, retries=3, backoff_factor=0.5):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry.Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET']),
+            raise_on_status=False,
+        ),
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 
 def _parse_content(resp, debug=False):
     # slice out the "safety characters"
@@ -38,7 +63,7 @@ def build_auth(user, password):
     return HTTPDigestAuth(user, password)
 
 
-def fetch_data(auth, url, debug=False):
+def fetch_data(session, auth, url, debug=False):
     start = None
     more_changes = True
     response = []
@@ -47,7 +72,7 @@ def fetch_data(auth, url, debug=False):
         if start:
             to_fetch = url + '&start={}'.format(start)
         print('fetching {}'.format(to_fetch))
-        resp = requests.get(to_fetch, auth=auth)
+        resp = session.get(to_fetch, auth=auth, timeout=TIMEOUT)
         content = _parse_content(resp, debug)
         response.extend(content)
         try:
@@ -68,7 +93,7 @@ auth = build_auth(user, password)
 query = "q=topic:%s" % topic
 url = "%s?%s" % (PROJECT_SITE, query)
 
-relevant = fetch_data(auth, url)
+relevant = fetch_data(build_session(), auth, url)
 print('Found {} reviews'.format(len(relevant)))
 for review in relevant:
     if review['status'] == 'ABANDONED':
@@ -10,17 +10,188 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import contextlib
 import json
 import logging
-
-import requests
+import threading
+import urllib.parse
 
 LOG = logging.getLogger(__name__)
 
+# Defaults for the shared client.
+POOL_SIZE = 10
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+TIMEOUT = 60
+# Response codes that indicate the request may work if tried again.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class Client:
+    """HTTP client using pooled keep-alive connections
+
+    The connections to each server are kept open and reused between
+    requests. GET requests failing with a connection error or one of
+    the RETRY_STATUSES are retried with an exponential backoff, and
+    honor any Retry-After header from the server.
+
+    :param pool_size: Number of connections to keep open per host.
+    :type pool_size: int
+    :param retries: Number of times to retry a failed request.
+    :type retries: int
+    :param backoff_factor: Base delay in seconds between retries.
+    :type backoff_factor: float
+    :param timeout: Default timeout in seconds for a request.
+    :type timeout: float
+    :param host_timeouts: Timeouts for specific hosts.
+    :type host_timeouts: dict(str, float)
+
+    """
+
+    def __init__(self, pool_size=POOL_SIZE, retries=RETRIES,
+                 backoff_factor=BACKOFF_FACTOR, timeout=TIMEOUT,
+                 host_timeouts=None):
+        self._pool_size = pool_size
+        self._retries = retries
+        self._backoff_factor = backoff_factor
+        self._session_obj = None
+        self._timeout = timeout
+        self._host_timeouts = {}
+        for host, host_timeout in (host_timeouts or {}).items():
+            self.set_host_timeout(host, host_timeout)
+        # Semaphores limiting the number of simultaneous requests to
+        # a host, keyed by the network location of the server.
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    @property
+    def _session(self):
+        # requests is slow to import, so wait until the first request
+        # to set up the session.
+        if self._session_obj is None:
+            with self._lock:
+                if self._session_obj is None:
+                    self._session_obj = self._make_session()
+        return self._session_obj
+
+    def _make_session(self):
+        import requests
+        from urllib3.util import retry
+
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self._pool_size,
+            pool_maxsize=self._pool_size,
+            max_retries=retry.Retry(
+                total=self._retries,
+                backoff_factor=self._backoff_factor,
+                status_forcelist=RETRY_STATUSES,
+                allowed_methods=frozenset(['GET', 'HEAD']),
+                respect_retry_after_header=True,
+                # Give the caller the last response instead of an
+                # exception, so the error can be reported with the
+                # body of the response.
+                raise_on_status=False,
+            ),
+        )
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+
+    @staticmethod
+    def _host(url):
+        return urllib.parse.urlparse(url).netloc or url
+
+    def set_host_timeout(self, host, timeout):
+        """Set the timeout for requests sent to a host.
+
+        :param host: The network location of the server, or a URL on it.
+        :type host: str
+        :param timeout: The timeout in seconds.
+        :type timeout: float
+
+        """
+        self._host_timeouts[self._host(host)] = timeout
+
+    def set_host_limit(self, host, limit):
+        """Limit the number of concurrent requests sent to a host.
+
+        :param host: The network location of the server, or a URL on it.
+        :type host: str
+        :param limit: The maximum number of requests in flight at once.
+        :type limit: int
+
+        """
+        with self._lock:
+            self._host_limits[self._host(host)] = threading.BoundedSemaphore(
+                limit)
 
-def requester(url, params={}, headers={}):
+    def _host_slot(self, url):
+        "Return a context manager holding a request slot for the host."
+        with self._lock:
+            limit = self._host_limits.get(self._host(url))
+        if limit is None:
+            return contextlib.nullcontext()
+        return limit
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        """Send a GET request.
+
+        Extra keyword arguments are passed to requests.Session.get().
+
+        :param url: The URL to get.
+        :type url: str
+        :param params: Additional parameters to provide.
+        :type params: dict(str, str)
+        :param headers: Additional headers to set.
+        :type headers: dict(str, str)
+
+        """
+        kwargs.setdefault(
+            'timeout',
+            self._host_timeouts.get(self._host(url), self._timeout),
+        )
+        with self._host_slot(url):
+            return self._session.get(
+                url, params=params, headers=headers, **kwargs)
+
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def configure(**kwargs):
+    """Replace the shared client with one using the given settings.
+
+    The arguments are the same as for Client.
+
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        _CLIENT = Client(**kwargs)
+    return _CLIENT
+
+
+def get_client():
+    "Return the client shared by everything in the process."
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            _CLIENT = Client()
+        return _CLIENT
+
+
+def set_host_limit(host, limit):
+    "Limit the number of concurrent requests the shared client sends."
+    get_client().set_host_limit(host, limit)
+
+
+def requester(url, params={}, headers={}, **kwargs):
     """A requests wrapper to consistently retry HTTPS queries
 
+    All requests go through the shared client, so connections are
+    reused between calls.
+
     :param url: The URL to get.
     :type url: str
     :param params: Additional parameters to provide.
@@ -29,10 +200,7 @@ def requester(url, params={}, headers={}):
     :type params: dict(str, str)
 
     """
-    # Try up to 3 times
-    retry = requests.Session()
-    retry.mount("https://", requests.adapters.HTTPAdapter(max_retries=3))
-    return retry.get(url=url, params=params, headers=headers)
+    return get_client().get(url, params=params, headers=headers, **kwargs)
 
 
 def decode_json(raw):
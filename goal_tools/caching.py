@@ -10,50 +10,151 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import collections
 import logging
-import shelve
+import pickle
 
 LOG = logging.getLogger(__name__)
 
+# Number of writes to collect in one transaction before committing.
+BATCH_SIZE = 500
+
+SQL_CREATE = """
+create table if not exists cache (
+  kind text not null,
+  id text not null,
+  value blob not null,
+  primary key (kind, id)
+) without rowid
+"""
+
 
 class Cache:
     """Data cache with transparent key management
 
-    Keys passed to methods are expected to be tuples of strings but
-    are converted to something the underlying implementation can
-    store and retrieve.
+    Keys passed to methods are expected to be tuples of strings. The
+    first item is the kind of data being stored and the rest identify
+    the item, so they are stored in separate indexed columns of an
+    SQLite database.
 
     Values stored in the cache are pickled before being written and
     unpickled before being returned.
 
+    Writes are collected into transactions of batch_size items, so
+    call commit() or close() to ensure they are saved.
+
     """
 
-    def __init__(self, filename, preload=True):
-        self._shelf = shelve.open(filename)
-        self._memory = {}
-        if preload:
-            LOG.debug('loading cache into RAM')
-            for key in self._shelf:
-                self._memory[key] = self._shelf[key]
-            LOG.debug('loaded %d items from cache', len(self._memory))
-        self._data = collections.ChainMap(self._memory, self._shelf)
+    def __init__(self, filename, wal=True, batch_size=BATCH_SIZE):
+        import sqlite3
 
-    def __contains__(self, key):
-        return self._mk_key(key) in self._data
+        self._db = sqlite3.connect(filename)
+        if wal:
+            # Let readers in other processes work while we write.
+            self._db.execute('pragma journal_mode=wal')
+        self._db.execute(SQL_CREATE)
+        self._db.commit()
+        self._batch_size = batch_size
+        self._pending = 0
 
     def _mk_key(self, key):
-        return ':'.join(str(k) for k in key)
+        kind, *rest = key
+        return (str(kind), ':'.join(str(k) for k in rest))
+
+    def __contains__(self, key):
+        cursor = self._db.execute(
+            'select 1 from cache where kind = ? and id = ?',
+            self._mk_key(key),
+        )
+        return cursor.fetchone() is not None
 
     def __setitem__(self, key, value):
-        self._shelf[self._mk_key(key)] = value
+        self.update([(key, value)])
 
     def __getitem__(self, key):
-        return self._data[self._mk_key(key)]
+        cursor = self._db.execute(
+            'select value from cache where kind = ? and id = ?',
+            self._mk_key(key),
+        )
+        row = cursor.fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
 
     def __delitem__(self, key):
-        real_key = self._mk_key(key)
-        if real_key in self._shelf:
-            del self._shelf[real_key]
-        if real_key in self._memory:
-            del self._memory[real_key]
+        self._db.execute(
+            'delete from cache where kind = ? and id = ?',
+            self._mk_key(key),
+        )
+        self._record_writes(1)
+
+    def update(self, items):
+        """Store several values.
+
+        :param items: Iterable of (key, value) pairs.
+
+        """
+        rows = [
+            self._mk_key(key) + (pickle.dumps(value, pickle.HIGHEST_PROTOCOL),)
+            for key, value in items
+        ]
+        self._db.executemany(
+            'insert or replace into cache (kind, id, value) '
+            'values (?, ?, ?)',
+            rows,
+        )
+        self._record_writes(len(rows))
+
+    def _record_writes(self, n):
+        self._pending += n
+        if self._pending >= self._batch_size:
+            self.commit()
+
+    def commit(self):
+        "Save any pending writes."
+        if self._pending:
+            LOG.debug('committing %d cache changes', self._pending)
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        "Save any pending writes and close the database."
+        self.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def migrate_shelve(filename, cache):
+    """Copy the contents of an old shelve-based cache into cache.
+
+    The shelve cache flattened the key tuples into strings like
+    'review:12345', so they are split apart again on the first colon.
+
+    :param filename: Name of the shelve file.
+    :type filename: str
+    :param cache: The destination.
+    :type cache: Cache
+    :returns: The number of items copied.
+
+    """
+    import shelve
+
+    count = 0
+    with shelve.open(filename, flag='r') as shelf:
+        batch = []
+        for key in shelf:
+            kind, _, id = key.partition(':')
+            batch.append(((kind, id), shelf[key]))
+            if len(batch) >= BATCH_SIZE:
+                cache.update(batch)
+                count += len(batch)
+                batch = []
+        cache.update(batch)
+        count += len(batch)
+    cache.commit()
+    LOG.debug('migrated %d items from %s', count, filename)
+    return count
@@ -10,9 +10,11 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import bisect
 import datetime
 import functools
 import logging
+import time
 
 from goal_tools import apis
 
@@ -21,6 +23,20 @@ LOG = logging.getLogger(__name__)
 # The OpenStack foundation member directory lookup API endpoint
 MEMBER_LOOKUP_URL = 'https://openstackid-resources.openstack.org/'
 
+# How many email addresses to combine into one lookup request.
+BATCH_SIZE = 100
+
+# How long to remember that an email address does not belong to a
+# member before asking again, in seconds.
+NEGATIVE_TTL = 7 * 24 * 60 * 60
+
+# Key in the cached value marking an address as not found, holding
+# the time of the lookup.
+_NOT_FOUND = '_not_found_at'
+
+# Fields of the member data that may hold an email address.
+_EMAIL_FIELDS = ('email', 'second_email', 'third_email')
+
 
 class Affiliation:
     "A Foundation member relationship to an employer"
@@ -103,43 +119,200 @@ class Member:
             if affiliation.is_current:
                 return affiliation
 
+    @functools.cached_property
+    def _affiliation_index(self):
+        """Compile the affiliations into a lookup table by date.
+
+        Returns a sorted list of date ordinals where the answer to
+        find_affiliation() may change and a list with one more item
+        holding the answer before the first boundary and from each
+        boundary until the next.
+
+        """
+        # Each affiliation covers an inclusive range of days, with
+        # None for an open end, following Affiliation.active().
+        intervals = []
+        for affiliation in self.affiliations:
+            start, end = affiliation.start_date, affiliation.end_date
+            intervals.append((
+                affiliation,
+                start.date().toordinal() if start else None,
+                end.date().toordinal() if end else None,
+            ))
+        bounds = sorted(set(
+            b
+            for affiliation, start, end in intervals
+            for b in (start, end + 1 if end is not None else None)
+            if b is not None
+        ))
+
+        def find(day):
+            # Later affiliations take precedence.
+            for affiliation, start, end in reversed(intervals):
+                if start is not None and start > day:
+                    continue
+                if end is not None and end < day:
+                    continue
+                return affiliation
+            return None
+
+        answers = [find(bounds[0] - 1 if bounds else 0)]
+        answers.extend(find(b) for b in bounds)
+        return (bounds, answers)
+
     def find_affiliation(self, when):
-        candidates = [
-            affiliation
-            for affiliation in self.affiliations
-            if affiliation.active(when)
-        ]
-        if candidates:
-            return candidates[-1]
-        return None
+        """Return the affiliation active on the date of when.
 
+        If more than one is active, the last one listed wins.
 
-def lookup_member(email):
-    "A requests wrapper to querying the OSF member directory API"
-    # URL pattern for querying foundation members by E-mail address
-    LOG.debug('looking up %s', email)
+        :param when: The date to check.
+        :type when: datetime.datetime
+
+        """
+        bounds, answers = self._affiliation_index
+        return answers[bisect.bisect_right(bounds, when.date().toordinal())]
+
+
+def _query_members(emails):
+    "Return the member records matching any of the email addresses."
     raw = apis.requester(
         MEMBER_LOOKUP_URL + '/api/public/v1/members',
         params={
             'filter[]': [
                 'group_slug==foundation-members',
-                'email==' + email,
+                # A comma separated list of conditions in one filter
+                # matches any of them.
+                ','.join('email==' + e for e in emails),
             ],
             'expand': 'all_affiliations',
+            'per_page': len(emails),
         },
         headers={'Accept': 'application/json'},
     )
     decoded = apis.decode_json(raw)
+    return decoded.get('data') or []
+
+
+def lookup_member(email):
+    "A requests wrapper to querying the OSF member directory API"
+    # URL pattern for querying foundation members by E-mail address
+    LOG.debug('looking up %s', email)
     try:
-        return decoded['data'][0]
-    except (KeyError, IndexError):
+        return _query_members([email])[0]
+    except IndexError:
         return None
 
 
+def lookup_members(emails):
+    """Look up several members, combining them into few requests.
+
+    Returns a dict mapping each email address to the member data, or
+    None if it does not belong to a member.
+
+    A batch with no matches settles all of its addresses in one
+    request. Records that include their email address are matched
+    directly. Otherwise the batch is split in half until the records
+    can be matched to the single address they were found for.
+
+    :param emails: Email addresses to look for.
+    :type emails: list(str)
+
+    """
+    results = {}
+    batches = [
+        list(emails[i:i + BATCH_SIZE])
+        for i in range(0, len(emails), BATCH_SIZE)
+    ]
+    while batches:
+        batch = batches.pop()
+        LOG.debug('looking up %d members', len(batch))
+        found = _query_members(batch)
+        if not found:
+            results.update((e, None) for e in batch)
+            continue
+        if len(batch) == 1:
+            results[batch[0]] = found[0]
+            continue
+        wanted = {e.lower(): e for e in batch}
+        unmatched = False
+        for data in found:
+            for field in _EMAIL_FIELDS:
+                email = wanted.pop((data.get(field) or '').lower(), None)
+                if email:
+                    results[email] = data
+                    break
+            else:
+                unmatched = True
+        if not unmatched:
+            results.update((e, None) for e in wanted.values())
+            continue
+        remaining = list(wanted.values())
+        if len(found) * 4 >= len(batch):
+            # Most of the addresses belong to members, so splitting
+            # the batch would take more requests than asking for
+            # each address on its own.
+            batches.extend([e] for e in remaining)
+        elif remaining:
+            half = len(remaining) // 2 or 1
+            batches.append(remaining[:half])
+            if remaining[half:]:
+                batches.append(remaining[half:])
+    return results
+
+
 class MemberFactory:
+    """Look up members, remembering the results in the cache.
+
+    Addresses that are not found are cached too, and looked up again
+    after negative_ttl seconds in case they have joined.
+
+    """
 
-    def __init__(self, cache):
+    def __init__(self, cache, negative_ttl=NEGATIVE_TTL):
         self._cache = cache
+        self._negative_ttl = negative_ttl
+
+    def _get_cached(self, email):
+        """Return the cached data for the address.
+
+        Returns a tuple with a boolean indicating whether the cached
+        result can be used, and the member data or None.
+
+        """
+        key = ('member', email)
+        if key not in self._cache:
+            return (False, None)
+        data = self._cache[key]
+        checked = data.get(_NOT_FOUND)
+        if checked is None:
+            return (True, data)
+        if time.time() - checked < self._negative_ttl:
+            return (True, None)
+        LOG.debug('%s not found at last check, trying again', email)
+        return (False, None)
+
+    def _save(self, email, data):
+        if data:
+            self._cache[('member', email)] = data
+        else:
+            self._cache[('member', email)] = {_NOT_FOUND: time.time()}
+
+    def prefetch(self, emails):
+        """Look up the members not already in the cache, in batches.
+
+        :param emails: Email addresses that will be passed to fetch().
+        :type emails: iterable(str)
+
+        """
+        to_lookup = sorted(set(
+            e for e in emails
+            if not self._get_cached(e)[0]
+        ))
+        if not to_lookup:
+            return
+        LOG.debug('prefetching %d members', len(to_lookup))
+        for email, data in lookup_members(to_lookup).items():
+            self._save(email, data)
 
     @functools.lru_cache(maxsize=1024)
     def fetch(self, email):
@@ -147,18 +320,14 @@ class MemberFactory:
 
         :param email: Email address of the member to look for.
         :type email: str
-        :param cache: Storage for repeated lookups.
-        :type cache: goal_tools.cache.Cache
 
         """
-        key = ('member', email)
-        if key in self._cache:
+        usable, data = self._get_cached(email)
+        if usable:
             LOG.debug('found %s cached', email)
-            data = self._cache[key]
         else:
             data = lookup_member(email)
-            if data:
-                self._cache[key] = data
+            self._save(email, data)
         if data:
             return Member(email, data)
         return None
@@ -11,9 +11,13 @@
 # under the License.
 
 import collections
+import concurrent.futures
 import datetime
 import fileinput
+import functools
+import itertools
 import logging
+import re
 import urllib.parse
 
 from goal_tools import apis
@@ -32,6 +36,39 @@ QUERY_OPTIONS = [
     'DETAILED_LABELS',
 ]
 
+# Named sets of options to request, from the least to the most
+# detail. Gerrit always includes the change number, project, branch,
+# status, subject and timestamps.
+QUERY_PROFILES = collections.OrderedDict([
+    ('ids-only', []),
+    # Enough to see the votes and who cast them.
+    ('labels', ['LABELS', 'DETAILED_LABELS', 'DETAILED_ACCOUNTS']),
+    # Enough to find all of the participants in a review.
+    ('full', QUERY_OPTIONS),
+])
+
+# Key in the cached change data recording the profile it was fetched
+# with. Entries cached before profiles existed were fetched with all
+# of the options.
+PROFILE_KEY = '_query_profile'
+
+# How many reviews to request ahead of the consumer, per worker, when
+# fetching reviews concurrently.
+PREFETCH_FACTOR = 4
+
+# How many reviews not found in the cache to ask for in one query
+# when fetching several.
+BULK_SIZE = 50
+
+# How many time windows to split a query into, per worker, when
+# running it concurrently. Changes are not spread evenly over time,
+# so more slices than workers keeps them all busy.
+SLICES_PER_WORKER = 4
+
+_TIME_OPERATOR = re.compile(
+    r'(?<![\w-])(after|since|before|until):(?:"([^"]*)"|(\S+))'
+)
+
 
 def parse_review_id(line):
     parsed = urllib.parse.urlparse(line)
@@ -74,13 +111,97 @@ def query_gerrit(method, params={}):
     return apis.decode_json(raw)
 
 
+def updated_since(timestamp):
+    """Return a query clause matching changes updated since timestamp.
+
+    Gerrit treats the time as inclusive, so the changes updated at
+    exactly that time are matched again.
+
+    :param timestamp: A value from the 'updated' field of a change.
+    :type timestamp: str
+
+    """
+    # Gerrit reports times in UTC, with nanoseconds we do not need.
+    return 'after:"{} +0000"'.format(timestamp.partition('.')[0])
+
+
+def query_time_range(query_string):
+    """Return the earliest and latest times the query can match.
+
+    Look for the after:/since: and before:/until: operators and
+    return a tuple of datetime.datetime instances, using None for a
+    bound that is not given or cannot be parsed.
+
+    """
+    start = end = None
+    for op, quoted, bare in _TIME_OPERATOR.findall(query_string):
+        value = quoted or bare
+        try:
+            # Ignore any time zone offset, the bounds only need to be
+            # approximate.
+            when = datetime.datetime.fromisoformat(value.split(' +')[0])
+        except ValueError:
+            LOG.debug('could not parse time %r', value)
+            continue
+        if op in ('after', 'since'):
+            start = when if start is None else max(start, when)
+        else:
+            end = when if end is None else min(end, when)
+    return (start, end)
+
+
+def split_query(query_string, slices, now=None):
+    """Split a query into several covering consecutive time windows.
+
+    The first window has no lower bound and the last has no upper
+    bound, so together they match everything the original query
+    does. Gerrit treats the bounds as inclusive, so a change updated
+    exactly on a boundary may be matched by two windows.
+
+    Returns a list of query strings, newest window first to match
+    gerrit's ordering, or only the original query if it does not
+    have a lower time bound.
+
+    """
+    start, end = query_time_range(query_string)
+    if start is None or slices <= 1:
+        return [query_string]
+    if end is None:
+        end = now or datetime.datetime.utcnow()
+    if end <= start:
+        return [query_string]
+    step = (end - start) / slices
+    bounds = [
+        (start + step * i).strftime('%Y-%m-%d %H:%M:%S')
+        for i in range(1, slices)
+    ]
+    queries = []
+    for i in range(slices):
+        clauses = ['({})'.format(query_string)]
+        if i > 0:
+            clauses.append('after:"{} +0000"'.format(bounds[i - 1]))
+        if i < slices - 1:
+            clauses.append('before:"{} +0000"'.format(bounds[i]))
+        queries.append(' '.join(clauses))
+    queries.reverse()
+    return queries
+
+
+@functools.lru_cache(maxsize=65536)
+def _parse_timestamp(s):
+    # Gerrit timestamps look like "2018-04-10 06:07:47.000000000".
+    # Ignore the trailing decimal seconds, which have more digits
+    # than datetime supports.
+    return datetime.datetime.fromisoformat(s.partition('.')[0])
+
+
 def _to_datetime(s):
     "Convert a string to a datetime.datetime instance"
-    # Ignore the trailing decimal seconds.
     if s is None:
         return None
-    s = s.rpartition('.')[0]
-    return datetime.datetime.strptime(s, '%Y-%m-%d %H:%M:%S')
+    # The same timestamps show up for the owner and first uploader,
+    # and for votes cast together, so remember recent ones.
+    return _parse_timestamp(s)
 
 
 Participant = collections.namedtuple(
@@ -102,14 +223,19 @@ class Review:
     def raw_change(self):
         return self._data
 
-    @property
+    @functools.cached_property
     def url(self):
         return GERRIT_API_URL + str(self._id) + '/'
 
-    @property
+    @functools.cached_property
     def created(self):
         return _to_datetime(self._data.get('created'))
 
+    @property
+    def updated(self):
+        "The raw timestamp of the last update, for comparing changes."
+        return self._data.get('updated')
+
     @property
     def is_merged(self):
         return self._data.get('status') == 'MERGED'
@@ -130,7 +256,7 @@ class Review:
 
     @property
     def owner(self):
-        owner = self._data.get('owner')
+        owner = self._data.get('owner', {})
         if 'email' not in owner:
             owner['email'] = owner.get('email', 'no-reply@openstack.org')
         return Participant(
@@ -222,28 +348,306 @@ class Review:
             )
 
 
-def cache_review(review_id, data, cache):
+class CompactReview:
+    """The parts of a review needed to count its contributors.
+
+    Holds the participants worked out from the full change data,
+    instead of the data itself, so many reviews can be kept in
+    memory or in the cache at once. The properties match Review,
+    except that raw_change is not available.
+
+    """
+
+    __slots__ = ('id', 'project', 'branch', 'status', 'created',
+                 'updated', 'profile', '_participants', '_plus_ones')
+
+    def __init__(self, id, project, branch, status, created, updated,
+                 profile, participants, plus_ones):
+        self.id = id
+        self.project = project
+        self.branch = branch
+        self.status = status
+        self.created = created
+        self.updated = updated
+        self.profile = profile
+        self._participants = participants
+        self._plus_ones = plus_ones
+
+    @classmethod
+    def from_change(cls, review_id, data, profile=None):
+        "Build the record from data returned by query_gerrit."
+        review = Review(review_id, data)
+        return cls(
+            review_id,
+            review.project,
+            review.branch,
+            data.get('status'),
+            review.created,
+            review.updated,
+            profile or data.get(PROFILE_KEY, 'full'),
+            tuple(review.participants),
+            tuple(review.plus_ones),
+        )
+
+    def __reduce__(self):
+        return (CompactReview, tuple(getattr(self, n) for n in self.__slots__))
+
+    def __repr__(self):
+        return '{}({})'.format(
+            type(self).__name__,
+            ', '.join(
+                '{}={!r}'.format(n.lstrip('_'), getattr(self, n))
+                for n in self.__slots__
+            ),
+        )
+
+    def with_id(self, review_id):
+        "Return the record using review_id as its id."
+        if self.id == review_id:
+            return self
+        values = [getattr(self, n) for n in self.__slots__]
+        values[0] = review_id
+        return CompactReview(*values)
+
+    @property
+    def raw_change(self):
+        return None
+
+    @property
+    def url(self):
+        return GERRIT_API_URL + str(self.id) + '/'
+
+    @property
+    def is_merged(self):
+        return self.status == 'MERGED'
+
+    @property
+    def participants(self):
+        return iter(self._participants)
+
+    @property
+    def owner(self):
+        return self._participants[0]
+
+    @property
+    def reviewers(self):
+        return (p for p in self._participants
+                if p.role in ('reviewer', 'approver'))
+
+    @property
+    def uploaders(self):
+        return (p for p in self._participants if p.role == 'uploader')
+
+    @property
+    def plus_ones(self):
+        return iter(self._plus_ones)
+
+
+def _profile_rank(profile):
+    return list(QUERY_PROFILES).index(profile)
+
+
+def has_profile(data, profile):
+    "Return whether change data includes everything in profile."
+    if isinstance(data, CompactReview):
+        fetched = data.profile
+    else:
+        fetched = data.get(PROFILE_KEY, 'full')
+    return _profile_rank(fetched) >= _profile_rank(profile)
+
+
+def cache_review(review_id, data, cache, profile='full', keep_raw=False):
     """Add a review to the cache.
 
     Review data is only cached if the review is MERGED because
-    otherwise it is more likely to change.
+    otherwise it is more likely to change. The profile the data was
+    fetched with is recorded, and an entry with more detail is never
+    replaced by one with less.
+
+    Unless keep_raw is true, only the CompactReview is stored.
 
     :param review_id: Review ID of the review to look for.
     :type review_id: str
-    :param data: Data structure returned by query_gerrit
-    :type data: dict
+    :param data: Data structure returned by query_gerrit, or a
+        CompactReview built from it.
+    :type data: dict or CompactReview
     :param cache: Storage for repeated lookups.
     :type cache: goal_tools.cache.Cache
+    :param profile: Name of the query profile used to fetch the data.
+    :type profile: str
+    :param keep_raw: Store all of the data returned by query_gerrit.
+    :type keep_raw: bool
+
+    """
+    if isinstance(data, CompactReview):
+        if not data.is_merged:
+            return
+    else:
+        if data.get('status') != 'MERGED':
+            return
+        data[PROFILE_KEY] = profile
+        if not keep_raw:
+            data = CompactReview.from_change(review_id, data, profile)
+    key = ('review', str(review_id))
+    if profile != 'full' and key in cache:
+        if has_profile(cache[key], profile):
+            return
+    cache[key] = data
+
+
+def _fetch_review_data(review_id, profile='full'):
+    "Return the details of one review from the API."
+    return query_gerrit(
+        'changes/' + str(review_id) + '/detail',
+        params={
+            'o': QUERY_PROFILES[profile],
+        },
+    )
+
+
+def _fetch_bulk(review_ids, profile='full'):
+    """Return the details of several reviews, by ID.
+
+    The reviews are requested with one query. Any the query does not
+    return, for example because they are given by Change-Id, are
+    fetched one at a time.
 
     """
-    if data.get('status') == 'MERGED':
-        cache[('review', str(review_id))] = data
+    query_string = ' OR '.join('change:{}'.format(r) for r in review_ids)
+    found = {
+        str(change['_number']): change
+        for change in query_changes(query_string, len(review_ids),
+                                    profile=profile)
+    }
+    results = {}
+    for review_id in review_ids:
+        data = found.get(str(review_id))
+        if data is None:
+            LOG.debug('%s not found by query, fetching it alone', review_id)
+            data = _fetch_review_data(review_id, profile)
+        results[review_id] = data
+    return results
+
+
+def query_changes(query_string, batch_size=200, workers=1,
+                  profile='full'):
+    """Generator for the raw data of changes matching the query.
+
+    When workers is more than 1 and the query has a lower time bound,
+    the query is split into time windows that are fetched
+    concurrently. The changes are still produced newest window first,
+    and changes matched by more than one window are only produced
+    once.
+
+    The profile names the entry in QUERY_PROFILES with the options
+    to request.
+
+    Nothing is cached, so this is safe to run in other threads.
+
+    """
+    if workers > 1:
+        queries = split_query(query_string, workers * SLICES_PER_WORKER)
+        if len(queries) > 1:
+            yield from _query_slices(queries, batch_size, workers, profile)
+            return
+        LOG.debug('cannot split query without a time range, '
+                  'running it serially')
+    offset = 0
+    while True:
+        changes = query_gerrit(
+            'changes/',
+            params={
+                'n': str(batch_size),
+                'start': offset,
+                'q': query_string,
+                'o': QUERY_PROFILES[profile],
+            },
+        )
+        LOG.debug('%d changes', len(changes))
+        yield from changes
+        if changes and changes[-1].get('_more_changes', False):
+            offset += batch_size
+        else:
+            break
+
+
+def _query_slices(queries, batch_size, workers, profile):
+    seen = set()
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                lambda q: list(query_changes(q, batch_size, profile=profile)),
+                q,
+            )
+            for q in queries
+        ]
+        for future in futures:
+            for change in future.result():
+                if change['_number'] in seen:
+                    continue
+                seen.add(change['_number'])
+                yield change
 
 
 class ReviewFactory:
+    """Look up reviews, using the cache when possible.
+
+    :param cache: Storage for repeated lookups.
+    :type cache: goal_tools.cache.Cache
+    :param profile: Name of the entry in QUERY_PROFILES with the
+        options to request. Cached reviews fetched with less detail
+        are fetched again.
+    :type profile: str
+    :param keep_raw: Produce Review instances holding all of the data
+        returned by the API, and cache that data, instead of using
+        CompactReview.
+    :type keep_raw: bool
+
+    """
 
-    def __init__(self, cache):
+    def __init__(self, cache, profile='full', keep_raw=False):
         self._cache = cache
+        self._profile = profile
+        self._keep_raw = keep_raw
+
+    def _from_cache(self, review_id, data):
+        # The cache key is the same for string and integer IDs, so
+        # report the one the caller asked for.
+        if isinstance(data, CompactReview):
+            return data.with_id(review_id)
+        return Review(review_id, data)
+
+    def add(self, review_id, data):
+        """Cache data fetched from the API and return its review.
+
+        :param review_id: Review ID of the review.
+        :type review_id: str
+        :param data: Data structure returned by query_gerrit
+        :type data: dict
+
+        """
+        data[PROFILE_KEY] = self._profile
+        if self._keep_raw:
+            review = Review(review_id, data)
+        else:
+            review = data = CompactReview.from_change(review_id, data)
+        cache_review(review_id, data, self._cache, self._profile,
+                     self._keep_raw)
+        return review
+
+    def _get_cached(self, review_id):
+        "Return the cached data for a review, if it has enough detail."
+        key = ('review', str(review_id))
+        if key not in self._cache:
+            return None
+        data = self._cache[key]
+        if not has_profile(data, self._profile):
+            LOG.debug('upgrading cached %s to %s',
+                      review_id, self._profile)
+            return None
+        LOG.debug('found %s cached', review_id)
+        return data
 
     def fetch(self, review_id):
         """Find the review in the cache or look it up in the API.
@@ -253,53 +657,236 @@ class ReviewFactory:
 
         :param review_id: Review ID of the review to look for.
         :type review_id: str
-        :param cache: Storage for repeated lookups.
-        :type cache: goal_tools.cache.Cache
 
         """
-        key = ('review', str(review_id))
-        if key in self._cache:
-            LOG.debug('found %s cached', review_id)
-            return Review(review_id, self._cache[key])
-        data = query_gerrit(
-            'changes/' + review_id + '/detail',
-            params={
-                'o': QUERY_OPTIONS,
-            },
+        data = self._get_cached(review_id)
+        if data is not None:
+            return self._from_cache(review_id, data)
+        return self.add(
+            review_id, _fetch_review_data(review_id, self._profile))
+
+    def fetch_many(self, review_ids, workers=1):
+        """Generator for the reviews with the given IDs, in order.
+
+        Reviews not found in the cache (only MERGED reviews are
+        stored there) are fetched from the API in groups of
+        BULK_SIZE, with one query per group. When workers is more
+        than 1, the groups are fetched by a pool of threads ahead of
+        the consumer of the generator.
+
+        The cache is only read and updated from the thread consuming
+        the generator, so it does not need to be thread-safe.
+
+        :param review_ids: Iterable of review IDs.
+        :type review_ids: iterable(str)
+        :param workers: Number of concurrent API requests.
+        :type workers: int
+
+        """
+        review_ids = iter(review_ids)
+
+        def next_chunk(submit):
+            # Look up the next group of reviews in the cache and start
+            # fetching the rest of them with one query.
+            chunk = list(itertools.islice(review_ids, BULK_SIZE))
+            if not chunk:
+                return None
+            cached = {}
+            for review_id in chunk:
+                data = self._get_cached(review_id)
+                if data is not None:
+                    cached[review_id] = data
+            missing = list(collections.OrderedDict.fromkeys(
+                r for r in chunk if r not in cached))
+            fetched = submit(_fetch_bulk, missing, self._profile) \
+                if missing else None
+            return (chunk, cached, fetched)
+
+        def reviews_in(chunk, cached, fetched):
+            for review_id in chunk:
+                if review_id in cached:
+                    yield self._from_cache(review_id, cached[review_id])
+                else:
+                    yield self.add(review_id, fetched[review_id])
+
+        if workers <= 1:
+            while True:
+                pending = next_chunk(lambda f, *args: f(*args))
+                if pending is None:
+                    return
+                yield from reviews_in(*pending)
+
+        # Bound the number of reviews held in memory waiting to be
+        # consumed so a long input list does not turn into a long
+        # queue of results.
+        window = max(workers * PREFETCH_FACTOR // 2, 2)
+        pending = collections.deque()
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=workers) as pool:
+
+            def fill():
+                while len(pending) < window:
+                    chunk = next_chunk(pool.submit)
+                    if chunk is None:
+                        return
+                    pending.append(chunk)
+
+            fill()
+            while pending:
+                chunk, cached, future = pending.popleft()
+                fetched = future.result() if future is not None else None
+                fill()
+                yield from reviews_in(chunk, cached, fetched)
+
+    def query(self, query_string, workers=1):
+        """Generator for changes matching the query criteria.
+
+        :param query_string: The gerrit query.
+        :type query_string: str
+        :param workers: Number of concurrent API requests. See
+            query_changes().
+        :type workers: int
+
+        """
+        changes = query_changes(
+            query_string,
+            workers=workers,
+            profile=self._profile,
+        )
+        for change in changes:
+            yield self.add(change['_number'], change)
+
+
+def is_open(change):
+    "Return whether the raw change data is for an open change."
+    return change.get('status') not in ('MERGED', 'ABANDONED')
+
+
+class ChangeStore:
+    """The changes matching a query, kept up to date incrementally.
+
+    The first time a query is used all of the matching changes are
+    fetched and cached, each under its own key. After that only the
+    changes updated since the newest one seen are fetched, and only
+    the ones that are new or different are written to the cache.
+
+    With only_open the first fetch is limited to open changes, and
+    the later ones look at all of the changes updated since the last
+    run so the ones that have been closed can be dropped.
+
+    A change that stops matching the query for any other reason, for
+    example because its topic is changed, is not noticed by the
+    incremental update. Pass refresh=True to fetch everything again.
+
+    :param cache: Storage for the changes.
+    :type cache: goal_tools.cache.Cache
+    :param query_string: The gerrit query.
+    :type query_string: str
+    :param profile: Name of the entry in QUERY_PROFILES with the
+        options to request.
+    :type profile: str
+    :param batch_size: Number of changes to request at a time.
+    :type batch_size: int
+    :param only_open: Keep only the open changes.
+    :type only_open: bool
+
+    """
+
+    def __init__(self, cache, query_string, profile='labels',
+                 batch_size=200, only_open=False):
+        self._cache = cache
+        self._query_string = query_string
+        self._profile = profile
+        self._batch_size = batch_size
+        self._only_open = only_open
+        self._scope = (profile, 'open' if only_open else 'all', query_string)
+
+    def _state_key(self):
+        return ('change-store-state',) + self._scope
+
+    def _change_key(self, number):
+        return ('change-store',) + self._scope + (str(number),)
+
+    def _load(self):
+        "Return the saved changes by number and the high-water mark."
+        try:
+            state = self._cache[self._state_key()]
+        except KeyError:
+            return (None, None)
+        try:
+            by_number = {
+                number: self._cache[self._change_key(number)]
+                for number in state['numbers']
+            }
+        except KeyError:
+            LOG.warning('saved changes for %r are incomplete, '
+                        'fetching them again', self._query_string)
+            return (None, state)
+        return (by_number, state)
+
+    def changes(self, refresh=False):
+        """Return the raw data for the matching changes.
+
+        The changes are sorted the way gerrit sorts them, most
+        recently updated first.
+
+        """
+        by_number, state = self._load()
+        high_water_mark = state['high_water_mark'] if state else None
+        old_numbers = set(state['numbers']) if state else set()
+
+        if refresh or by_number is None or not high_water_mark:
+            LOG.debug('fetching all changes for %r', self._query_string)
+            by_number = {}
+            high_water_mark = None
+            query_string = self._query_string
+            if self._only_open:
+                query_string = '({}) is:open'.format(query_string)
+        else:
+            LOG.debug('fetching changes for %r updated since %s',
+                      self._query_string, high_water_mark)
+            query_string = '({}) {}'.format(
+                self._query_string, updated_since(high_water_mark))
+
+        fetched = list(query_changes(query_string, self._batch_size,
+                                     profile=self._profile))
+        to_write = []
+        for change in fetched:
+            # The flag only describes the page it was returned on.
+            change.pop('_more_changes', None)
+            number = change['_number']
+            updated = change.get('updated')
+            if updated and (high_water_mark is None or
+                            updated > high_water_mark):
+                high_water_mark = updated
+            if self._only_open and not is_open(change):
+                by_number.pop(number, None)
+                continue
+            known = by_number.get(number)
+            # Gerrit includes the changes updated at exactly the
+            # high-water mark again, so skip the ones already saved.
+            if known is not None and known.get('updated') == updated:
+                continue
+            by_number[number] = change
+            to_write.append((self._change_key(number), change))
+        LOG.debug('fetched %d changes, %d new or updated, %d known',
+                  len(fetched), len(to_write), len(by_number))
+
+        if to_write:
+            self._cache.update(to_write)
+        numbers = set(by_number)
+        for number in old_numbers - numbers:
+            del self._cache[self._change_key(number)]
+        if (numbers != old_numbers or state is None or
+                high_water_mark != state['high_water_mark']):
+            self._cache[self._state_key()] = {
+                'numbers': sorted(numbers),
+                'high_water_mark': high_water_mark,
+            }
+
+        return sorted(
+            by_number.values(),
+            key=lambda c: (c.get('updated', ''), c['_number']),
+            reverse=True,
         )
-        response = Review(review_id, data)
-        cache_review(review_id, data, self._cache)
-        return response
-
-    def query(self, query_string):
-        "Generator for changes matching the query criteria."
-        batch_size = 200
-        offset = 0
-        while True:
-            changes = query_gerrit(
-                'changes/',
-                params={
-                    'n': str(batch_size),
-                    'start': offset,
-                    'q': query_string,
-                    'o': QUERY_OPTIONS,
-                },
-            )
-            LOG.debug('%d changes', len(changes))
-
-            for change in changes:
-                review = Review(
-                    change['_number'],
-                    change,
-                )
-                cache_review(
-                    review.id,
-                    review.raw_change,
-                    self._cache,
-                )
-                yield review
-
-            if changes and changes[-1].get('_more_changes', False):
-                offset += batch_size
-            else:
-                break
@@ -13,7 +13,8 @@
 # under the License.
 
 import bs4 as beautifulsoup
-import requests
+
+from goal_tools import apis
 
 _SITE_TITLE = '— OpenStack Technical Committee Governance Documents'
 
@@ -32,7 +33,7 @@ def _parse_goal_page(html):
 
 
 def get_info(url):
-    html = requests.get(url)
+    html = apis.requester(url)
     data = _parse_goal_page(html.text)
     data['url'] = url
     return data
@@ -14,15 +14,123 @@
 """
 
 import functools
+import hashlib
+import json
+import logging
+import os
+import pickle
 
-import yaml
+import appdirs
 
 from goal_tools import apis
+from goal_tools import utils
+from goal_tools import yamlutils
+
+LOG = logging.getLogger(__name__)
 
 PROJECTS_LIST = "http://git.openstack.org/cgit/openstack/governance/plain/reference/projects.yaml"  # noqa
 TC_LIST = "http://git.openstack.org/cgit/openstack/governance/plain/reference/technical-committee-repos.yaml"  # noqa
 SIGS_LIST = "http://git.openstack.org/cgit/openstack/governance/plain/reference/sigs-repos.yaml"  # noqa
 
+# Where copies of the governance data are kept between runs.
+CACHE_DIR = os.path.join(
+    appdirs.user_cache_dir('OSGoalTools', 'OpenStack'),
+    'governance',
+)
+
+# Change this when the format of the saved team data changes, so
+# old copies are not used.
+INDEX_VERSION = 1
+
+_settings = {
+    'cache_dir': CACHE_DIR,
+    'offline': False,
+}
+
+# Team data already loaded by this process, keyed by the source URLs.
+_loaded = {}
+
+
+def configure(cache_dir=CACHE_DIR, offline=False):
+    """Set where and how the governance data is cached.
+
+    :param cache_dir: Directory for the copies of the data, or None to
+        always download it.
+    :type cache_dir: str
+    :param offline: Use the copies without checking for updates.
+    :type offline: bool
+
+    """
+    _settings['cache_dir'] = cache_dir
+    _settings['offline'] = offline
+    _loaded.clear()
+
+
+class _Snapshot:
+    "A saved copy of one file, with what is needed to revalidate it."
+
+    def __init__(self, cache_dir, url):
+        self.url = url
+        base = os.path.join(
+            cache_dir,
+            hashlib.sha256(url.encode('utf-8')).hexdigest(),
+        )
+        self._text_file = base + '.yaml'
+        self._meta_file = base + '.json'
+        self.text = None
+        self.meta = {}
+        try:
+            with open(self._meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(self._text_file, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except (OSError, ValueError):
+            return
+        if meta.get('url') == url:
+            self.text = text
+            self.meta = meta
+
+    @property
+    def digest(self):
+        return self.meta.get('sha256')
+
+    def refresh(self):
+        "Download the file if it has changed since it was saved."
+        headers = {}
+        if self.text is not None:
+            if self.meta.get('etag'):
+                headers['If-None-Match'] = self.meta['etag']
+            if self.meta.get('last_modified'):
+                headers['If-Modified-Since'] = self.meta['last_modified']
+        try:
+            response = apis.requester(self.url, headers=headers)
+        except Exception as err:
+            if self.text is None:
+                raise
+            LOG.warning('could not check %s for updates, '
+                        'using saved copy: %s', self.url, err)
+            return
+        if response.status_code == 304:
+            LOG.debug('saved copy of %s is current', self.url)
+            return
+        if response.status_code != 200 and self.text is not None:
+            LOG.warning('could not check %s for updates (%s), '
+                        'using saved copy', self.url, response.status_code)
+            return
+        response.raise_for_status()
+        LOG.debug('saving new copy of %s', self.url)
+        self.text = response.text
+        self.meta = {
+            'url': self.url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': hashlib.sha256(
+                self.text.encode('utf-8')).hexdigest(),
+        }
+        utils.write_atomic(self._text_file, self.text.encode('utf-8'))
+        utils.write_atomic(self._meta_file,
+                           json.dumps(self.meta).encode('utf-8'))
+
 
 class Governance:
 
@@ -40,13 +148,62 @@ class Governance:
 
     def _get_team_data(self):
         "Return the parsed team data from the governance repository."
-        raw = apis.requester(self._url)
-        team_data = yaml.load(raw.text)
-        tc = apis.requester(self._tc_url)
-        tc_data = yaml.load(tc.text)
-        sigs = apis.requester(self._sigs_url)
-        sigs_data = yaml.load(sigs.text)
-        return self._organize_team_data(team_data, tc_data, sigs_data)
+        urls = (self._url, self._tc_url, self._sigs_url)
+        if urls not in _loaded:
+            cache_dir = _settings['cache_dir']
+            if cache_dir:
+                _loaded[urls] = self._load_team_data(cache_dir, urls)
+            else:
+                _loaded[urls] = self._organize_team_data(*(
+                    yamlutils.load(apis.requester(url).text)
+                    for url in urls
+                ))
+        return _loaded[urls]
+
+    def _load_team_data(self, cache_dir, urls):
+        """Return the team data using the saved copies in cache_dir.
+
+        The files are downloaded again only if the server reports
+        they have changed, and the organized team data is saved so it
+        does not have to be rebuilt from the YAML unless one of them
+        does.
+
+        """
+        os.makedirs(cache_dir, exist_ok=True)
+        snapshots = [_Snapshot(cache_dir, url) for url in urls]
+        for snapshot in snapshots:
+            if _settings['offline']:
+                if snapshot.text is None:
+                    raise RuntimeError(
+                        'no saved copy of {} to use offline'.format(
+                            snapshot.url))
+            else:
+                snapshot.refresh()
+
+        key = hashlib.sha256(
+            ' '.join(
+                [str(INDEX_VERSION)] + [s.digest for s in snapshots]
+            ).encode('utf-8')
+        ).hexdigest()
+        index_file = os.path.join(cache_dir, key + '.pickle')
+        try:
+            with open(index_file, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            LOG.warning('could not read %s, rebuilding it: %s',
+                        index_file, err)
+
+        team_data = self._organize_team_data(
+            *(yamlutils.load(s.text) for s in snapshots))
+        utils.write_atomic(index_file,
+                           pickle.dumps(team_data, pickle.HIGHEST_PROTOCOL))
+        # Remove the copies built from older data.
+        for name in os.listdir(cache_dir):
+            if name.endswith('.pickle') and name != key + '.pickle':
+                os.unlink(os.path.join(cache_dir, name))
+        return team_data
 
     @staticmethod
     def _organize_team_data(team_data, tc_data, sigs_data):
@@ -19,11 +19,11 @@ import os.path
 import warnings
 
 import appdirs
-import requests
-import yaml
 
+from goal_tools import apis
 from goal_tools import storyboard
 from goal_tools import goals
+from goal_tools import yamlutils
 
 _GOVERNANCE_PROJECT_NAME = 'openstack/governance'
 _STORY_URL_TEMPLATE = 'https://storyboard.openstack.org/#!/story/{}'
@@ -61,9 +61,9 @@ def _get_project_info(url):
     # First check to see if it's a local path we can read.
     if os.path.isfile(url):
         with open(url) as f:
-            return yaml.safe_load(f)
-    response = requests.get(url)
-    data = yaml.safe_load(response.text)
+            return yamlutils.load(f)
+    response = apis.requester(url)
+    data = yamlutils.load(response.text)
     return data
 
 
@@ -14,14 +14,18 @@ import functools
 import logging
 import pkgutil
 
-import yaml
+from goal_tools import yamlutils
 
 LOG = logging.getLogger(__name__)
 
-_ORG_DATA = yaml.safe_load(
-    pkgutil.get_data('goal_tools',
-                     'organizations.yaml').decode('utf-8')
-)
+
+@functools.lru_cache(maxsize=None)
+def _get_org_data():
+    # Only parse the packaged data when it is used.
+    return yamlutils.load(
+        pkgutil.get_data('goal_tools',
+                         'organizations.yaml').decode('utf-8')
+    )
 
 
 class Organizations:
@@ -43,7 +47,9 @@ class Organizations:
         'infra-root@openstack.org',
     ])
 
-    def __init__(self, data=_ORG_DATA):
+    def __init__(self, data=None):
+        if data is None:
+            data = _get_org_data()
         self._data = data
         self._reverse = {
             str(alias).lower(): entry['company_name']
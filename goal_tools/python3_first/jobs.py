@@ -3,6 +3,8 @@
 # Show the project settings for the repository that should be moved
 # into the tree at a given branch.
 
+import collections
+import concurrent.futures
 import configparser
 import copy
 import glob
@@ -13,9 +15,10 @@ import re
 
 from goal_tools import governance
 from goal_tools.python3_first import projectconfig_ruamellib
+from goal_tools.python3_first import zuulcache
 
 from cliff import command
-from ruamel.yaml import comments
+from cliff import lister
 
 LOG = logging.getLogger(__name__)
 
@@ -59,8 +62,10 @@ BRANCHES = [
     'master',
 ]
 
-DICT_TYPES = (dict, comments.CommentedMap)
-SEQ_TYPES = (list, comments.CommentedSeq)
+# ruamel.yaml's CommentedMap and CommentedSeq are subclasses of these,
+# so checking for them does not require importing ruamel.yaml.
+DICT_TYPES = (dict,)
+SEQ_TYPES = (list,)
 
 
 def branches_for_job(job_params):
@@ -213,6 +218,37 @@ def find_templates_to_extract(project, zuul_templates, zuul_jobs):
         del project['templates']
 
 
+def add_zuul_cache_option(parser):
+    parser.add_argument(
+        '--zuul-cache-dir',
+        default=zuulcache.CACHE_DIR,
+        help=('directory for the parsed zuul settings, '
+              'empty to parse them every time (defaults to %(default)s)'),
+    )
+
+
+def load_zuul_definitions(zuul_jobs_dir, cache_dir):
+    "Return the project templates and jobs by name."
+    zuul_templates_filename = os.path.join(
+        zuul_jobs_dir,
+        'zuul.d',
+        'project-templates.yaml',
+    )
+    LOG.debug('loading project templates from %s', zuul_templates_filename)
+    zuul_templates = zuulcache.load_templates(
+        zuul_templates_filename, cache_dir)
+
+    zuul_jobs_filename = os.path.join(
+        zuul_jobs_dir,
+        'zuul.d',
+        'jobs.yaml',
+    )
+    LOG.debug('loading jobs from %s', zuul_jobs_filename)
+    zuul_jobs = zuulcache.load_jobs(zuul_jobs_filename, cache_dir)
+
+    return (zuul_templates, zuul_jobs)
+
+
 class JobsExtract(command.Command):
     "show the project settings to extract for a repository"
 
@@ -228,6 +264,7 @@ class JobsExtract(command.Command):
             default='../openstack-zuul-jobs',
             help='the location of the openstack-zuul-jobs repo',
         )
+        add_zuul_cache_option(parser)
         parser.add_argument(
             'repo',
             help='the repository name',
@@ -249,44 +286,17 @@ class JobsExtract(command.Command):
             'projects.yaml',
         )
         LOG.debug('loading project settings from %s', project_filename)
-        with open(project_filename, 'r', encoding='utf-8') as f:
-            project_settings = yaml.load(f)
+        project_settings = zuulcache.ProjectSettings(
+            project_filename, parsed_args.zuul_cache_dir)
 
-        zuul_templates_filename = os.path.join(
-            parsed_args.openstack_zuul_jobs_dir,
-            'zuul.d',
-            'project-templates.yaml',
-        )
-        LOG.debug('loading project templates from %s', zuul_templates_filename)
-        with open(zuul_templates_filename, 'r', encoding='utf-8') as f:
-            zuul_templates_raw = yaml.load(f)
-        zuul_templates = {
-            pt['project-template']['name']: pt['project-template']
-            for pt in zuul_templates_raw
-            if 'project-template' in pt
-        }
-
-        zuul_jobs_filename = os.path.join(
+        zuul_templates, zuul_jobs = load_zuul_definitions(
             parsed_args.openstack_zuul_jobs_dir,
-            'zuul.d',
-            'jobs.yaml',
+            parsed_args.zuul_cache_dir,
         )
-        LOG.debug('loading jobs from %s', zuul_jobs_filename)
-        with open(zuul_jobs_filename, 'r', encoding='utf-8') as f:
-            zuul_jobs_raw = yaml.load(f)
-        zuul_jobs = {
-            job['job']['name']: job['job']
-            for job in zuul_jobs_raw
-            if 'job' in job
-        }
 
         LOG.debug('looking for settings for %s', parsed_args.repo)
-        for entry in project_settings:
-            if 'project' not in entry:
-                continue
-            if entry['project'].get('name') == parsed_args.repo:
-                break
-        else:
+        entry = project_settings.get(parsed_args.repo)
+        if entry is None:
             raise ValueError('Could not find {} in {}'.format(
                 parsed_args.repo, project_filename))
 
@@ -381,6 +391,8 @@ def merge_pipeline(name, in_tree, updates):
 
 
 def merge_project_settings(in_tree, updates):
+    from ruamel.yaml import comments
+
     itp = in_tree.setdefault('project', comments.CommentedMap())
     up = updates.get('project', comments.CommentedMap())
     LOG.debug('merging templates')
@@ -469,6 +481,7 @@ class JobsUpdate(command.Command):
             default='../openstack-zuul-jobs',
             help='the location of the openstack-zuul-jobs repo',
         )
+        add_zuul_cache_option(parser)
         parser.add_argument(
             '--default-zuul-file',
             default='.zuul.yaml',
@@ -486,132 +499,280 @@ class JobsUpdate(command.Command):
         return parser
 
     def take_action(self, parsed_args):
-        repo = None
-        branch = None
-
-        gitreview_filename = os.path.join(parsed_args.repo_dir, '.gitreview')
-        cp = configparser.ConfigParser()
-        were_read = cp.read(gitreview_filename)
-        if were_read:
-            LOG.debug('determining repository name from .gitreview')
-            try:
-                gerrit = cp['gerrit']
-            except KeyError:
-                pass
-            else:
-                repo = gerrit['project']
-                if repo.endswith('.git'):
-                    repo = repo[:-4]
-                branch = gerrit.get('defaultbranch', None)
-        else:
-            LOG.debug('could not read %s', gitreview_filename)
-
-        if not repo:
-            LOG.debug('guessing repository name from directory name')
-            repo = os.sep.join(
-                parsed_args.repo_dir.rstrip(os.sep).split(os.sep)[-2:]
-            )
-
-        # If we are given a branch on the command line, use it.
-        # Otherwise, try to use what we read from .gitreview.
-        # Fall back to using 'master'.
-        branch = parsed_args.branch or branch or 'master'
-
-        LOG.info('working on %s @ %s', repo, branch)
-
-        in_repo = find_project_settings_in_repo(parsed_args.repo_dir)
-        in_tree_file, in_tree_project, in_tree_settings = in_repo
-
-        yaml = projectconfig_ruamellib.YAML()
-
         project_filename = os.path.join(
             parsed_args.project_config_dir,
             'zuul.d',
             'projects.yaml',
         )
         LOG.debug('loading project settings from %s', project_filename)
-        with open(project_filename, 'r', encoding='utf-8') as f:
-            project_settings = yaml.load(f)
+        project_settings = zuulcache.ProjectSettings(
+            project_filename, parsed_args.zuul_cache_dir)
 
-        zuul_templates_filename = os.path.join(
+        zuul_templates, zuul_jobs = load_zuul_definitions(
             parsed_args.openstack_zuul_jobs_dir,
-            'zuul.d',
-            'project-templates.yaml',
+            parsed_args.zuul_cache_dir,
         )
-        LOG.debug('loading project templates from %s', zuul_templates_filename)
-        with open(zuul_templates_filename, 'r', encoding='utf-8') as f:
-            zuul_templates_raw = yaml.load(f)
-        zuul_templates = {
-            pt['project-template']['name']: pt['project-template']
-            for pt in zuul_templates_raw
-            if 'project-template' in pt
-        }
-
-        zuul_jobs_filename = os.path.join(
-            parsed_args.openstack_zuul_jobs_dir,
-            'zuul.d',
-            'jobs.yaml',
+
+        result = update_repo(
+            parsed_args.repo_dir,
+            project_settings,
+            zuul_templates,
+            zuul_jobs,
+            branch=parsed_args.branch,
+            default_zuul_file=parsed_args.default_zuul_file,
         )
-        LOG.debug('loading jobs from %s', zuul_jobs_filename)
-        with open(zuul_jobs_filename, 'r', encoding='utf-8') as f:
-            zuul_jobs_raw = yaml.load(f)
-        zuul_jobs = {
-            job['job']['name']: job['job']
-            for job in zuul_jobs_raw
-            if 'job' in job
-        }
-
-        LOG.debug('looking for settings for %s', repo)
-        for entry in project_settings:
-            if 'project' not in entry:
-                continue
-            if entry['project'].get('name') == repo:
-                break
-        else:
+        if result.status == 'not found':
             LOG.warning('Could not find {} in {}'.format(
-                repo, project_filename))
+                result.repo, project_filename))
+            return 2
+        if result.status == 'no settings':
             return 2
 
-        # Remove the items that need to stay in project-config.
-        find_templates_to_extract(entry['project'], zuul_templates, zuul_jobs)
 
-        filter_jobs_on_branch(entry['project'], branch)
+UpdateResult = collections.namedtuple(
+    'UpdateResult', ['repo', 'branch', 'status', 'filename'])
 
-        # Remove the 'name' value in case we can copy the results
-        # directly into a new file.
-        if 'name' in entry['project']:
-            del entry['project']['name']
 
-        merge_project_settings(
-            in_tree_project,
-            entry,
+def _read_gitreview(repo_dir):
+    "Return the repository name and branch from .gitreview."
+    repo = None
+    branch = None
+
+    gitreview_filename = os.path.join(repo_dir, '.gitreview')
+    cp = configparser.ConfigParser()
+    were_read = cp.read(gitreview_filename)
+    if were_read:
+        LOG.debug('determining repository name from .gitreview')
+        try:
+            gerrit = cp['gerrit']
+        except KeyError:
+            pass
+        else:
+            repo = gerrit['project']
+            if repo.endswith('.git'):
+                repo = repo[:-4]
+            branch = gerrit.get('defaultbranch', None)
+    else:
+        LOG.debug('could not read %s', gitreview_filename)
+
+    if not repo:
+        LOG.debug('guessing repository name from directory name')
+        repo = os.sep.join(
+            repo_dir.rstrip(os.sep).split(os.sep)[-2:]
         )
 
-        normalize_project_settings(in_tree_project)
+    return (repo, branch)
 
-        if not in_tree_project.get('project'):
-            LOG.info('no settings to write')
-            return 2
 
-        if not in_tree_settings:
-            in_tree_settings.append(in_tree_project)
+def update_repo(repo_dir, project_settings, zuul_templates, zuul_jobs,
+                branch=None, default_zuul_file='.zuul.yaml'):
+    """Move the project settings for a repository into its tree.
 
-        LOG.info('# {} @ {}'.format(repo, branch))
-        # yaml.dump([in_tree_project], self.app.stdout)
+    Returns an UpdateResult with a status of "created" or "updated"
+    when the in-tree settings were written, or "not found" or "no
+    settings" when there was nothing to write.
 
-        if not in_tree_file:
-            in_tree_file = os.path.join(
-                parsed_args.repo_dir,
-                parsed_args.default_zuul_file,
+    :param repo_dir: The repository location.
+    :type repo_dir: str
+    :param project_settings: The settings from project-config.
+    :type project_settings: zuulcache.ProjectSettings
+    :param zuul_templates: The project templates, by name.
+    :type zuul_templates: dict
+    :param zuul_jobs: The jobs, by name.
+    :type zuul_jobs: dict
+    :param branch: The branch to filter the settings for. Defaults to
+        the one in .gitreview, or master.
+    :type branch: str
+    :param default_zuul_file: The file to create when the repository
+        does not have one.
+    :type default_zuul_file: str
+
+    """
+    repo, gitreview_branch = _read_gitreview(repo_dir)
+
+    # If we are given a branch on the command line, use it.
+    # Otherwise, try to use what we read from .gitreview.
+    # Fall back to using 'master'.
+    branch = branch or gitreview_branch or 'master'
+
+    LOG.info('working on %s @ %s', repo, branch)
+
+    in_repo = find_project_settings_in_repo(repo_dir)
+    in_tree_file, in_tree_project, in_tree_settings = in_repo
+
+    LOG.debug('looking for settings for %s', repo)
+    entry = project_settings.get(repo)
+    if entry is None:
+        return UpdateResult(repo, branch, 'not found', None)
+
+    # Remove the items that need to stay in project-config.
+    find_templates_to_extract(entry['project'], zuul_templates, zuul_jobs)
+
+    filter_jobs_on_branch(entry['project'], branch)
+
+    # Remove the 'name' value in case we can copy the results
+    # directly into a new file.
+    if 'name' in entry['project']:
+        del entry['project']['name']
+
+    merge_project_settings(
+        in_tree_project,
+        entry,
+    )
+
+    normalize_project_settings(in_tree_project)
+
+    if not in_tree_project.get('project'):
+        LOG.info('no settings to write')
+        return UpdateResult(repo, branch, 'no settings', None)
+
+    if not in_tree_settings:
+        in_tree_settings.append(in_tree_project)
+
+    LOG.info('# {} @ {}'.format(repo, branch))
+
+    if not in_tree_file:
+        in_tree_file = os.path.join(repo_dir, default_zuul_file)
+        out_dir = os.path.dirname(in_tree_file)
+        if not os.path.exists(out_dir):
+            os.makedirs(out_dir)
+        LOG.info('creating %s', in_tree_file)
+        status = 'created'
+    else:
+        LOG.info('updating %s', in_tree_file)
+        status = 'updated'
+    yaml = projectconfig_ruamellib.YAML()
+    with open(in_tree_file, 'w', encoding='utf-8') as f:
+        yaml.dump(in_tree_settings, f)
+    return UpdateResult(repo, branch, status, in_tree_file)
+
+
+# The data shared by the processes updating repositories in a batch.
+_batch_data = {}
+
+
+def _init_batch_worker(project_settings, zuul_templates, zuul_jobs):
+    _batch_data['args'] = (project_settings, zuul_templates, zuul_jobs)
+
+
+def _update_batch_repo(repo_dir, branch, default_zuul_file):
+    try:
+        return update_repo(
+            repo_dir,
+            *_batch_data['args'],
+            branch=branch,
+            default_zuul_file=default_zuul_file
+        )
+    except Exception as err:
+        LOG.exception('failed to update %s', repo_dir)
+        return UpdateResult(repo_dir, branch, 'error: {}'.format(err), None)
+
+
+class JobsBatchUpdate(lister.Lister):
+    "update the in-tree project settings for many repositories"
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            '--project-list',
+            default=governance.PROJECTS_LIST,
+            help='URL for projects.yaml',
+        )
+        parser.add_argument(
+            '--project-config-dir',
+            default='../project-config',
+            help='the location of the project-config repo',
+        )
+        parser.add_argument(
+            '--openstack-zuul-jobs-dir',
+            default='../openstack-zuul-jobs',
+            help='the location of the openstack-zuul-jobs repo',
+        )
+        add_zuul_cache_option(parser)
+        parser.add_argument(
+            '--default-zuul-file',
+            default='.zuul.yaml',
+            help='the default file to create when one does not exist',
+        )
+        parser.add_argument(
+            '--branch',
+            default=None,
+            help='the branch to update, instead of the one in .gitreview',
+        )
+        parser.add_argument(
+            '--workers',
+            default=os.cpu_count() or 1,
+            type=int,
+            help=('number of repositories to update at once '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--team',
+            default=None,
+            help=('update the repositories for the team, found in '
+                  'the workspace'),
+        )
+        parser.add_argument(
+            '--workspace',
+            default='.',
+            help=('the directory containing the repositories for '
+                  '--team, as created by "repos clone"'),
+        )
+        parser.add_argument(
+            'repo_dirs',
+            nargs='*',
+            help='the repository locations',
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        repo_dirs = list(parsed_args.repo_dirs)
+        if parsed_args.team:
+            gov_dat = governance.Governance(url=parsed_args.project_list)
+            repo_dirs.extend(
+                os.path.join(parsed_args.workspace, repo)
+                for repo in sorted(
+                    gov_dat.get_repos_for_team(parsed_args.team))
             )
-            out_dir = os.path.dirname(in_tree_file)
-            if not os.path.exists(out_dir):
-                os.makedirs(out_dir)
-            LOG.info('creating %s', in_tree_file)
+        if not repo_dirs:
+            raise ValueError('give a --team or some repository locations')
+
+        project_filename = os.path.join(
+            parsed_args.project_config_dir,
+            'zuul.d',
+            'projects.yaml',
+        )
+        LOG.debug('loading project settings from %s', project_filename)
+        project_settings = zuulcache.ProjectSettings(
+            project_filename, parsed_args.zuul_cache_dir)
+
+        zuul_templates, zuul_jobs = load_zuul_definitions(
+            parsed_args.openstack_zuul_jobs_dir,
+            parsed_args.zuul_cache_dir,
+        )
+
+        shared = (project_settings, zuul_templates, zuul_jobs)
+        args = [
+            (repo_dir, parsed_args.branch, parsed_args.default_zuul_file)
+            for repo_dir in repo_dirs
+        ]
+        if parsed_args.workers <= 1 or len(repo_dirs) == 1:
+            _init_batch_worker(*shared)
+            results = [_update_batch_repo(*a) for a in args]
         else:
-            LOG.info('updating %s', in_tree_file)
-        with open(in_tree_file, 'w', encoding='utf-8') as f:
-            yaml.dump(in_tree_settings, f)
+            # The settings are sent to each worker once, instead of
+            # with every repository.
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=parsed_args.workers,
+                    initializer=_init_batch_worker,
+                    initargs=shared) as pool:
+                results = list(pool.map(_update_batch_repo, *zip(*args)))
+
+        return (
+            ('Repository', 'Branch', 'Status', 'File'),
+            [(r.repo, r.branch, r.status, r.filename or '')
+             for r in results],
+        )
 
 
 def find_jobs_to_retain(project):
@@ -715,6 +876,7 @@ class JobsRetain(command.Command):
             default='../openstack-zuul-jobs',
             help='the location of the openstack-zuul-jobs repo',
         )
+        add_zuul_cache_option(parser)
         parser.add_argument(
             '--dry-run', '-n',
             default=False,
@@ -744,33 +906,10 @@ class JobsRetain(command.Command):
         with open(project_filename, 'r', encoding='utf-8') as f:
             project_settings = yaml.load(f)
 
-        zuul_templates_filename = os.path.join(
+        zuul_templates, zuul_jobs = load_zuul_definitions(
             parsed_args.openstack_zuul_jobs_dir,
-            'zuul.d',
-            'project-templates.yaml',
-        )
-        LOG.debug('loading project templates from %s', zuul_templates_filename)
-        with open(zuul_templates_filename, 'r', encoding='utf-8') as f:
-            zuul_templates_raw = yaml.load(f)
-        zuul_templates = {
-            pt['project-template']['name']: pt['project-template']
-            for pt in zuul_templates_raw
-            if 'project-template' in pt
-        }
-
-        zuul_jobs_filename = os.path.join(
-            parsed_args.openstack_zuul_jobs_dir,
-            'zuul.d',
-            'jobs.yaml',
+            parsed_args.zuul_cache_dir,
         )
-        LOG.debug('loading jobs from %s', zuul_jobs_filename)
-        with open(zuul_jobs_filename, 'r', encoding='utf-8') as f:
-            zuul_jobs_raw = yaml.load(f)
-        zuul_jobs = {
-            job['job']['name']: job['job']
-            for job in zuul_jobs_raw
-            if 'job' in job
-        }
 
         repos = parsed_args.repos
         if not repos:
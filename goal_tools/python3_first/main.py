@@ -13,12 +13,23 @@
 # under the License.
 
 import logging
+import os
 import sys
 
+import appdirs
 from cliff import app
 from cliff import commandmanager
 import pbr.version
 
+from goal_tools import apis
+from goal_tools import caching
+from goal_tools import governance
+
+CACHE_FILE = os.path.join(
+    appdirs.user_cache_dir('OSGoalTools', 'OpenStack'),
+    'python3_first.sqlite',
+)
+
 
 class Python3First(app.App):
     """Tool for working on the python3-first goal.
@@ -33,9 +44,77 @@ class Python3First(app.App):
             deferred_help=False,
         )
 
+    def build_option_parser(self, description, version,
+                            argparse_kwargs=None):
+        parser = super().build_option_parser(description, version,
+                                             argparse_kwargs)
+        parser.add_argument(
+            '--cache-file',
+            default=CACHE_FILE,
+            help=('cache file for data fetched from APIs, '
+                  'empty to keep it in memory (defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--http-pool-size',
+            default=apis.POOL_SIZE,
+            type=int,
+            help=('number of connections to keep open to each server '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--http-timeout',
+            default=apis.TIMEOUT,
+            type=float,
+            help=('seconds to wait for a server to respond '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--governance-cache-dir',
+            default=governance.CACHE_DIR,
+            help=('directory for saved copies of the governance data, '
+                  'empty to always download it (defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--offline',
+            default=False,
+            action='store_true',
+            help=('use the saved copies of the governance data without '
+                  'checking for updates'),
+        )
+        return parser
+
     def initialize_app(self, argv):
         # Quiet the urllib3 module output coming out of requests.
         logging.getLogger('urllib3').setLevel(logging.WARNING)
+        apis.configure(
+            pool_size=self.options.http_pool_size,
+            timeout=self.options.http_timeout,
+        )
+        governance.configure(
+            cache_dir=self.options.governance_cache_dir,
+            offline=self.options.offline,
+        )
+        self._cache = None
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            if self.options.cache_file:
+                os.makedirs(
+                    os.path.dirname(os.path.abspath(self.options.cache_file)),
+                    exist_ok=True,
+                )
+                self._cache = caching.Cache(self.options.cache_file)
+            else:
+                # Use a dictionary for a memory cache.
+                self._cache = {}
+        return self._cache
+
+    def clean_up(self, cmd, result, err):
+        # Save anything written to the cache by the command.
+        if isinstance(self._cache, caching.Cache):
+            self._cache.close()
+            self._cache = None
 
 
 def main(argv=sys.argv[1:]):
@@ -1,92 +1,44 @@
 #!/usr/bin/env python3
 
 import collections
-import json
 import logging
 import os.path
 
 import appdirs
 from cliff import lister
-import requests
 
+from goal_tools import gerrit
 from goal_tools import governance
 from goal_tools import storyboard
 
 LOG = logging.getLogger(__name__)
 BATCH_SIZE = 300
 
-
-def decode_json(raw):
-    """Trap JSON decoding failures and provide more detailed errors
-
-    Remove ')]}' XSS prefix from data if it is present, then decode it
-    as JSON and return the results.
-
-    :param raw: Response text from API
-    :type raw: str
-
-    """
-
-    # Gerrit's REST API prepends a JSON-breaker to avoid XSS vulnerabilities
-    if raw.text.startswith(")]}'"):
-        trimmed = raw.text[4:]
-    else:
-        trimmed = raw.text
-
-    # Try to decode and bail with much detail if it fails
-    try:
-        decoded = json.loads(trimmed)
-    except Exception:
-        LOG.error(
-            '\nrequest returned %s error to query:\n\n    %s\n'
-            '\nwith detail:\n\n    %s\n',
-            raw, raw.url, trimmed)
-        raise
-    return decoded
-
-
-def query_gerrit(offset=0, only_open=True, extra_query=''):
-    """Query the Gerrit REST API"""
-    url = 'https://review.openstack.org/changes/'
-    query = 'topic:python3-first'
-    if only_open:
-        query = query + ' is:open'
-    if extra_query:
-        query = query + ' ' + extra_query
-    LOG.debug('querying %s %r offset %s', url, query, offset)
-    raw = requests.get(
-        url,
-        params={
-            'n': str(BATCH_SIZE),
-            'start': offset,
-            'q': query,
-            'o': [
-                'ALL_REVISIONS',
-                'REVIEWER_UPDATES',
-                'DETAILED_ACCOUNTS',
-                'CURRENT_COMMIT',
-                'LABELS',
-                'DETAILED_LABELS',
-            ],
-        },
-        headers={'Accept': 'application/json'},
+TOPIC_QUERY = 'topic:python3-first'
+CLEANUP_QUERY = ' '.join([
+    'project:openstack-infra/project-config',
+    'message:"remove job settings"',
+    'topic:python3-first',
+])
+
+
+def query_changes(cache, query_string, only_open=False, refresh=False):
+    "Return the changes matching the query, updating the saved copies."
+    store = gerrit.ChangeStore(
+        cache,
+        query_string,
+        # Only the votes, status and owner are used.
+        profile='labels',
+        batch_size=BATCH_SIZE,
+        only_open=only_open,
     )
-    return decode_json(raw)
+    return store.changes(refresh=refresh)
 
 
-def all_changes(only_open=True, extra_query=''):
-    offset = 0
-    while True:
-        changes = query_gerrit(offset, only_open=only_open,
-                               extra_query=extra_query)
-
-        yield from changes
-
-        if changes and changes[-1].get('_more_changes', False):
-            offset += BATCH_SIZE
-        else:
-            LOG.debug('total of %d patches', offset + len(changes))
-            break
+def all_changes(cache, only_open=True, refresh=False):
+    changes = query_changes(cache, TOPIC_QUERY, only_open, refresh)
+    LOG.debug('total of %d patches', len(changes))
+    return changes
 
 
 def count_votes(review, group='Rollcall-Vote'):
@@ -168,6 +120,13 @@ class PatchesList(lister.Lister):
             '--repo',
             help='only the patches for the given repository',
         )
+        parser.add_argument(
+            '--refresh',
+            default=False,
+            action='store_true',
+            help=('fetch all of the changes again instead of only '
+                  'the ones updated since the last run'),
+        )
         parser.add_argument(
             'team',
             nargs='?',
@@ -183,7 +142,8 @@ class PatchesList(lister.Lister):
         only_open = not parsed_args.all
         LOG.debug('only_open %s', only_open)
 
-        changes = all_changes(only_open)
+        changes = all_changes(self.app.cache, only_open,
+                              parsed_args.refresh)
 
         if parsed_args.team:
             repos = set(gov_dat.get_repos_for_team(parsed_args.team))
@@ -210,7 +170,8 @@ class PatchesList(lister.Lister):
 
         if not parsed_args.repo and not parsed_args.imports:
             LOG.debug('looking for cleanup changes')
-            cleanup_changes = get_cleanup_changes_by_team()
+            cleanup_changes = get_cleanup_changes_by_team(
+                self.app.cache, parsed_args.refresh)
             to_add = []
             if parsed_args.team:
                 if parsed_args.team.lower() in cleanup_changes:
@@ -224,7 +185,7 @@ class PatchesList(lister.Lister):
                     to_add = (
                         c
                         for c in to_add
-                        if c.get('status') not in ('MERGED', 'ABANDONED')
+                        if gerrit.is_open(c)
                     )
                 extra_rows = (
                     get_one_row(c, gov_dat)
@@ -248,54 +209,12 @@ class PatchesList(lister.Lister):
         return (columns, data)
 
 
-def search_cleanup_patches(offset=0):
-    """Query the Gerrit REST API"""
-    url = 'https://review.openstack.org/changes/'
-    query = ' '.join([
-        'project:openstack-infra/project-config',
-        'message:"remove job settings"',
-        'topic:python3-first',
-    ])
-    LOG.debug('querying %s %r offset %s', url, query, offset)
-    raw = requests.get(
-        url,
-        params={
-            'n': str(BATCH_SIZE),
-            'start': offset,
-            'q': query,
-            'o': [
-                'ALL_REVISIONS',
-                'REVIEWER_UPDATES',
-                'DETAILED_ACCOUNTS',
-                'CURRENT_COMMIT',
-                'LABELS',
-                'DETAILED_LABELS',
-            ],
-        },
-        headers={'Accept': 'application/json'},
-    )
-    return decode_json(raw)
-
-
-def get_cleanup_changes():
-    offset = 0
-    while True:
-        changes = search_cleanup_patches(offset)
-
-        yield from changes
-
-        if changes and changes[-1].get('_more_changes', False):
-            offset += BATCH_SIZE
-        else:
-            break
-
-
-def get_cleanup_changes_by_team():
+def get_cleanup_changes_by_team(cache, refresh=False):
     LOG.debug('finding cleanup patches in project-config')
     prefix = 'remove job settings for'
     suffix = 'repositories'
     cleanup_changes = {}
-    for change in get_cleanup_changes():
+    for change in query_changes(cache, CLEANUP_QUERY, refresh=refresh):
         subject = change.get('subject', '').lower()
         if subject.startswith(prefix):
             subject = subject[len(prefix):]
@@ -335,6 +254,13 @@ class PatchesCount(lister.Lister):
             action='store_true',
             help='only show teams with open patches',
         )
+        parser.add_argument(
+            '--refresh',
+            default=False,
+            action='store_true',
+            help=('fetch all of the changes again instead of only '
+                  'the ones updated since the last run'),
+        )
         return parser
 
     _import_subject = 'import zuul job settings from project-config'
@@ -363,9 +289,10 @@ class PatchesCount(lister.Lister):
             else:
                 assignments[task.title] = ''
 
-        cleanup_changes = get_cleanup_changes_by_team()
+        cleanup_changes = get_cleanup_changes_by_team(
+            self.app.cache, parsed_args.refresh)
 
-        changes = all_changes(False)
+        changes = all_changes(self.app.cache, False, parsed_args.refresh)
 
         # We aren't going to migrate the settings for the infra team.
         interesting_teams = gov_dat.get_teams()
@@ -13,15 +13,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import ruamel.yaml
-
-
 def none_representer(dumper, data):
     return dumper.represent_scalar('tag:yaml.org,2002:null', 'null')
 
 
 class YAML(object):
     def __init__(self):
+        # ruamel.yaml is slow to import, so wait until it is used.
+        import ruamel.yaml
+
         self.yaml = ruamel.yaml.YAML(typ='rt')
         self.yaml.width = 256
         self.yaml.allow_duplicate_keys = True
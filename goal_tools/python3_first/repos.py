@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 
+import concurrent.futures
 import logging
 import os.path
+import shutil
 import subprocess
 import textwrap
+import time
+
+import appdirs
 
 from goal_tools import governance
 
 from cliff import command
-import jinja2
+from cliff import lister
 
 LOG = logging.getLogger(__name__)
 
@@ -20,9 +25,110 @@ _TOOLS_DIR = os.path.realpath(
     )
 )
 
+UPSTREAM = 'https://git.openstack.org'
+
+MIRROR_DIR = os.path.join(
+    appdirs.user_cache_dir('OSGoalTools', 'OpenStack'),
+    'git-mirrors',
+)
+
+
+def _run(cmd, cwd=None):
+    # Collect the output of each command so the logs of repositories
+    # processed at the same time are not mixed together.
+    try:
+        result = subprocess.run(
+            cmd,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=cwd,
+        )
+    except subprocess.CalledProcessError as err:
+        output = err.output.decode('utf-8', 'replace').strip()
+        LOG.debug('%s failed:\n%s', ' '.join(cmd), output)
+        last_line = output.splitlines()[-1] if output else ''
+        raise RuntimeError('{} failed: {}'.format(
+            os.path.basename(cmd[0]), last_line or err.returncode))
+    LOG.debug(result.stdout.decode('utf-8', 'replace'))
+
+
+def update_mirror(mirror_dir, repo, upstream=UPSTREAM):
+    """Create or update a bare mirror of repo under mirror_dir.
+
+    Returns the directory of the mirror.
+
+    """
+    mirror = os.path.join(mirror_dir, repo)
+    if os.path.isdir(mirror):
+        LOG.debug('updating mirror %s', mirror)
+        _run(['git', '--git-dir', mirror, 'fetch', '--prune', 'origin'])
+        return mirror
+    LOG.debug('creating mirror %s', mirror)
+    os.makedirs(os.path.dirname(mirror), exist_ok=True)
+    # Clone to a temporary name so an interrupted clone is not
+    # mistaken for a usable mirror later.
+    partial = mirror + '.partial'
+    shutil.rmtree(partial, ignore_errors=True)
+    _run(['git', 'clone', '--mirror', '{}/{}'.format(upstream, repo),
+          partial])
+    os.rename(partial, mirror)
+    return mirror
+
+
+def clone_or_update(workdir, repo, mirror_dir=None,
+                    upstream=UPSTREAM, update_mirrors=False):
+    """Clone repo into workdir, or fetch it if it is already there.
+
+    When mirror_dir is set, it is passed to clone_repo.sh to seed new
+    clones, otherwise the script's own default is used. With
+    update_mirrors, a mirror of the repository is created or updated
+    there before cloning.
+
+    Returns the status, "cloned" or "updated".
+
+    """
+    repo_dir = os.path.join(workdir, repo)
+    if mirror_dir and update_mirrors and not os.path.exists(repo_dir):
+        try:
+            update_mirror(mirror_dir, repo, upstream)
+        except Exception as err:
+            LOG.warning('could not update the mirror of %s, '
+                        'cloning without it: %s', repo, err)
+            mirror_dir = None
+
+    if os.path.exists(repo_dir):
+        # Only fetch, so local branches and changes are left alone.
+        _run(['git', 'fetch', 'origin', '--tags', '--prune'], cwd=repo_dir)
+        return 'updated'
+
+    cmd = [os.path.join(_TOOLS_DIR, 'clone_repo.sh'),
+           '--workspace', workdir,
+           '--upstream', upstream]
+    if mirror_dir:
+        cmd.extend(['--cache-dir', mirror_dir])
+    _run(cmd + [repo])
+    return 'cloned'
+
 
-class ReposClone(command.Command):
-    "clone the repositories for a team"
+def _clone_one(workdir, repo, mirror_dir, upstream, update_mirrors):
+    start = time.monotonic()
+    try:
+        status = clone_or_update(workdir, repo, mirror_dir, upstream,
+                                 update_mirrors)
+    except Exception as err:
+        LOG.error('failed to clone %s: %s', repo, err)
+        status = 'error: {}'.format(err)
+    return (repo, status, round(time.monotonic() - start, 1))
+
+
+class ReposClone(lister.Lister):
+    """clone the repositories for a team
+
+    Repositories that are already in the working directory are
+    fetched instead of being skipped.
+
+    """
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
@@ -31,6 +137,33 @@ class ReposClone(command.Command):
             default=governance.PROJECTS_LIST,
             help='URL for projects.yaml',
         )
+        parser.add_argument(
+            '--workers',
+            default=4,
+            type=int,
+            help=('number of repositories to clone at once '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--mirror-dir',
+            default=os.environ.get('ZUUL_CACHE_DIR'),
+            help=('directory of local mirrors used to seed the clones '
+                  '(defaults to $ZUUL_CACHE_DIR, or the default of '
+                  'clone_repo.sh when it is not set)'),
+        )
+        parser.add_argument(
+            '--update-mirrors',
+            default=False,
+            action='store_true',
+            help=('create or update the mirror of each repository before '
+                  'cloning it (mirrors go in {} unless --mirror-dir is '
+                  'given)'.format(MIRROR_DIR)),
+        )
+        parser.add_argument(
+            '--upstream',
+            default=UPSTREAM,
+            help='upstream server URL (defaults to %(default)s)',
+        )
         parser.add_argument(
             'workdir',
             help='directory where the cloned repos should go',
@@ -47,29 +180,42 @@ class ReposClone(command.Command):
         return parser
 
     def take_action(self, parsed_args):
-        clone_script = os.path.join(_TOOLS_DIR, 'clone_repo.sh')
-        if not os.path.exists(parsed_args.workdir):
-            LOG.info('creating working directory %s', parsed_args.workdir)
-            os.makedirs(parsed_args.workdir)
+        workdir = os.path.abspath(parsed_args.workdir)
+        if not os.path.exists(workdir):
+            LOG.info('creating working directory %s', workdir)
+            os.makedirs(workdir)
         repos = parsed_args.repos
         if not repos:
             gov_dat = governance.Governance(url=parsed_args.project_list)
-            repos = gov_dat.get_repos_for_team(parsed_args.team)
-        try:
-            for repo in repos:
-                if os.path.exists(os.path.join(parsed_args.workdir, repo)):
-                    LOG.info('\n%s exists, skipping', repo)
-                    continue
-                LOG.info('\n%s cloning', repo)
-                subprocess.run(
-                    [clone_script,
-                     '--workspace', parsed_args.workdir,
-                     repo],
-                    check=True,
-                )
-        except ValueError as err:
-            print(err)
-            return 1
+            try:
+                repos = list(gov_dat.get_repos_for_team(parsed_args.team))
+            except ValueError as err:
+                print(err)
+                return 1
+        mirror_dir = parsed_args.mirror_dir
+        if parsed_args.update_mirrors and not mirror_dir:
+            mirror_dir = MIRROR_DIR
+        if mirror_dir:
+            mirror_dir = os.path.abspath(os.path.expanduser(mirror_dir))
+
+        columns = ('Repository', 'Status', 'Seconds')
+        data = []
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=max(parsed_args.workers, 1)) as pool:
+            futures = [
+                pool.submit(_clone_one, workdir, repo, mirror_dir,
+                            parsed_args.upstream,
+                            parsed_args.update_mirrors)
+                for repo in repos
+            ]
+            for n, future in enumerate(
+                    concurrent.futures.as_completed(futures), 1):
+                repo, status, seconds = future.result()
+                LOG.info('%s %s in %.1fs (%d/%d)',
+                         repo, status, seconds, n, len(futures))
+                data.append((repo, status, seconds))
+        data.sort()
+        return (columns, data)
 
 
 class ReposList(command.Command):
@@ -129,6 +275,8 @@ class MigrationAnnounce(command.Command):
         gov_dat = governance.Governance(url=parsed_args.project_list)
         repos = sorted(list(gov_dat.get_repos_for_team(parsed_args.team)))
 
+        import jinja2
+
         template = jinja2.Template(
             source=self.body_template,
             undefined=jinja2.StrictUndefined,
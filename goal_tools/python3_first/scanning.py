@@ -0,0 +1,135 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Helpers for the commands that scan the governed repositories."""
+
+import json
+import logging
+import os
+
+import appdirs
+
+from goal_tools import governance
+from goal_tools import utils
+
+LOG = logging.getLogger(__name__)
+
+RESULTS_DIR = appdirs.user_cache_dir('OSGoalTools', 'OpenStack')
+
+
+def add_scan_options(parser, results_file):
+    "Add the options shared by the scanning commands."
+    parser.add_argument(
+        '--repo-base-dir',
+        default='~/repos',
+        help='base directory where repositories are cloned (%(default)s)',
+    )
+    parser.add_argument(
+        '--project-list',
+        default=governance.PROJECTS_LIST,
+        help='URL for governance projects.yaml',
+    )
+    parser.add_argument(
+        '--team',
+        help='limit search to one team',
+    )
+    parser.add_argument(
+        '--workers',
+        default=os.cpu_count() or 1,
+        type=int,
+        help=('number of repositories to scan at once '
+              '(defaults to %(default)s)'),
+    )
+    parser.add_argument(
+        '--results-file',
+        default=results_file,
+        help=('file for the results of earlier scans, '
+              'empty to scan every repository (defaults to %(default)s)'),
+    )
+
+
+def get_repo_owners(project_list, team=None):
+    """Return the governed repositories to scan and their owners.
+
+    The repositories of the Infrastructure team are left out.
+
+    """
+    gov_dat = governance.Governance(url=project_list)
+    if team:
+        repos = gov_dat.get_repos_for_team(team)
+    else:
+        repos = gov_dat.get_repos()
+    owners = {
+        r: gov_dat.get_repo_owner(r)
+        for r in repos
+    }
+    return {
+        r: owner
+        for r, owner in owners.items()
+        if owner != 'Infrastructure'
+    }
+
+
+class ResultStore:
+    """Results of earlier scans, saved in a JSON file.
+
+    :param filename: Where to save the results, or None.
+    :type filename: str
+    :param version: The format of the results. Saved results with a
+        different version are ignored.
+    :type version: int
+
+    """
+
+    def __init__(self, filename, version):
+        self._filename = filename
+        self._version = version
+        self._results = {}
+        self._changed = False
+        if not filename:
+            return
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as err:
+            LOG.warning('could not read %s, ignoring it: %s',
+                        filename, err)
+            return
+        if saved.get('version') != version:
+            LOG.debug('ignoring results in %s from version %s',
+                      filename, saved.get('version'))
+            return
+        self._results = saved['results']
+
+    def get(self, key):
+        "Return the saved value for key, or None."
+        return self._results.get(key)
+
+    def set(self, key, value):
+        "Save value, which must be JSON serializable, for key."
+        self._results[key] = value
+        self._changed = True
+
+    def save(self):
+        if not (self._filename and self._changed):
+            return
+        os.makedirs(os.path.dirname(self._filename) or '.', exist_ok=True)
+        utils.write_atomic(
+            self._filename,
+            json.dumps(
+                {'version': self._version, 'results': self._results},
+                sort_keys=True,
+            ).encode('utf-8'),
+        )
+        self._changed = False
@@ -1,9 +1,12 @@
 #!/usr/bin/env python3
 
+import concurrent.futures
 import configparser
+import hashlib
 import logging
 import os
 import os.path
+import re
 import shutil
 import subprocess
 
@@ -12,9 +15,16 @@ from cliff import lister
 
 from goal_tools import gitutils
 from goal_tools import governance
+from goal_tools.python3_first import scanning
 
 LOG = logging.getLogger(__name__)
 
+RESULTS_FILE = os.path.join(scanning.RESULTS_DIR, 'tox-missing.json')
+
+# Change this when the way a tox.ini is checked changes, so old
+# results are not used.
+RESULTS_VERSION = 2
+
 ENVS = [
     'bindep',
     'cover',
@@ -46,52 +56,267 @@ def get_tox_config(repo_dir):
     return text.partition('\n\n')[-1]
 
 
+# A reference to a value in another section, like "{[testenv]deps}".
+_SECTION_REF = re.compile(r'\{\[([^\]{}]+)\]([^{}]+)\}')
+
+
+def _split_envlist(text):
+    # Split on commas and whitespace outside of braces, so
+    # "py{27,35}, docs" gives "py{27,35}" and "docs".
+    names = []
+    current = ''
+    depth = 0
+    for c in text:
+        if c == '{':
+            depth += 1
+        elif c == '}':
+            depth -= 1
+        if depth == 0 and (c == ',' or c.isspace()):
+            if current:
+                names.append(current)
+            current = ''
+            continue
+        current += c
+    if current:
+        names.append(current)
+    return names
+
+
+def _expand_env_name(name):
+    # Expand the generative names like "py{27,35}-{a,b}".
+    start = name.find('{')
+    if start == -1:
+        return [name]
+    end = name.find('}', start)
+    if end == -1:
+        raise ValueError('unbalanced braces in {!r}'.format(name))
+    return [
+        expanded
+        for choice in name[start + 1:end].split(',')
+        for expanded in _expand_env_name(
+            name[:start] + choice.strip() + name[end + 1:])
+    ]
+
+
+def _substitute(parser, section, value, depth=0):
+    # Replace references to values in other sections. Anything else in
+    # braces depends on the environment tox runs in, so give up.
+    if depth > 10:
+        raise ValueError('too many levels of substitution in {!r}'.format(
+            value))
+
+    def replace(match):
+        ref_section, ref_key = match.group(1), match.group(2)
+        if not parser.has_option(ref_section, ref_key):
+            raise ValueError('no {} in [{}]'.format(ref_key, ref_section))
+        return _substitute(parser, ref_section,
+                           parser.get(ref_section, ref_key), depth + 1)
+
+    value = _SECTION_REF.sub(replace, value)
+    if '{' in value or '}' in value:
+        raise ValueError('cannot substitute {!r} in [{}]'.format(
+            value, section))
+    return value
+
+
+def resolve_tox_ini(repo_dir):
+    """Return the basepython setting for the ENVS in tox.ini.
+
+    The result maps the section name of each environment tox would
+    define to its basepython value, or None if it is not set. Only
+    the parts of the tox syntax needed to answer that are understood
+    (inheriting from [testenv], generative environment lists, and
+    references to values in other sections), so None is returned for
+    a file using anything else and the caller should ask tox instead.
+
+    """
+    filename = os.path.join(repo_dir, 'tox.ini')
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            parser.read_file(f, filename)
+    except (configparser.Error, UnicodeDecodeError) as err:
+        LOG.debug('could not parse %s: %s', filename, err)
+        return None
+
+    try:
+        if any('{' in section for section in parser.sections()):
+            raise ValueError('generative section names')
+        envlist = set()
+        if parser.has_option('tox', 'envlist'):
+            for name in _split_envlist(parser.get('tox', 'envlist')):
+                envlist.update(_expand_env_name(name))
+
+        settings = {}
+        for env in ENVS:
+            section = 'testenv:{}'.format(env)
+            if not (parser.has_section(section) or env in envlist):
+                continue
+            for source in [section, 'testenv']:
+                if parser.has_option(source, 'basepython'):
+                    value = _substitute(
+                        parser, source, parser.get(source, 'basepython'),
+                    ).strip()
+                    break
+            else:
+                value = None
+            # Conditional settings like "py27: python2.7" and values
+            # spread over several lines depend on the factors of
+            # the environment, which is more than is handled here.
+            if value is not None and (':' in value or '\n' in value):
+                raise ValueError('conditional setting {!r}'.format(value))
+            settings[section] = value
+    except ValueError as err:
+        LOG.debug('could not resolve %s: %s', filename, err)
+        return None
+    return settings
+
+
+def get_tox_settings(repo_dir):
+    """Return the basepython setting for the ENVS in repo_dir.
+
+    tox.ini is read directly when possible, falling back to running
+    "tox --showconfig" for files that cannot be resolved. Returns
+    None if neither works.
+
+    """
+    settings = resolve_tox_ini(repo_dir)
+    if settings is not None:
+        return settings
+    LOG.info('asking tox for the settings in %s', repo_dir)
+    config = get_tox_config(repo_dir)
+    LOG.debug(config)
+    if config is None:
+        return None
+    return parse_tox_config(repo_dir, config)
+
+
+def parse_tox_config(repo, config):
+    "Return the basepython settings from the output of tox --showconfig."
+    parser = configparser.ConfigParser()
+    parser.read_string(config, repo)
+    settings = {}
+    for env in ENVS:
+        section = 'testenv:{}'.format(env)
+        if not parser.has_section(section):
+            continue
+        settings[section] = parser.get(section, 'basepython', fallback=None)
+    return settings
+
+
 def check_one(repo_base_dir, repo):
     repo_dir = os.path.join(os.path.expanduser(repo_base_dir), repo)
     if not os.path.exists(os.path.join(repo_dir, 'tox.ini')):
         LOG.info('skipping %s', repo)
         return
     LOG.info('scanning %s', repo)
-    config = get_tox_config(repo_dir)
-    LOG.debug(config)
-    if config is None:
+    settings = get_tox_settings(repo_dir)
+    if settings is None:
         return
-    parser = configparser.ConfigParser()
-    parser.read_string(config, repo)
+    yield from check_settings(repo, settings)
+
+
+def check_settings(repo, settings):
+    "Report the python3 status of the ENVS in the tox settings."
     for env in ENVS:
         section = 'testenv:{}'.format(env)
-        if not parser.has_section(section):
+        if section not in settings:
             LOG.debug('%s has no section %s', repo, section)
             continue
-        if not parser.has_option(section, 'basepython'):
+        value = settings[section]
+        if value is None:
             yield (section, 'not set')
             continue
-        value = parser.get(section, 'basepython')
         if 'python3' not in value:
             yield (section, 'set to {!r}'.format(value))
             continue
         yield (section, 'OK')
 
 
+def tox_ini_key(repo_dir):
+    "Return the key for the results of checking the tox.ini in repo_dir."
+    with open(os.path.join(repo_dir, 'tox.ini'), 'rb') as f:
+        content = f.read()
+    prefix = '{} '.format(','.join(ENVS))
+    return hashlib.sha256(prefix.encode('utf-8') + content).hexdigest()
+
+
+def scan_one(repo_base_dir, repo):
+    """Return the (env, status) pairs for repo, or None.
+
+    None means the repository could not be checked and the results
+    should not be saved.
+
+    """
+    repo_dir = os.path.join(os.path.expanduser(repo_base_dir), repo)
+    LOG.info('scanning %s', repo)
+    settings = get_tox_settings(repo_dir)
+    if settings is None:
+        return None
+    return list(check_settings(repo, settings))
+
+
+def scan_repos(repo_base_dir, repos, results, workers=4):
+    """Check the tox settings of several repositories at once.
+
+    Yields (repo, [(env, status)]) pairs as each repository is
+    finished. Repositories whose tox.ini has been checked before use
+    the saved results.
+
+    """
+    base_dir = os.path.expanduser(repo_base_dir)
+    # Repositories to scan, grouped by the key for their tox.ini so
+    # each distinct file is only checked once.
+    to_scan = {}
+    for repo in repos:
+        repo_dir = os.path.join(base_dir, repo)
+        if not os.path.exists(os.path.join(repo_dir, 'tox.ini')):
+            LOG.info('skipping %s', repo)
+            continue
+        key = tox_ini_key(repo_dir)
+        found = results.get(key)
+        if found is not None:
+            LOG.debug('using saved results for %s', repo)
+            yield (repo, [tuple(r) for r in found])
+        else:
+            to_scan.setdefault(key, []).append(repo)
+
+    if not to_scan:
+        return
+
+    def finished(key, found, n):
+        LOG.info('finished %s (%d/%d)',
+                 ', '.join(to_scan[key]), n, len(to_scan))
+        if found is None:
+            return
+        results.set(key, found)
+        for repo in to_scan[key]:
+            yield (repo, found)
+
+    if workers <= 1 or len(to_scan) == 1:
+        for n, (key, same) in enumerate(to_scan.items(), 1):
+            yield from finished(key, scan_one(base_dir, same[0]), n)
+        return
+
+    # Most files are parsed with configparser in the worker, which
+    # needs its own process to run in parallel.
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers) as pool:
+        futures = {
+            pool.submit(scan_one, base_dir, same[0]): key
+            for key, same in to_scan.items()
+        }
+        for n, future in enumerate(
+                concurrent.futures.as_completed(futures), 1):
+            yield from finished(futures[future], future.result(), n)
+
+
 class ToxMissingPy3(lister.Lister):
     "list the tox environments missing python3 settings"
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
-        parser.add_argument(
-            '--repo-base-dir',
-            default='~/repos',
-            help='base directory where repositories are cloned (%(default)s)',
-        )
-        parser.add_argument(
-            '--project-list',
-            default=governance.PROJECTS_LIST,
-            help='URL for governance projects.yaml',
-        )
-        parser.add_argument(
-            '--team',
-            help='limit search to one team',
-        )
+        scanning.add_scan_options(parser, RESULTS_FILE)
         parser.add_argument(
             '--errors-only', '-e',
             default=False,
@@ -103,23 +328,24 @@ class ToxMissingPy3(lister.Lister):
     def take_action(self, parsed_args):
         columns = ('Team', 'Repo', 'Env', 'Status')
 
-        gov_dat = governance.Governance(url=parsed_args.project_list)
-        if parsed_args.team:
-            repos = gov_dat.get_repos_for_team(parsed_args.team)
-        else:
-            repos = gov_dat.get_repos()
-
-        teams_and_repos = sorted(
-            (gov_dat.get_repo_owner(r), r)
-            for r in repos
-        )
-
-        data = [
-            (team, r, env, status)
-            for team, r in teams_and_repos
-            for env, status in check_one(parsed_args.repo_base_dir, r)
-            if team != 'Infrastructure'
-        ]
+        owners = scanning.get_repo_owners(parsed_args.project_list,
+                                          parsed_args.team)
+
+        results = scanning.ResultStore(parsed_args.results_file,
+                                       RESULTS_VERSION)
+        data = []
+        try:
+            for r, found in scan_repos(parsed_args.repo_base_dir,
+                                       sorted(owners), results,
+                                       parsed_args.workers):
+                data.extend(
+                    (owners[r], r, env, status)
+                    for env, status in found
+                )
+        finally:
+            # Keep what was learned even if the scan is interrupted.
+            results.save()
+        data.sort()
 
         if parsed_args.errors_only:
             data = [
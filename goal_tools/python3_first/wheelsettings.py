@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 
+import concurrent.futures
 import configparser
+import hashlib
 import logging
+import os
 import os.path
 import shutil
 
@@ -10,9 +13,16 @@ from cliff import lister
 
 from goal_tools import gitutils
 from goal_tools import governance
+from goal_tools.python3_first import scanning
 
 LOG = logging.getLogger(__name__)
 
+RESULTS_FILE = os.path.join(scanning.RESULTS_DIR, 'wheel-missing.json')
+
+# Change this when the way a setup.cfg is checked changes, so old
+# results are not used.
+RESULTS_VERSION = 1
+
 
 def get_setup_config(repo_dir):
     LOG.debug('getting settings in %s', repo_dir)
@@ -49,7 +59,11 @@ def check_one(repo_base_dir, repo):
         LOG.info('skipping %s', repo)
         return 'not needed'
     LOG.info('scanning %s', repo)
-    config = get_setup_config(repo_dir)
+    return check_config(get_setup_config(repo_dir))
+
+
+def check_config(config):
+    "Return the status of the universal wheel setting in config."
     if config.has_option('wheel', 'universal'):
         return 'legacy'
     if not config.has_option('bdist_wheel', 'universal'):
@@ -59,25 +73,99 @@ def check_one(repo_base_dir, repo):
     return 'Disabled'
 
 
+def scan_one(repo_dir, saved):
+    """Return the status of repo_dir and the record to save for it.
+
+    saved is the record from an earlier scan, or None. The file is
+    not read if its size and modification time match the record, and
+    not parsed if its contents do.
+
+    """
+    filename = os.path.join(repo_dir, 'setup.cfg')
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        LOG.info('skipping %s', repo_dir)
+        return ('not needed', None)
+    if saved and saved['mtime'] == st.st_mtime_ns and \
+       saved['size'] == st.st_size:
+        return (saved['status'], saved)
+    with open(filename, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    if saved and saved['sha256'] == digest:
+        status = saved['status']
+    else:
+        LOG.info('scanning %s', repo_dir)
+        config = configparser.ConfigParser()
+        config.read_string(content.decode('utf-8'), filename)
+        status = check_config(config)
+    record = {
+        'mtime': st.st_mtime_ns,
+        'size': st.st_size,
+        'sha256': digest,
+        'status': status,
+    }
+    return (status, record)
+
+
+def scan_repos(repo_base_dir, repos, results, workers=4):
+    """Check the setup.cfg of several repositories at once.
+
+    Yields (repo, status) pairs as each repository is finished.
+
+    """
+    base_dir = os.path.expanduser(repo_base_dir)
+    to_scan = []
+    for repo in repos:
+        if applies_to_repo(repo):
+            to_scan.append(repo)
+        else:
+            yield (repo, 'not needed')
+
+    def finished(repo, repo_dir, scan):
+        try:
+            status, record = scan()
+        except Exception as err:
+            LOG.error('could not scan %s: %s', repo, err)
+            return (repo, 'error: {}'.format(err))
+        if record is not None and record != results.get(repo_dir):
+            results.set(repo_dir, record)
+        return (repo, status)
+
+    repo_dirs = [
+        (repo, os.path.abspath(os.path.join(base_dir, repo)))
+        for repo in to_scan
+    ]
+
+    if workers <= 1 or len(repo_dirs) <= 1:
+        for repo, repo_dir in repo_dirs:
+            yield finished(
+                repo, repo_dir,
+                lambda: scan_one(repo_dir, results.get(repo_dir)),
+            )
+        return
+
+    # The files are parsed with configparser in the worker, which
+    # needs its own process to run in parallel.
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers) as pool:
+        futures = {
+            pool.submit(scan_one, repo_dir, results.get(repo_dir)):
+            (repo, repo_dir)
+            for repo, repo_dir in repo_dirs
+        }
+        for future in concurrent.futures.as_completed(futures):
+            repo, repo_dir = futures[future]
+            yield finished(repo, repo_dir, future.result)
+
+
 class WheelMissingUniversal(lister.Lister):
     "list the repos missing the wheel universal setting"
 
     def get_parser(self, prog_name):
         parser = super().get_parser(prog_name)
-        parser.add_argument(
-            '--repo-base-dir',
-            default='~/repos',
-            help='base directory where repositories are cloned (%(default)s)',
-        )
-        parser.add_argument(
-            '--project-list',
-            default=governance.PROJECTS_LIST,
-            help='URL for governance projects.yaml',
-        )
-        parser.add_argument(
-            '--team',
-            help='limit search to one team',
-        )
+        scanning.add_scan_options(parser, RESULTS_FILE)
         parser.add_argument(
             '--errors-only', '-e',
             default=False,
@@ -89,22 +177,21 @@ class WheelMissingUniversal(lister.Lister):
     def take_action(self, parsed_args):
         columns = ('Team', 'Repo', 'Status')
 
-        gov_dat = governance.Governance(url=parsed_args.project_list)
-        if parsed_args.team:
-            repos = gov_dat.get_repos_for_team(parsed_args.team)
-        else:
-            repos = gov_dat.get_repos()
-
-        teams_and_repos = sorted(
-            (gov_dat.get_repo_owner(r), r)
-            for r in repos
-        )
-
-        data = [
-            (team, r, check_one(parsed_args.repo_base_dir, r))
-            for team, r in teams_and_repos
-            if team != 'Infrastructure'
-        ]
+        owners = scanning.get_repo_owners(parsed_args.project_list,
+                                          parsed_args.team)
+
+        results = scanning.ResultStore(parsed_args.results_file,
+                                       RESULTS_VERSION)
+        data = []
+        try:
+            for r, status in scan_repos(parsed_args.repo_base_dir,
+                                        sorted(owners), results,
+                                        parsed_args.workers):
+                data.append((owners[r], r, status))
+        finally:
+            # Keep what was learned even if the scan is interrupted.
+            results.save()
+        data.sort()
 
         if parsed_args.errors_only:
             data = [
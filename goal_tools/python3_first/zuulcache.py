@@ -0,0 +1,179 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Cache the parsed zuul settings from project-config and
+openstack-zuul-jobs.
+
+The settings files are several megabytes of YAML, and the jobs
+commands are run once per repository, so parsing them every time adds
+up. The parsed settings are indexed by name and saved under a key
+made from the contents of the file, so an index is only rebuilt after
+the file changes.
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+
+import appdirs
+
+from goal_tools import utils
+from goal_tools import yamlutils
+from goal_tools.python3_first import projectconfig_ruamellib
+
+LOG = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join(
+    appdirs.user_cache_dir('OSGoalTools', 'OpenStack'),
+    'zuul',
+)
+
+# Change this when the format of the saved indexes changes, so old
+# copies are not used.
+FORMAT_VERSION = 1
+
+
+def _build_definitions(kind):
+    def build(text):
+        return {
+            entry[kind]['name']: entry[kind]
+            for entry in yamlutils.load(text) or []
+            if kind in entry
+        }
+    return build
+
+
+def _build_projects(text):
+    # The project settings are written back out by some commands, so
+    # they are parsed with ruamel.yaml to keep their comments and
+    # formatting. Unpickling all of those objects is slow, so each
+    # project is pickled separately and only unpickled when it is
+    # used.
+    settings = projectconfig_ruamellib.YAML().load(text) or []
+    entries = {}
+    for entry in settings:
+        if 'project' not in entry:
+            continue
+        name = entry['project'].get('name')
+        # Use the first entry for a project, like a linear search.
+        if name and name not in entries:
+            entries[name] = pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)
+    return entries
+
+
+def _load(filename, kind, build, cache_dir, rebuild=False):
+    with open(filename, 'rb') as f:
+        content = f.read()
+    if not cache_dir:
+        return build(content.decode('utf-8'))
+
+    # ruamel.yaml is slow to import, so wait until it is used.
+    import ruamel.yaml
+
+    source_key = hashlib.sha256(
+        os.path.abspath(filename).encode('utf-8')).hexdigest()[:16]
+    # The project settings are pickled ruamel.yaml objects, which may
+    # not load with a different version of the library.
+    content_key = hashlib.sha256(
+        '{} {} {} '.format(
+            FORMAT_VERSION, ruamel.yaml.__version__, kind,
+        ).encode('utf-8') + content
+    ).hexdigest()
+    prefix = '{}-{}-'.format(kind, source_key)
+    index_file = os.path.join(cache_dir, prefix + content_key + '.pickle')
+
+    if not rebuild:
+        try:
+            with open(index_file, 'rb') as f:
+                data = pickle.load(f)
+            LOG.debug('loaded %s index for %s from %s',
+                      kind, filename, index_file)
+            return data
+        except FileNotFoundError:
+            pass
+        except Exception as err:
+            LOG.warning('could not read %s, rebuilding it: %s',
+                        index_file, err)
+
+    LOG.debug('parsing %s', filename)
+    data = build(content.decode('utf-8'))
+    os.makedirs(cache_dir, exist_ok=True)
+    utils.write_atomic(
+        index_file, pickle.dumps(data, pickle.HIGHEST_PROTOCOL))
+    # Remove the indexes built from older versions of the file.
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix) and name != os.path.basename(index_file):
+            os.unlink(os.path.join(cache_dir, name))
+    return data
+
+
+def load_templates(filename, cache_dir=CACHE_DIR):
+    """Return the project templates in filename, by name.
+
+    :param filename: A zuul settings file.
+    :type filename: str
+    :param cache_dir: Where to save the parsed settings, or None.
+    :type cache_dir: str
+
+    """
+    return _load(filename, 'project-template',
+                 _build_definitions('project-template'), cache_dir)
+
+
+def load_jobs(filename, cache_dir=CACHE_DIR):
+    """Return the jobs in filename, by name.
+
+    :param filename: A zuul settings file.
+    :type filename: str
+    :param cache_dir: Where to save the parsed settings, or None.
+    :type cache_dir: str
+
+    """
+    return _load(filename, 'job', _build_definitions('job'), cache_dir)
+
+
+class ProjectSettings:
+    """The project settings from a zuul settings file, by name.
+
+    The entries are the same objects returned by parsing the file
+    with projectconfig_ruamellib, each including its "project" key.
+
+    :param filename: A zuul settings file.
+    :type filename: str
+    :param cache_dir: Where to save the parsed settings, or None.
+    :type cache_dir: str
+
+    """
+
+    def __init__(self, filename, cache_dir=CACHE_DIR):
+        self._filename = filename
+        self._cache_dir = cache_dir
+        self._entries = _load(filename, 'project', _build_projects,
+                              cache_dir)
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def get(self, name):
+        "Return a new copy of the entry for the named project, or None."
+        data = self._entries.get(name)
+        if data is None:
+            return None
+        try:
+            return pickle.loads(data)
+        except Exception as err:
+            LOG.warning('could not load the cached settings for %s, '
+                        'parsing %s again: %s', name, self._filename, err)
+        self._entries = _load(self._filename, 'project', _build_projects,
+                              self._cache_dir, rebuild=True)
+        return pickle.loads(self._entries[name])
@@ -15,19 +15,25 @@ import itertools
 import logging
 import pkgutil
 
-import yaml
+from goal_tools import yamlutils
 
 LOG = logging.getLogger(__name__)
 
-_SPONSOR_DATA = yaml.safe_load(
-    pkgutil.get_data('goal_tools',
-                     'sponsors.yaml').decode('utf-8')
-)
+
+@functools.lru_cache(maxsize=None)
+def _get_sponsor_data():
+    # Only parse the packaged data when it is used.
+    return yamlutils.load(
+        pkgutil.get_data('goal_tools',
+                         'sponsors.yaml').decode('utf-8')
+    )
 
 
 class Sponsors:
 
-    def __init__(self, level, data=_SPONSOR_DATA):
+    def __init__(self, level, data=None):
+        if data is None:
+            data = _get_sponsor_data()
         self._data = data
         if level == 'all':
             self._names = set(
@@ -18,8 +18,6 @@ import os
 import os.path
 import textwrap
 
-from storyboardclient.v1 import client
-
 LOG = logging.getLogger(__name__)
 _DEFAULT_URL = 'https://storyboard.openstack.org/api/v1'
 
@@ -72,6 +70,10 @@ def get_client(config):
         verify_opt = 'default'
     verify = verify_opt.lower() in set(['1', 'true', 'default'])
 
+    # The client library takes a long time to import, so only load
+    # it when it is needed.
+    from storyboardclient.v1 import client
+
     LOG.info('Connecting to storyboard at {}'.format(storyboard_url))
     return client.Client(storyboard_url, access_token, verify=verify)
 
@@ -10,7 +10,12 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import os
+import textwrap
+from unittest import mock
+
 from goal_tools.python3_first import jobs
+from goal_tools.python3_first import projectconfig_ruamellib
 from goal_tools.tests import base
 
 from ruamel.yaml import comments
@@ -821,3 +826,119 @@ class TestUpdateDocsJob(base.TestCase):
         changed = jobs.update_docs_job(in_tree)
         self.assertEqual(expected, in_tree['project']['check']['jobs'])
         self.assertTrue(changed)
+
+
+_PROJECTS = textwrap.dedent('''
+- project:
+    name: openstack/releases
+    templates:
+      - publish-to-pypi
+      - translation-jobs
+    check:
+      jobs:
+        - openstack-tox-py35
+- project:
+    name: openstack/reno
+    check:
+      jobs:
+        - openstack-tox-py27
+''')
+
+_TEMPLATES = textwrap.dedent('''
+- project-template:
+    name: publish-to-pypi
+    check:
+      jobs:
+        - openstack-tox-pep8
+''')
+
+
+class TestJobsBatchUpdate(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self._write('project-config/zuul.d/projects.yaml', _PROJECTS)
+        self._write('openstack-zuul-jobs/zuul.d/project-templates.yaml',
+                    _TEMPLATES)
+        self._write('openstack-zuul-jobs/zuul.d/jobs.yaml', '[]\n')
+        self._write('work/openstack/releases/.gitreview',
+                    '[gerrit]\nproject=openstack/releases.git\n')
+        self._write('work/openstack/reno/.zuul.yaml',
+                    '- project:\n    gate:\n      jobs:\n        - foo\n')
+        os.makedirs(os.path.join(self.tmpdir, 'work/openstack/missing'))
+        self.cmd = jobs.JobsBatchUpdate(mock.Mock(), None)
+
+    def _write(self, name, text):
+        filename = os.path.join(self.tmpdir, name)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def _run(self, *args):
+        parsed_args = self.cmd.get_parser('jobs batch update').parse_args([
+            '--project-config-dir',
+            os.path.join(self.tmpdir, 'project-config'),
+            '--openstack-zuul-jobs-dir',
+            os.path.join(self.tmpdir, 'openstack-zuul-jobs'),
+            '--zuul-cache-dir', os.path.join(self.tmpdir, 'cache'),
+            '--workspace', os.path.join(self.tmpdir, 'work'),
+        ] + list(args))
+        return self.cmd.take_action(parsed_args)
+
+    def _repo_dirs(self, *names):
+        return [os.path.join(self.tmpdir, 'work', n) for n in names]
+
+    def _check(self, rows):
+        work = os.path.join(self.tmpdir, 'work')
+        self.assertEqual(
+            [
+                ('openstack/releases', 'master', 'created',
+                 os.path.join(work, 'openstack/releases/.zuul.yaml')),
+                ('openstack/reno', 'master', 'updated',
+                 os.path.join(work, 'openstack/reno/.zuul.yaml')),
+                ('openstack/missing', 'master', 'not found', ''),
+            ],
+            rows,
+        )
+        with open(rows[0][3], 'r', encoding='utf-8') as f:
+            settings = projectconfig_ruamellib.YAML().load(f)
+        self.assertEqual(
+            {'check': {'jobs': ['openstack-tox-py35']}},
+            dict(settings[0]['project']),
+        )
+        with open(rows[1][3], 'r', encoding='utf-8') as f:
+            settings = projectconfig_ruamellib.YAML().load(f)
+        self.assertEqual(
+            {'check': {'jobs': ['openstack-tox-py27']},
+             'gate': {'jobs': ['foo']}},
+            dict(settings[0]['project']),
+        )
+
+    def test_serial(self):
+        columns, rows = self._run(
+            '--workers', '1',
+            *self._repo_dirs('openstack/releases', 'openstack/reno',
+                             'openstack/missing'))
+        self.assertEqual(('Repository', 'Branch', 'Status', 'File'), columns)
+        self._check(rows)
+
+    def test_pool(self):
+        columns, rows = self._run(
+            '--workers', '2',
+            *self._repo_dirs('openstack/releases', 'openstack/reno',
+                             'openstack/missing'))
+        self._check(rows)
+
+    def test_team(self):
+        with mock.patch('goal_tools.governance.Governance') as gov:
+            gov.return_value.get_repos_for_team.return_value = [
+                'openstack/reno', 'openstack/releases', 'openstack/missing',
+            ]
+            columns, rows = self._run('--workers', '1', '--team', 'Release')
+        self.assertEqual(
+            ['openstack/missing', 'openstack/releases', 'openstack/reno'],
+            [r[0] for r in rows],
+        )
+
+    def test_nothing_to_do(self):
+        self.assertRaises(ValueError, self._run)
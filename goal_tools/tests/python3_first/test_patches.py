@@ -0,0 +1,79 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from unittest import mock
+
+from goal_tools.python3_first import patches
+from goal_tools.tests import base
+
+
+def _change(number, status, subject='subject', updated='2018-01-01'):
+    return {
+        '_number': number,
+        'status': status,
+        'subject': subject,
+        'updated': updated + ' 00:00:00.000000000',
+    }
+
+
+class TestAllChanges(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = {}
+
+    def test_only_open(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [_change(1, 'NEW')]
+            changes = patches.all_changes(self.cache)
+        self.assertEqual([1], [c['_number'] for c in changes])
+        self.assertEqual('({}) is:open'.format(patches.TOPIC_QUERY),
+                         f.call_args[1]['params']['q'])
+
+    def test_all(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [_change(1, 'NEW'), _change(2, 'MERGED')]
+            changes = patches.all_changes(self.cache, only_open=False)
+        self.assertEqual([1, 2], sorted(c['_number'] for c in changes))
+        self.assertEqual(patches.TOPIC_QUERY,
+                         f.call_args[1]['params']['q'])
+
+    def test_closed_dropped(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [_change(1, 'NEW'), _change(2, 'NEW')]
+            patches.all_changes(self.cache)
+            f.return_value = [_change(2, 'MERGED', updated='2018-01-02')]
+            changes = patches.all_changes(self.cache)
+        self.assertEqual([1], [c['_number'] for c in changes])
+        self.assertEqual(
+            '({}) after:"2018-01-01 00:00:00 +0000"'.format(
+                patches.TOPIC_QUERY),
+            f.call_args[1]['params']['q'],
+        )
+
+
+class TestCleanupChanges(base.TestCase):
+
+    def test_by_team(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [
+                _change(1, 'NEW',
+                        'Remove job settings for Oslo repositories',
+                        '2018-01-02'),
+                _change(2, 'MERGED',
+                        'remove job settings for nova repositories'),
+            ]
+            by_team = patches.get_cleanup_changes_by_team({})
+        self.assertEqual({'oslo': 1, 'nova': 2},
+                         {t: c['_number'] for t, c in by_team.items()})
+        self.assertEqual(patches.CLEANUP_QUERY,
+                         f.call_args[1]['params']['q'])
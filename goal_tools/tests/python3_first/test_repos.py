@@ -0,0 +1,151 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import subprocess
+from unittest import mock
+
+import fixtures
+
+from goal_tools.python3_first import repos
+from goal_tools.tests import base
+
+
+def _git(*args, cwd=None):
+    subprocess.run(
+        ['git', '-c', 'user.name=Test', '-c', 'user.email=test@example.com',
+         '-c', 'init.defaultBranch=master'] + list(args),
+        check=True,
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+class TestReposClone(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.upstream = os.path.join(self.tmpdir, 'upstream')
+        self.workdir = os.path.join(self.tmpdir, 'work')
+        self.mirror_dir = os.path.join(self.tmpdir, 'mirrors')
+        for name in ['openstack/a', 'openstack/b']:
+            self._make_upstream(name)
+        self.cmd = repos.ReposClone(mock.Mock(), None)
+
+    def _make_upstream(self, name):
+        repo_dir = os.path.join(self.upstream, name)
+        os.makedirs(repo_dir)
+        _git('init', cwd=repo_dir)
+        self._commit(name, 'README')
+
+    def _commit(self, name, filename):
+        repo_dir = os.path.join(self.upstream, name)
+        with open(os.path.join(repo_dir, filename), 'w') as f:
+            f.write(filename)
+        _git('add', filename, cwd=repo_dir)
+        _git('commit', '-m', 'add ' + filename, cwd=repo_dir)
+
+    def _run(self, *args, repo_names=()):
+        parsed_args = self.cmd.get_parser('repos clone').parse_args([
+            '--upstream', self.upstream,
+            '--mirror-dir', self.mirror_dir,
+        ] + list(args) + [self.workdir, 'Team'] + list(repo_names))
+        return self.cmd.take_action(parsed_args)
+
+    def test_clone(self):
+        columns, data = self._run(
+            '--workers', '2', '--update-mirrors',
+            repo_names=['openstack/b', 'openstack/a'])
+        self.assertEqual(
+            [('openstack/a', 'cloned'), ('openstack/b', 'cloned')],
+            [(r[0], r[1]) for r in data],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.workdir, 'openstack/a/README')))
+        self.assertTrue(
+            os.path.isdir(os.path.join(self.mirror_dir, 'openstack/a')))
+
+    def test_fetch_existing(self):
+        self._run(repo_names=['openstack/a'])
+        self._commit('openstack/a', 'NEW')
+        columns, data = self._run(repo_names=['openstack/a'])
+        self.assertEqual('updated', data[0][1])
+        subprocess.run(
+            ['git', 'rev-parse', '--verify', 'origin/master:NEW'],
+            check=True,
+            cwd=os.path.join(self.workdir, 'openstack/a'),
+            stdout=subprocess.DEVNULL,
+        )
+
+    def test_mirrors_not_built_by_default(self):
+        columns, data = self._run(repo_names=['openstack/a'])
+        self.assertEqual('cloned', data[0][1])
+        self.assertFalse(os.path.exists(self.mirror_dir))
+
+    def _clone_commands(self, *args):
+        with mock.patch.object(repos, '_run', wraps=repos._run) as run:
+            columns, data = self._run(*args, repo_names=['openstack/a'])
+        self.assertEqual('cloned', data[0][1])
+        return [
+            c[0][0] for c in run.call_args_list
+            if c[0][0][0].endswith('clone_repo.sh')
+        ]
+
+    def test_mirror_dir_passed(self):
+        cmd, = self._clone_commands()
+        self.assertEqual(
+            ['--cache-dir', self.mirror_dir],
+            cmd[cmd.index('--cache-dir'):cmd.index('--cache-dir') + 2],
+        )
+
+    def test_no_mirror_dir_uses_script_default(self):
+        cmd, = self._clone_commands('--mirror-dir', '')
+        self.assertNotIn('--cache-dir', cmd)
+
+    def test_zuul_cache_dir_default(self):
+        self.useFixture(fixtures.EnvironmentVariable(
+            'ZUUL_CACHE_DIR', self.mirror_dir))
+        parsed_args = self.cmd.get_parser('repos clone').parse_args(
+            [self.workdir, 'Team'])
+        self.assertEqual(self.mirror_dir, parsed_args.mirror_dir)
+
+    def test_no_mirror(self):
+        columns, data = self._run('--mirror-dir', '',
+                                  repo_names=['openstack/a'])
+        self.assertEqual('cloned', data[0][1])
+        self.assertFalse(os.path.exists(self.mirror_dir))
+
+    def test_error(self):
+        columns, data = self._run(
+            repo_names=['openstack/missing', 'openstack/a'])
+        self.assertEqual('cloned', data[0][1])
+        self.assertEqual('openstack/missing', data[1][0])
+        self.assertTrue(data[1][1].startswith('error: '))
+
+    def test_team(self):
+        with mock.patch('goal_tools.governance.Governance') as gov:
+            gov.return_value.get_repos_for_team.return_value = iter(
+                ['openstack/a'])
+            columns, data = self._run()
+        gov.return_value.get_repos_for_team.assert_called_once_with('Team')
+        self.assertEqual(['openstack/a'], [r[0] for r in data])
+
+    def test_unknown_team(self):
+        with mock.patch('goal_tools.governance.Governance') as gov:
+            gov.return_value.get_repos_for_team.side_effect = ValueError(
+                'No deliverables found for team Team')
+            with mock.patch('builtins.print') as p:
+                self.assertEqual(1, self._run())
+        p.assert_called_once_with(
+            gov.return_value.get_repos_for_team.side_effect)
+        self.assertEqual([], os.listdir(self.workdir))
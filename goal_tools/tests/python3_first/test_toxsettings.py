@@ -0,0 +1,236 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import textwrap
+from unittest import mock
+
+from goal_tools.python3_first import toxsettings
+from goal_tools.tests import base
+
+_TOX_INI = textwrap.dedent('''
+[tox]
+envlist = py{27,35},pep8
+
+[testenv]
+deps = -r{toxinidir}/requirements.txt
+
+[testenv:docs]
+basepython = python3
+
+[testenv:pep8]
+basepython = python2.7
+
+[testenv:venv]
+commands = {posargs}
+''')
+
+
+class TestResolveToxIni(base.TestCase):
+
+    def _resolve(self, text):
+        with open(os.path.join(self.tmpdir, 'tox.ini'), 'w',
+                  encoding='utf-8') as f:
+            f.write(textwrap.dedent(text))
+        return toxsettings.resolve_tox_ini(self.tmpdir)
+
+    def test_sections(self):
+        self.assertEqual(
+            {'testenv:docs': 'python3',
+             'testenv:pep8': 'python2.7',
+             'testenv:venv': None},
+            self._resolve(_TOX_INI),
+        )
+
+    def test_inherit(self):
+        self.assertEqual(
+            {'testenv:docs': 'python3', 'testenv:pep8': 'python3.5'},
+            self._resolve('''
+            [testenv]
+            basepython = python3
+            [testenv:docs]
+            [testenv:pep8]
+            basepython = python3.5
+            '''),
+        )
+
+    def test_envlist(self):
+        self.assertEqual(
+            {'testenv:docs': None, 'testenv:pep8': None,
+             'testenv:cover': None},
+            self._resolve('''
+            [tox]
+            envlist =
+                py{27,35}-{dj1,dj2},
+                docs pep8
+                {cover,other}
+            '''),
+        )
+
+    def test_section_reference(self):
+        self.assertEqual(
+            {'testenv:docs': 'python3.6'},
+            self._resolve('''
+            [vars]
+            py = python3.6
+            [testenv:base]
+            basepython = {[vars]py}
+            [testenv:docs]
+            basepython = {[testenv:base]basepython}
+            '''),
+        )
+
+    def test_missing_reference(self):
+        self.assertIsNone(self._resolve('''
+            [testenv:docs]
+            basepython = {[vars]py}
+            '''))
+
+    def test_environment_substitution(self):
+        self.assertIsNone(self._resolve('''
+            [testenv:docs]
+            basepython = {env:PYTHON:python3}
+            '''))
+
+    def test_conditional(self):
+        self.assertIsNone(self._resolve('''
+            [testenv]
+            basepython =
+                docs: python3
+                py27: python2.7
+            [testenv:docs]
+            '''))
+
+    def test_generative_section(self):
+        self.assertIsNone(self._resolve('''
+            [testenv:{docs,pep8}]
+            basepython = python3
+            '''))
+
+    def test_not_ini(self):
+        self.assertIsNone(self._resolve('basepython = python3\n'))
+
+
+class TestToxMissingPy3(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.repo_dir = os.path.join(self.tmpdir, 'repos')
+        for repo in ['openstack/nova', 'openstack/reno', 'openstack/oslo']:
+            self._write_tox(repo, _TOX_INI)
+        self.results_file = os.path.join(self.tmpdir, 'cache', 'tox.json')
+        self.cmd = toxsettings.ToxMissingPy3(mock.Mock(), None)
+        gov = mock.patch('goal_tools.governance.Governance').start()
+        self.addCleanup(mock.patch.stopall)
+        gov.return_value.get_repos.return_value = [
+            'openstack/reno', 'openstack/nova', 'openstack/missing',
+            'openstack/infra',
+        ]
+        gov.return_value.get_repo_owner.side_effect = {
+            'openstack/nova': 'Nova',
+            'openstack/reno': 'Release',
+            'openstack/missing': 'Release',
+            'openstack/infra': 'Infrastructure',
+        }.get
+        self.get_tox_config = mock.patch.object(
+            toxsettings, 'get_tox_config',
+            side_effect=AssertionError('should not run tox'),
+        ).start()
+
+    def _write_tox(self, repo, text):
+        dirname = os.path.join(self.repo_dir, repo)
+        os.makedirs(dirname, exist_ok=True)
+        with open(os.path.join(dirname, 'tox.ini'), 'w',
+                  encoding='utf-8') as f:
+            f.write(text)
+
+    def _run(self, *args):
+        parsed_args = self.cmd.get_parser('tox missing').parse_args([
+            '--repo-base-dir', self.repo_dir,
+            '--results-file', self.results_file,
+            # Scan in this process, so the mocks apply.
+            '--workers', '1',
+        ] + list(args))
+        return self.cmd.take_action(parsed_args)
+
+    def test_rows(self):
+        # Different files, so they are scanned by the process pool.
+        self._write_tox('openstack/reno', _TOX_INI + '# reno\n')
+        columns, data = self._run('--workers', '2')
+        self.assertEqual(
+            [
+                ('Nova', 'openstack/nova', 'testenv:docs', 'OK'),
+                ('Nova', 'openstack/nova', 'testenv:pep8',
+                 "set to 'python2.7'"),
+                ('Nova', 'openstack/nova', 'testenv:venv', 'not set'),
+                ('Release', 'openstack/reno', 'testenv:docs', 'OK'),
+                ('Release', 'openstack/reno', 'testenv:pep8',
+                 "set to 'python2.7'"),
+                ('Release', 'openstack/reno', 'testenv:venv', 'not set'),
+            ],
+            data,
+        )
+
+    def test_errors_only(self):
+        columns, data = self._run('--errors-only')
+        self.assertNotIn('OK', [r[-1] for r in data])
+        self.assertEqual(4, len(data))
+
+    def test_results_saved(self):
+        expected = self._run()
+        with mock.patch.object(toxsettings, 'get_tox_settings') as get:
+            get.side_effect = AssertionError('should not scan')
+            self.assertEqual(expected, self._run())
+
+    def test_changed_tox_ini(self):
+        self._run()
+        self._write_tox('openstack/nova', '[testenv:docs]\n')
+        columns, data = self._run()
+        self.assertIn(
+            ('Nova', 'openstack/nova', 'testenv:docs', 'not set'),
+            data,
+        )
+
+    def test_same_tox_ini_scanned_once(self):
+        with mock.patch.object(toxsettings, 'get_tox_settings',
+                               wraps=toxsettings.get_tox_settings) as get:
+            self._run()
+        self.assertEqual(1, get.call_count)
+
+    def test_fall_back_to_tox(self):
+        self._write_tox('openstack/nova',
+                        '[testenv:docs]\nbasepython = {env:PY:python3}\n')
+        self.get_tox_config.side_effect = None
+        self.get_tox_config.return_value = textwrap.dedent('''
+        [testenv:docs]
+        basepython = python3
+        ''')
+        columns, data = self._run()
+        self.get_tox_config.assert_called_once_with(
+            os.path.join(self.repo_dir, 'openstack/nova'))
+        self.assertIn(
+            ('Nova', 'openstack/nova', 'testenv:docs', 'OK'),
+            data,
+        )
+
+    def test_failures_not_saved(self):
+        self._write_tox('openstack/nova', '[testenv:docs]\nbasepython = {\n')
+        self._write_tox('openstack/reno', '[testenv:docs]\nbasepython = {\n')
+        self.get_tox_config.side_effect = None
+        self.get_tox_config.return_value = None
+        columns, data = self._run()
+        self.assertEqual([], data)
+        self.assertFalse(os.path.exists(self.results_file))
+
+    def test_no_results_file(self):
+        self._run('--results-file', '')
+        self.assertFalse(os.path.exists(self.results_file))
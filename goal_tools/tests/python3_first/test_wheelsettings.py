@@ -0,0 +1,112 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+from unittest import mock
+
+from goal_tools.python3_first import wheelsettings
+from goal_tools.tests import base
+
+
+class TestWheelMissingUniversal(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.repo_dir = os.path.join(self.tmpdir, 'repos')
+        self._write_setup('openstack/nova', '[bdist_wheel]\nuniversal = 1\n')
+        self._write_setup('openstack/reno', '[metadata]\nname = reno\n')
+        self._write_setup('openstack/oslo', '[wheel]\nuniversal = 1\n')
+        self.results_file = os.path.join(self.tmpdir, 'cache', 'wheel.json')
+        self.cmd = wheelsettings.WheelMissingUniversal(mock.Mock(), None)
+        gov = mock.patch('goal_tools.governance.Governance').start()
+        self.addCleanup(mock.patch.stopall)
+        gov.return_value.get_repos.return_value = [
+            'openstack/reno', 'openstack/nova', 'openstack/oslo',
+            'openstack/nova-specs', 'openstack/missing', 'openstack/infra',
+        ]
+        gov.return_value.get_repo_owner.side_effect = {
+            'openstack/nova': 'Nova',
+            'openstack/nova-specs': 'Nova',
+            'openstack/reno': 'Release',
+            'openstack/oslo': 'Oslo',
+            'openstack/missing': 'Release',
+            'openstack/infra': 'Infrastructure',
+        }.get
+
+    def _write_setup(self, repo, text):
+        dirname = os.path.join(self.repo_dir, repo)
+        os.makedirs(dirname, exist_ok=True)
+        filename = os.path.join(dirname, 'setup.cfg')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return filename
+
+    def _run(self, *args):
+        parsed_args = self.cmd.get_parser('wheel missing').parse_args([
+            '--repo-base-dir', self.repo_dir,
+            '--results-file', self.results_file,
+            # Scan in this process, so the mocks apply.
+            '--workers', '1',
+        ] + list(args))
+        return self.cmd.take_action(parsed_args)
+
+    def test_rows(self):
+        columns, data = self._run('--workers', '2')
+        self.assertEqual(
+            [
+                ('Nova', 'openstack/nova', 'OK'),
+                ('Nova', 'openstack/nova-specs', 'not needed'),
+                ('Oslo', 'openstack/oslo', 'legacy'),
+                ('Release', 'openstack/missing', 'not needed'),
+                ('Release', 'openstack/reno', 'not set'),
+            ],
+            data,
+        )
+
+    def test_errors_only(self):
+        columns, data = self._run('--errors-only')
+        self.assertEqual(['openstack/oslo', 'openstack/reno'],
+                         [r[1] for r in data])
+
+    def test_unchanged_not_read(self):
+        expected = self._run()
+        with mock.patch('builtins.open', wraps=open) as open_:
+            self.assertEqual(expected, self._run())
+        opened = [c[0][0] for c in open_.call_args_list]
+        self.assertEqual([self.results_file], opened)
+
+    def test_touched_not_parsed(self):
+        expected = self._run()
+        filename = os.path.join(self.repo_dir, 'openstack/nova/setup.cfg')
+        os.utime(filename, ns=(0, 0))
+        with mock.patch.object(wheelsettings, 'check_config') as check:
+            check.side_effect = AssertionError('should not parse')
+            self.assertEqual(expected, self._run())
+
+    def test_changed(self):
+        self._run()
+        filename = self._write_setup('openstack/nova', '[metadata]\n')
+        os.utime(filename, ns=(0, 0))
+        columns, data = self._run()
+        self.assertIn(('Nova', 'openstack/nova', 'not set'), data)
+
+    def test_parse_error(self):
+        self._write_setup('openstack/nova', 'universal = 1\n')
+        columns, data = self._run()
+        self.assertTrue(data[0][2].startswith('error: '))
+        self.assertEqual('not set', data[-1][2])
+
+    def test_parse_error_in_pool(self):
+        self._write_setup('openstack/nova', 'universal = 1\n')
+        columns, data = self._run('--workers', '2')
+        self.assertTrue(data[0][2].startswith('error: '))
+        self.assertEqual('not set', data[-1][2])
@@ -0,0 +1,146 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+import os
+import textwrap
+from unittest import mock
+
+from goal_tools.python3_first import projectconfig_ruamellib
+from goal_tools.python3_first import zuulcache
+from goal_tools.tests import base
+
+_PROJECTS = textwrap.dedent('''
+- project:
+    name: openstack/releases
+    templates:
+      - publish-to-pypi  # comment kept
+    check:
+      jobs:
+        - openstack-tox-py35:
+            voting: false
+- project:
+    name: openstack/reno
+    gate:
+      jobs:
+        - openstack-tox-pep8
+- project:
+    name: openstack/releases
+    templates:
+      - duplicate
+''')
+
+_TEMPLATES = textwrap.dedent('''
+- project-template:
+    name: publish-to-pypi
+    release:
+      jobs:
+        - release-openstack-python
+- job:
+    name: not-a-template
+''')
+
+
+class TestZuulCache(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = os.path.join(self.tmpdir, 'cache')
+        self.projects = self._write('projects.yaml', _PROJECTS)
+        self.templates = self._write('project-templates.yaml', _TEMPLATES)
+
+    def _write(self, name, text):
+        filename = os.path.join(self.tmpdir, name)
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return filename
+
+    def _dump(self, data):
+        buffer = io.StringIO()
+        projectconfig_ruamellib.YAML().dump(data, buffer)
+        return buffer.getvalue()
+
+    def test_templates(self):
+        templates = zuulcache.load_templates(self.templates, self.cache_dir)
+        self.assertEqual(['publish-to-pypi'], list(templates))
+        self.assertEqual(
+            ['release-openstack-python'],
+            templates['publish-to-pypi']['release']['jobs'],
+        )
+
+    def test_jobs(self):
+        jobs = zuulcache.load_jobs(self.templates, self.cache_dir)
+        self.assertEqual({'not-a-template': {'name': 'not-a-template'}},
+                         jobs)
+
+    def test_cached(self):
+        expected = zuulcache.load_templates(self.templates, self.cache_dir)
+        with mock.patch('goal_tools.yamlutils.load') as load:
+            load.side_effect = AssertionError('should not parse')
+            actual = zuulcache.load_templates(self.templates, self.cache_dir)
+        self.assertEqual(expected, actual)
+
+    def test_no_cache_dir(self):
+        zuulcache.load_templates(self.templates, None)
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_changed_file(self):
+        zuulcache.load_templates(self.templates, self.cache_dir)
+        self._write('project-templates.yaml',
+                    _TEMPLATES.replace('publish-to-pypi', 'other'))
+        templates = zuulcache.load_templates(self.templates, self.cache_dir)
+        self.assertEqual(['other'], list(templates))
+        self.assertEqual(1, len(os.listdir(self.cache_dir)))
+
+    def test_project_settings(self):
+        settings = zuulcache.ProjectSettings(self.projects, self.cache_dir)
+        self.assertIn('openstack/reno', settings)
+        self.assertIsNone(settings.get('openstack/nova'))
+        parsed = projectconfig_ruamellib.YAML().load(_PROJECTS)
+        self.assertEqual(self._dump([parsed[0]]),
+                         self._dump([settings.get('openstack/releases')]))
+
+    def test_project_settings_cached(self):
+        zuulcache.ProjectSettings(self.projects, self.cache_dir)
+        with mock.patch.object(projectconfig_ruamellib, 'YAML') as yaml:
+            yaml.side_effect = AssertionError('should not parse')
+            settings = zuulcache.ProjectSettings(
+                self.projects, self.cache_dir)
+        self.assertIn('# comment kept',
+                      self._dump([settings.get('openstack/releases')]))
+
+    def test_project_settings_copies(self):
+        settings = zuulcache.ProjectSettings(self.projects, self.cache_dir)
+        entry = settings.get('openstack/reno')
+        del entry['project']['gate']
+        self.assertIn('gate', settings.get('openstack/reno')['project'])
+
+    def test_library_version_in_key(self):
+        zuulcache.ProjectSettings(self.projects, self.cache_dir)
+        before = os.listdir(self.cache_dir)
+        with mock.patch('ruamel.yaml.__version__', '0.0.0'):
+            zuulcache.ProjectSettings(self.projects, self.cache_dir)
+        after = os.listdir(self.cache_dir)
+        self.assertEqual(1, len(after))
+        self.assertNotEqual(before, after)
+
+    def test_project_settings_unpickle_error(self):
+        settings = zuulcache.ProjectSettings(self.projects, self.cache_dir)
+        settings._entries['openstack/reno'] = b'not a pickle'
+        entry = settings.get('openstack/reno')
+        self.assertIn('gate', entry['project'])
+        # The saved index is rebuilt, so later runs are not broken too.
+        with mock.patch.object(projectconfig_ruamellib, 'YAML') as yaml:
+            yaml.side_effect = AssertionError('should not parse')
+            settings = zuulcache.ProjectSettings(
+                self.projects, self.cache_dir)
+        self.assertIn('gate', settings.get('openstack/reno')['project'])
@@ -0,0 +1,92 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import subprocess
+import sys
+
+from goal_tools.tests import base
+
+# The apps and the modules with their commands. "--help" imports
+# all of them to show the command descriptions.
+_MODULES = [
+    'goal_tools.who_helped.main',
+    'goal_tools.who_helped.batch',
+    'goal_tools.who_helped.cache',
+    'goal_tools.who_helped.changes',
+    'goal_tools.who_helped.contributions',
+    'goal_tools.who_helped.distinct',
+    'goal_tools.who_helped.matrix',
+    'goal_tools.who_helped.members',
+    'goal_tools.who_helped.review',
+    'goal_tools.who_helped.sql',
+    'goal_tools.who_helped.summarize',
+    'goal_tools.who_helped.team',
+    'goal_tools.who_helped.top',
+    'goal_tools.python3_first.main',
+    'goal_tools.python3_first.jobs',
+    'goal_tools.python3_first.patches',
+    'goal_tools.python3_first.repos',
+    'goal_tools.python3_first.toxsettings',
+    'goal_tools.python3_first.wheelsettings',
+]
+
+# Packages that are slow to import, and only needed by some commands.
+_LAZY = [
+    'jinja2',
+    'requests',
+    'ruamel',
+    'storyboardclient',
+    'urllib3',
+    'yaml',
+]
+
+# Generous limit on the time to import the modules above, and
+# everything they use, in microseconds. Before the slow imports were
+# deferred, it took about 500ms.
+_BUDGET = 400000
+
+
+class TestImportTime(base.TestCase):
+
+    def _import(self):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             'import {}'.format(', '.join(_MODULES))],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            check=True,
+        )
+        # Map the modules imported to their cumulative import times
+        # and whether they were imported at the top level.
+        timings = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                top = not name[1:].startswith(' ')
+                timings[name.strip()] = (int(cumulative), top)
+        return timings
+
+    def test_slow_modules_not_imported(self):
+        imported = set(n.split('.')[0] for n in self._import())
+        self.assertEqual([], [n for n in _LAZY if n in imported])
+
+    def test_budget(self):
+        timings = self._import()
+        # Leave out the interpreter's own startup imports.
+        total = sum(
+            t for n, (t, top) in timings.items()
+            if top and n.startswith('goal_tools')
+        )
+        self.assertLess(total, _BUDGET)
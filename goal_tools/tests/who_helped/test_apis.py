@@ -0,0 +1,107 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+from unittest import mock
+
+import fixtures
+import requests_mock
+
+from goal_tools import apis
+from goal_tools.tests import base
+
+
+class TestHostLimits(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = apis.Client()
+
+    def test_no_limit(self):
+        slot = self.client._host_slot('https://example.com/path')
+        self.assertNotIsInstance(slot, threading.BoundedSemaphore)
+
+    def test_limit_from_url(self):
+        self.client.set_host_limit('https://example.com/', 2)
+        slot = self.client._host_slot('https://example.com/path')
+        self.assertIsInstance(slot, threading.BoundedSemaphore)
+        self.assertIs(slot, self.client._host_slot('https://example.com/x'))
+
+    def test_limit_from_host(self):
+        self.client.set_host_limit('example.com', 2)
+        slot = self.client._host_slot('https://example.com/path')
+        self.assertIsInstance(slot, threading.BoundedSemaphore)
+
+    def test_other_host(self):
+        self.client.set_host_limit('example.com', 2)
+        slot = self.client._host_slot('https://example.org/path')
+        self.assertNotIsInstance(slot, threading.BoundedSemaphore)
+
+
+class TestClient(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = apis.Client(
+            timeout=10,
+            host_timeouts={'https://slow.example.com/': 30},
+        )
+
+    def test_default_timeout(self):
+        with mock.patch.object(self.client._session, 'get') as get:
+            self.client.get('https://example.com/path')
+        get.assert_called_once_with(
+            'https://example.com/path', params=None, headers=None,
+            timeout=10,
+        )
+
+    def test_host_timeout(self):
+        with mock.patch.object(self.client._session, 'get') as get:
+            self.client.get('https://slow.example.com/path')
+        get.assert_called_once_with(
+            'https://slow.example.com/path', params=None, headers=None,
+            timeout=30,
+        )
+
+    def test_pool_size(self):
+        client = apis.Client(pool_size=3)
+        adapter = client._session.get_adapter('https://example.com/')
+        self.assertEqual(3, adapter._pool_maxsize)
+
+    def test_retry_statuses(self):
+        adapter = self.client._session.get_adapter('https://example.com/')
+        self.assertEqual(
+            set(apis.RETRY_STATUSES),
+            set(adapter.max_retries.status_forcelist),
+        )
+
+
+class TestSharedClient(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.useFixture(fixtures.MonkeyPatch('goal_tools.apis._CLIENT', None))
+
+    def test_get_client_shared(self):
+        self.assertIs(apis.get_client(), apis.get_client())
+
+    def test_configure(self):
+        original = apis.get_client()
+        client = apis.configure(pool_size=2)
+        self.assertIsNot(original, client)
+        self.assertIs(client, apis.get_client())
+
+    def test_requester_uses_client(self):
+        with requests_mock.Mocker() as m:
+            m.get('https://example.com/path', text='body')
+            response = apis.requester('https://example.com/path')
+        self.assertEqual('body', response.text)
@@ -0,0 +1,181 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import copy
+import csv
+import json
+import os.path
+import pkgutil
+import sqlite3
+from unittest import mock
+
+import fixtures
+
+from goal_tools import gerrit
+from goal_tools.tests import base
+from goal_tools.tests.who_helped import test_governance
+from goal_tools.who_helped import batch
+from goal_tools.who_helped import columnar
+
+_data_561507 = json.loads(
+    pkgutil.get_data('goal_tools.tests.who_helped',
+                     'data/561507.json').decode('utf-8')
+)
+
+
+class TestBatchRun(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.app = mock.Mock()
+        self.app.cache = {}
+        self.app.options.keep_raw_reviews = False
+        self.cmd = batch.BatchRun(self.app, None)
+        self.useFixture(fixtures.MockPatch(
+            'goal_tools.governance.Governance._get_team_data',
+            return_value=test_governance.TEAM_DATA,
+        ))
+        self.query_members = self.useFixture(fixtures.MockPatch(
+            'goal_tools.foundation._query_members',
+            return_value=[],
+        )).mock
+        change = copy.deepcopy(_data_561507)
+        unofficial = copy.deepcopy(_data_561507)
+        unofficial['_number'] = 1
+        unofficial['project'] = 'openstack/no-such-repo'
+        self.details = {
+            change['_number']: change,
+            unofficial['_number']: unofficial,
+        }
+
+        def ids_only(c):
+            return {k: c[k] for k in ('_number', 'project', 'updated')}
+
+        self.results = {
+            'topic:a': [ids_only(change)],
+            'topic:b\nOR topic:c': [ids_only(change), ids_only(unofficial)],
+        }
+        self.query_changes = self.useFixture(fixtures.MockPatch(
+            'goal_tools.gerrit.query_changes',
+            side_effect=self._query_changes,
+        )).mock
+        # The queries used to fetch the details of the reviews.
+        self.fetched = []
+        self.useFixture(fixtures.MockPatch(
+            'goal_tools.gerrit._fetch_review_data',
+            side_effect=AssertionError('should fetch in bulk'),
+        ))
+
+    def _query_changes(self, query_string, batch_size=200, profile='full'):
+        if profile == 'ids-only':
+            return iter(self.results[query_string])
+        self.fetched.append(query_string)
+        return iter([
+            copy.deepcopy(self.details[int(term.partition(':')[-1])])
+            for term in query_string.split(' OR ')
+        ])
+
+    def _write_query(self, name, query_string):
+        filename = os.path.join(self.tmpdir, name + '.qry')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(query_string + '\n')
+        return filename
+
+    def _run(self, *filenames, **kwds):
+        parser = self.cmd.get_parser('batch run')
+        args = []
+        for k, v in kwds.items():
+            args.append('--' + k.replace('_', '-'))
+            if v is not True:
+                args.append(str(v))
+        parsed_args = parser.parse_args(args + list(filenames))
+        return self.cmd.take_action(parsed_args)
+
+    def test_outputs(self):
+        qa = self._write_query('a', 'topic:a')
+        columns, summary = self._run(qa)
+        self.assertEqual(('Query', 'Reviews', 'Contributions'), columns)
+        self.assertEqual([(qa, 1, 4)], summary)
+        base_name = os.path.join(self.tmpdir, 'a')
+        with open(base_name + '.txt', 'r', encoding='utf-8') as f:
+            self.assertEqual('# QUERY: topic:a\n561507\n', f.read())
+        with open(base_name + '.dat', 'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(4, len(rows))
+        self.assertEqual({'561507'}, set(r['Review'] for r in rows))
+        self.assertEqual({'Release Management'}, set(r['Team'] for r in rows))
+        self.assertTrue(columnar.is_current(
+            columnar.sidecar_name(base_name + '.dat'), base_name + '.dat'))
+        db = sqlite3.connect(base_name + '.db')
+        self.assertEqual(
+            4, db.execute('select count(*) from contribution').fetchone()[0])
+        self.assertEqual(
+            [('topic:a', '2018-04-19 12:57:36.000000000')],
+            db.execute('select query, updated from query_state').fetchall(),
+        )
+
+    def test_shared_reviews_processed_once(self):
+        qa = self._write_query('a', 'topic:a')
+        qb = self._write_query('b', 'topic:b\nOR topic:c')
+        qc = self._write_query('c', 'topic:a')
+        columns, summary = self._run(qa, qb, qc)
+        self.assertEqual([(qa, 1, 4), (qb, 1, 4), (qc, 1, 4)], summary)
+        # Each distinct query runs once, only asking for the IDs.
+        self.assertEqual(
+            ['full', 'ids-only', 'ids-only'],
+            sorted(c[1]['profile'] for c in self.query_changes.call_args_list),
+        )
+        # The shared review is fetched once, and the unofficial one
+        # not at all.
+        self.assertEqual(['change:561507'], self.fetched)
+        # The memberships are looked up once, in one batch.
+        self.query_members.assert_called_once()
+        with open(os.path.join(self.tmpdir, 'b.txt'),
+                  'r', encoding='utf-8') as f:
+            self.assertEqual('# QUERY: topic:b OR topic:c\n561507\n',
+                             f.read())
+
+    def test_include_unofficial(self):
+        qb = self._write_query('b', 'topic:b\nOR topic:c')
+        columns, summary = self._run(qb, include_unofficial=True)
+        self.assertEqual([(qb, 2, 8)], summary)
+        self.assertEqual(['change:561507 OR change:1'], self.fetched)
+        with open(os.path.join(self.tmpdir, 'b.dat'),
+                  'r', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(
+            {'yes', 'no'}, set(r['Official'] for r in rows))
+
+    def test_cached_reviews_reused(self):
+        qa = self._write_query('a', 'topic:a')
+        self._run(qa)
+        del self.fetched[:]
+        columns, summary = self._run(qa)
+        self.assertEqual([(qa, 1, 4)], summary)
+        self.assertEqual([], self.fetched)
+
+    def test_reviews_cached_by_other_commands(self):
+        # "contributions list" caches reviews under their string IDs.
+        gerrit.ReviewFactory(self.app.cache).add(
+            '561507', copy.deepcopy(_data_561507))
+        qa = self._write_query('a', 'topic:a')
+        columns, summary = self._run(qa)
+        self.assertEqual([(qa, 1, 4)], summary)
+        self.assertEqual([], self.fetched)
+
+    def test_replaces_db(self):
+        qa = self._write_query('a', 'topic:a')
+        self._run(qa)
+        self._run(qa)
+        db = sqlite3.connect(os.path.join(self.tmpdir, 'a.db'))
+        self.assertEqual(
+            4, db.execute('select count(*) from contribution').fetchone()[0])
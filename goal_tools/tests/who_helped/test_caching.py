@@ -11,6 +11,7 @@
 # under the License.
 
 import os.path
+import shelve
 
 from goal_tools import caching
 from goal_tools.tests import base
@@ -39,3 +40,71 @@ class TestCaching(base.TestCase):
             self.c.__getitem__,
             ('a', 'b'),
         )
+
+    def test_del_item(self):
+        self.c[('a', 'b')] = 'cd'
+        del self.c[('a', 'b')]
+        self.assertNotIn(('a', 'b'), self.c)
+
+    def test_del_item_missing(self):
+        del self.c[('a', 'b')]
+        self.assertNotIn(('a', 'b'), self.c)
+
+    def test_kinds_are_separate(self):
+        self.c[('a', 'b')] = 'cd'
+        self.assertNotIn(('b', 'b'), self.c)
+        self.assertNotIn(('a', 'a'), self.c)
+
+    def test_replace(self):
+        self.c[('a', 'b')] = 'cd'
+        self.c[('a', 'b')] = 'ef'
+        self.assertEqual('ef', self.c[('a', 'b')])
+
+    def test_structured_value(self):
+        value = {'labels': {'Code-Review': {'all': [{'value': 2}]}}}
+        self.c[('review', '12345')] = value
+        self.assertEqual(value, self.c[('review', '12345')])
+
+    def test_update(self):
+        self.c.update([
+            (('a', 'b'), 1),
+            (('a', 'c'), 2),
+        ])
+        self.assertEqual(1, self.c[('a', 'b')])
+        self.assertEqual(2, self.c[('a', 'c')])
+
+    def test_persists(self):
+        self.c[('a', 'b')] = 'cd'
+        self.c.close()
+        c = caching.Cache(os.path.join(self.tmpdir, 'cache.db'))
+        self.assertEqual('cd', c[('a', 'b')])
+        c.close()
+
+    def test_batched_commit(self):
+        filename = os.path.join(self.tmpdir, 'batch.db')
+        c = caching.Cache(filename, batch_size=2)
+        c[('a', 'b')] = 1
+        self.assertEqual(1, c._pending)
+        c[('a', 'c')] = 2
+        self.assertEqual(0, c._pending)
+        c.close()
+
+
+class TestMigrateShelve(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.shelve_name = os.path.join(self.tmpdir, 'old.db')
+        with shelve.open(self.shelve_name) as shelf:
+            shelf['review:12345'] = {'status': 'MERGED'}
+            shelf['member:doug@doughellmann.com'] = {'first_name': 'Doug'}
+        self.c = caching.Cache(os.path.join(self.tmpdir, 'cache.db'))
+
+    def test_migrate(self):
+        count = caching.migrate_shelve(self.shelve_name, self.c)
+        self.assertEqual(2, count)
+        self.assertEqual({'status': 'MERGED'}, self.c[('review', '12345')])
+        self.assertEqual(
+            {'first_name': 'Doug'},
+            self.c[('member', 'doug@doughellmann.com')],
+        )
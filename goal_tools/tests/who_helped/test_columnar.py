@@ -0,0 +1,290 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import collections
+import csv
+import itertools
+import os
+import random
+from unittest import mock
+
+from goal_tools.tests import base
+from goal_tools.who_helped import columnar
+from goal_tools.who_helped import contributions
+
+
+def _reference_count_distinct(by_names, to_count, data_source):
+    # The row-at-a-time implementation the columnar version replaced.
+    counts = collections.defaultdict(set)
+    for row in data_source:
+        by_key = tuple(row[by] for by in by_names)
+        count_key = tuple(row[c] for c in (to_count or row.keys()))
+        counts[by_key].add(count_key)
+    return {k: len(v) for k, v in counts.items()}
+
+
+def _random_rows(n, seed=1234):
+    r = random.Random(seed)
+    for i in range(n):
+        yield {
+            name: '{} {}'.format(name, r.randint(0, 5))
+            for name in contributions._COLUMNS
+        }
+
+
+class TestColumn(base.TestCase):
+
+    def test_encode(self):
+        t = columnar.Table.from_rows(['a'], [('x',), ('y',), ('x',)])
+        col = t.column('a')
+        self.assertEqual(['x', 'y'], col.values)
+        self.assertEqual([0, 1, 0], list(col.codes))
+        self.assertEqual(['x', 'y', 'x'], list(col))
+        self.assertEqual('y', col[1])
+
+
+class TestTable(base.TestCase):
+
+    _data = [
+        {'a': 'A', 'b': 'B', 'c': 'C', 'd': 'D'},
+        {'a': 'A', 'b': 'C', 'c': 'D', 'd': 'D'},
+    ]
+
+    def test_from_dicts(self):
+        t = columnar.Table.from_dicts(self._data)
+        self.assertEqual(['a', 'b', 'c', 'd'], t.names)
+        self.assertEqual(2, len(t))
+        self.assertEqual(
+            [('A', 'B', 'C', 'D'), ('A', 'C', 'D', 'D')],
+            list(t.rows()),
+        )
+
+    def test_from_dicts_subset(self):
+        t = columnar.Table.from_dicts(self._data, ['b'])
+        self.assertEqual(['b'], t.names)
+        self.assertEqual([('B',), ('C',)], list(t.rows()))
+
+    def test_from_dicts_empty(self):
+        t = columnar.Table.from_dicts([], ['a'])
+        self.assertEqual(0, len(t))
+        self.assertEqual({}, t.count_distinct(['a'], []))
+
+    def test_from_rows_chunks(self):
+        self.patch(columnar, 'CHUNK_SIZE', 2)
+        rows = [(str(i % 3), str(i)) for i in range(7)]
+        t = columnar.Table.from_rows(['x', 'y'], rows)
+        self.assertEqual(rows, list(t.rows()))
+
+    def test_count_distinct_matches_reference(self):
+        data = list(_random_rows(500))
+        names = ['Organization', 'Team', 'Role', 'Name', 'Date']
+        t = columnar.Table.from_dicts(data)
+        for n_by in (1, 2):
+            for by_names in itertools.permutations(names, n_by):
+                for n_count in (0, 1, 2):
+                    for to_count in itertools.combinations(names, n_count):
+                        expected = _reference_count_distinct(
+                            by_names, to_count, data)
+                        actual = t.count_distinct(by_names, to_count)
+                        self.assertEqual(
+                            expected, actual,
+                            'by {} count {}'.format(by_names, to_count),
+                        )
+
+    def test_count_rows_with_row_ids(self):
+        data = list(_random_rows(500))
+        t = columnar.Table.from_dicts(data, ['Team', 'Name'], row_ids=True)
+        for by_names in (['Team'], ['Team', 'Name']):
+            self.assertEqual(
+                _reference_count_distinct(by_names, [], data),
+                t.count_distinct(by_names, []),
+            )
+
+    def test_concat(self):
+        t1 = columnar.Table.from_rows(['a', 'b'], [('x', '1'), ('y', '2')])
+        t2 = columnar.Table.from_rows(['a', 'b'], [('z', '1'), ('x', '3')])
+        t = columnar.Table.concat([t1, t2])
+        self.assertEqual(
+            [('x', '1'), ('y', '2'), ('z', '1'), ('x', '3')],
+            list(t.rows()),
+        )
+        self.assertEqual(['x', 'y', 'z'], t.column('a').values)
+
+    def test_concat_mismatch(self):
+        t1 = columnar.Table.from_rows(['a'], [('x',)])
+        t2 = columnar.Table.from_rows(['b'], [('x',)])
+        self.assertRaises(ValueError, columnar.Table.concat, [t1, t2])
+
+    def test_where(self):
+        calls = []
+
+        def pred(v):
+            calls.append(v)
+            return v != 'B'
+
+        t = columnar.Table.from_dicts(self._data * 3).where('b', pred)
+        self.assertEqual([('A', 'C', 'D', 'D')] * 3, list(t.rows()))
+        self.assertEqual(['B', 'C'], calls)
+
+    def test_filter(self):
+        rows = [(a, b) for a in 'xyz' for b in '123']
+        t = columnar.Table.from_rows(['a', 'b'], rows)
+        t = t.filter({'a': lambda v: v != 'y', 'b': lambda v: v > '1'})
+        self.assertEqual(
+            [('x', '2'), ('x', '3'), ('z', '2'), ('z', '3')],
+            list(t.rows()),
+        )
+
+    def test_filter_copies_columns_when_used(self):
+        t = columnar.Table.from_dicts(self._data, row_ids=True)
+        t = t.filter({'b': lambda v: v == 'C'})
+        self.assertIsNone(t.column('a')._codes)
+        self.assertEqual(['C'], list(t.column('b')))
+        self.assertIsNone(t.column('a')._codes)
+        self.assertEqual([1], list(t.row_ids))
+
+    def test_filter_keeps_all(self):
+        t = columnar.Table.from_dicts(self._data)
+        self.assertIs(t, t.filter({'a': lambda v: True}))
+
+    def test_filter_keeps_none(self):
+        t = columnar.Table.from_dicts(self._data)
+        t = t.filter({'a': lambda v: True, 'b': lambda v: False})
+        self.assertEqual(0, len(t))
+
+    def test_map_values_merges(self):
+        t = columnar.Table.from_dicts(self._data, row_ids=True)
+        t = t.map_values('b', lambda v: 'X')
+        self.assertEqual(['X'], t.column('b').values)
+        self.assertEqual({('A',): 1}, t.count_distinct(['a'], ['b']))
+        self.assertEqual({('A',): 2}, t.count_distinct(['a'], []))
+
+    def test_distinct(self):
+        t = columnar.Table.from_dicts(self._data)
+        self.assertEqual({('A', 'D')}, t.distinct(['a', 'd']))
+        self.assertEqual({('B',), ('C',)}, t.distinct(['b']))
+
+    def test_dicts(self):
+        t = columnar.Table.from_dicts(self._data)
+        self.assertEqual(self._data, list(t.dicts()))
+
+
+class TestStorage(base.TestCase):
+
+    _rows = [
+        ('1', 'owner', '2018-04-19 12:57:36'),
+        ('2', 'reviewer', '2018-04-20 01:02:03'),
+        ('1', 'reviewer', '2018-04-19 12:57:36'),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmpdir, 'contributions.dat')
+        self._write(self._rows)
+
+    def _write(self, rows):
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Review', 'Role', 'Date'])
+            writer.writerows(rows)
+
+    def test_save_and_load(self):
+        t = columnar.read_csv(self.filename)
+        dirname = columnar.sidecar_name(self.filename)
+        columnar.save(t, dirname, source=self.filename)
+        loaded = columnar.load(dirname)
+        self.assertEqual(['Review', 'Role', 'Date'], loaded.names)
+        self.assertEqual(self._rows, list(loaded.rows()))
+        self.assertIsInstance(loaded.column('Date').values,
+                              columnar._EpochValues)
+        self.assertEqual(
+            {('reviewer',): 2, ('owner',): 1},
+            loaded.count_distinct(['Role'], ['Review']),
+        )
+        self.assertIsNotNone(loaded.row_ids)
+        self.assertEqual(
+            {('1',): 2, ('2',): 1},
+            loaded.count_distinct(['Review'], []),
+        )
+
+    def test_blank_and_short_rows(self):
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            f.write('Review,Role,Date\n1,owner,2018-04-19 12:57:36\n\n2\n')
+        with open(self.filename, 'r', encoding='utf-8', newline='') as f:
+            expected = [tuple(r.values()) for r in csv.DictReader(f)]
+        t = columnar.read_csv(self.filename)
+        self.assertEqual(
+            [('1', 'owner', '2018-04-19 12:57:36'), ('2', None, None)],
+            expected,
+        )
+        self.assertEqual(expected, list(t.rows()))
+        columnar.load_file(self.filename)
+        t = columnar.load_file(self.filename)
+        self.assertEqual(expected, list(t.rows()))
+
+    def test_dates_not_round_tripping_kept_as_strings(self):
+        self._write([('1', 'owner', '2018-04-19T12:57:36')])
+        dirname = columnar.sidecar_name(self.filename)
+        columnar.save(columnar.read_csv(self.filename), dirname)
+        loaded = columnar.load(dirname)
+        self.assertEqual(['2018-04-19T12:57:36'],
+                         list(loaded.column('Date')))
+
+    def test_save_empty(self):
+        self._write([])
+        dirname = columnar.sidecar_name(self.filename)
+        columnar.save(columnar.read_csv(self.filename), dirname)
+        self.assertEqual(0, len(columnar.load(dirname)))
+
+    def test_load_file_creates_cache(self):
+        t = columnar.load_file(self.filename)
+        self.assertEqual(self._rows, list(t.rows()))
+        dirname = columnar.sidecar_name(self.filename)
+        self.assertTrue(columnar.is_current(dirname, self.filename))
+        with mock.patch.object(columnar, 'read_csv') as read_csv:
+            t = columnar.load_file(self.filename)
+        read_csv.assert_not_called()
+        self.assertEqual(self._rows, list(t.rows()))
+
+    def test_load_file_without_cache(self):
+        columnar.load_file(self.filename, use_cache=False)
+        self.assertFalse(
+            os.path.exists(columnar.sidecar_name(self.filename)))
+
+    def test_touched_but_unchanged(self):
+        columnar.load_file(self.filename)
+        st = os.stat(self.filename)
+        os.utime(self.filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10))
+        dirname = columnar.sidecar_name(self.filename)
+        self.assertTrue(columnar.is_current(dirname, self.filename))
+        with mock.patch.object(columnar, '_file_hash') as file_hash:
+            self.assertTrue(columnar.is_current(dirname, self.filename))
+        file_hash.assert_not_called()
+
+    def test_changed_contents_rebuild(self):
+        columnar.load_file(self.filename)
+        new_rows = [('3', 'owner', '2018-05-01 00:00:00')]
+        self._write(new_rows)
+        dirname = columnar.sidecar_name(self.filename)
+        self.assertFalse(columnar.is_current(dirname, self.filename))
+        t = columnar.load_file(self.filename)
+        self.assertEqual(new_rows, list(t.rows()))
+        self.assertEqual(new_rows, list(columnar.load(dirname).rows()))
+
+    def test_same_size_changed_contents(self):
+        columnar.load_file(self.filename)
+        self._write([(r[0], r[1], r[2].replace('2018', '2019'))
+                     for r in self._rows])
+        st = os.stat(self.filename)
+        os.utime(self.filename, ns=(st.st_atime_ns, st.st_mtime_ns + 10))
+        dirname = columnar.sidecar_name(self.filename)
+        self.assertFalse(columnar.is_current(dirname, self.filename))
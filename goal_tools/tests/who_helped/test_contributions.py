@@ -0,0 +1,109 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import csv
+import datetime
+import os.path
+from unittest import mock
+
+from goal_tools import gerrit
+from goal_tools import organizations
+from goal_tools.tests import base
+from goal_tools.who_helped import columnar
+from goal_tools.who_helped import contributions
+
+
+class TestWriteDat(base.TestCase):
+
+    def test_write(self):
+        filename = os.path.join(self.tmpdir, 'contributions.dat')
+        row = (
+            561507, 'https://review.openstack.org/561507/', 'master',
+            'openstack/releases', 'Release Management', 'yes', 'owner',
+            'Doug Hellmann', 'doug@doughellmann.com',
+            contributions.DateColumn(
+                datetime.datetime(2018, 4, 19, 12, 57, 36)),
+            'Red Hat',
+        )
+        contributions.write_dat(filename, [row])
+        with open(filename, 'r', encoding='utf-8') as f:
+            expected = list(csv.DictReader(f))
+        self.assertEqual('2018-04-19 12:57:36', expected[0]['Date'])
+        self.assertEqual('561507', expected[0]['Review'])
+        dirname = columnar.sidecar_name(filename)
+        self.assertTrue(columnar.is_current(dirname, filename))
+        self.assertEqual(expected, list(columnar.load(dirname).dicts()))
+
+
+class TestOrganizationResolver(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.member = mock.Mock()
+        self.member.find_affiliation.return_value.organization = 'Red Hat'
+        self.members = mock.Mock()
+        self.members.fetch.side_effect = lambda email: (
+            self.member if email == 'doug@example.com' else None
+        )
+        self.resolver = contributions.OrganizationResolver(
+            self.members,
+            organizations.Organizations([
+                {'company_name': 'Red Hat, Inc.', 'aliases': ['Red Hat']},
+                {'company_name': 'Acme', 'domains': ['acme.com']},
+            ]),
+        )
+
+    def _participant(self, email, *when):
+        return gerrit.Participant(
+            'owner', 'Someone', email, datetime.datetime(*when))
+
+    def test_member(self):
+        p = self._participant('doug@example.com', 2018, 4, 19, 12)
+        self.assertEqual('Red Hat, Inc.', self.resolver(p))
+
+    def test_email_domain(self):
+        p = self._participant('someone@acme.com', 2018, 4, 19, 12)
+        self.assertEqual('Acme', self.resolver(p))
+
+    def test_unknown(self):
+        p = self._participant('someone@nowhere.com', 2018, 4, 19, 12)
+        self.assertEqual('*unknown', self.resolver(p))
+
+    def test_no_affiliation(self):
+        self.member.find_affiliation.return_value = None
+        p = self._participant('doug@example.com', 2018, 4, 19, 12)
+        self.assertEqual('*unknown', self.resolver(p))
+
+    def test_no_date(self):
+        member = gerrit.Participant('owner', 'Doug', 'doug@example.com',
+                                    None)
+        other = gerrit.Participant('owner', 'Someone', 'someone@acme.com',
+                                   None)
+        self.assertEqual('*unknown', self.resolver(member))
+        self.assertEqual('*unknown', self.resolver(member))
+        self.assertEqual('Acme', self.resolver(other))
+        self.member.find_affiliation.assert_not_called()
+        self.assertEqual(1, self.resolver.hits)
+
+    def test_same_day_remembered(self):
+        self.resolver(self._participant('doug@example.com', 2018, 4, 19, 1))
+        self.resolver(self._participant('doug@example.com', 2018, 4, 19, 23))
+        self.assertEqual(1, self.member.find_affiliation.call_count)
+        self.assertEqual(1, self.resolver.hits)
+        self.assertEqual(1, self.resolver.misses)
+
+    def test_other_day_looked_up(self):
+        self.resolver(self._participant('doug@example.com', 2018, 4, 19, 1))
+        self.resolver(self._participant('doug@example.com', 2018, 4, 20, 1))
+        self.assertEqual(2, self.member.find_affiliation.call_count)
+        self.assertEqual(0, self.resolver.hits)
+        self.assertEqual(2, self.resolver.misses)
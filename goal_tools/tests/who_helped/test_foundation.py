@@ -14,6 +14,7 @@ import copy
 import datetime
 import json
 import pkgutil
+import random
 from unittest import mock
 
 from goal_tools import foundation
@@ -123,6 +124,101 @@ class TestFoundationMember(base.TestCase):
         )
 
 
+class TestAffiliationIndex(base.TestCase):
+
+    def _ts(self, *args):
+        return int(
+            (datetime.datetime(*args) - datetime.datetime(1970, 1, 1))
+            .total_seconds()
+        )
+
+    def _member(self, ranges):
+        return foundation.Member('fake@example.com', {
+            'first_name': 'A',
+            'last_name': 'B',
+            'affiliations': [
+                {
+                    'start_date': start,
+                    'end_date': end,
+                    'is_current': current,
+                    'organization': {'name': str(i)},
+                }
+                for i, (start, end, current) in enumerate(ranges)
+            ],
+        })
+
+    def _reference(self, member, when):
+        # The linear scan the index replaced.
+        candidates = [a for a in member.affiliations if a.active(when)]
+        if candidates:
+            return candidates[-1].organization
+        return None
+
+    def _org(self, member, when):
+        a = member.find_affiliation(when)
+        return a.organization if a else None
+
+    def test_last_candidate_wins(self):
+        m = self._member([
+            (self._ts(2015, 1, 1), None, True),
+            (self._ts(2016, 1, 1), self._ts(2016, 6, 30), False),
+            (self._ts(2016, 3, 1), self._ts(2016, 3, 31), False),
+        ])
+        self.assertEqual('0', self._org(m, datetime.datetime(2015, 6, 1)))
+        self.assertEqual('1', self._org(m, datetime.datetime(2016, 2, 1)))
+        self.assertEqual('2', self._org(m, datetime.datetime(2016, 3, 1)))
+        self.assertEqual('2', self._org(m, datetime.datetime(2016, 3, 31)))
+        self.assertEqual('1', self._org(m, datetime.datetime(2016, 4, 1)))
+        self.assertEqual('0', self._org(m, datetime.datetime(2016, 7, 1)))
+        self.assertIsNone(self._org(m, datetime.datetime(2014, 12, 31)))
+
+    def test_undated_always_active(self):
+        m = self._member([
+            (self._ts(2015, 1, 1), self._ts(2015, 12, 31), False),
+            (None, None, False),
+        ])
+        self.assertEqual('1', self._org(m, datetime.datetime(2015, 6, 1)))
+        self.assertEqual('1', self._org(m, datetime.datetime(2010, 6, 1)))
+
+    def test_no_affiliations(self):
+        m = self._member([])
+        self.assertIsNone(m.find_affiliation(datetime.datetime(2016, 1, 1)))
+
+    def test_index_built_once(self):
+        m = self._member([
+            (self._ts(2015, 1, 1), self._ts(2015, 12, 31), False),
+        ])
+        with mock.patch.object(foundation.Affiliation, 'start_date',
+                               new_callable=mock.PropertyMock) as sd:
+            sd.return_value = datetime.datetime(2015, 1, 1)
+            for day in range(1, 20):
+                m.find_affiliation(datetime.datetime(2015, 2, day))
+        self.assertEqual(1, sd.call_count)
+
+    def test_matches_linear_scan(self):
+        r = random.Random(42)
+        base_day = datetime.datetime(2012, 1, 1)
+        for _ in range(50):
+            ranges = []
+            for _ in range(r.randint(1, 6)):
+                start = r.choice([None, r.randint(0, 2000)])
+                end = r.choice([None, r.randint(0, 2000)])
+                ranges.append((
+                    self._ts(2012, 1, 1) + start * 86400
+                    if start is not None else None,
+                    self._ts(2012, 1, 1) + end * 86400
+                    if end is not None else None,
+                    r.choice([True, False]),
+                ))
+            m = self._member(ranges)
+            for day in range(-10, 2010, 7):
+                when = base_day + datetime.timedelta(days=day, hours=13)
+                self.assertEqual(
+                    self._reference(m, when), self._org(m, when),
+                    '{} on {}'.format(ranges, when),
+                )
+
+
 class TestFetchMember(base.TestCase):
 
     def setUp(self):
@@ -146,3 +242,91 @@ class TestFetchMember(base.TestCase):
             results = self.f.fetch('doug@doughellmann.com')
         self.assertIn(('member', 'doug@doughellmann.com'), self.cache)
         self.assertEqual(_member_data, results._data)
+
+    def test_not_found_cached(self):
+        with mock.patch('goal_tools.foundation.lookup_member') as f:
+            f.return_value = None
+            self.assertIsNone(self.f.fetch('nobody@example.com'))
+        self.assertIn(('member', 'nobody@example.com'), self.cache)
+        f2 = foundation.MemberFactory(self.cache)
+        with mock.patch('goal_tools.foundation.lookup_member') as f:
+            f.side_effect = AssertionError('should not be called')
+            self.assertIsNone(f2.fetch('nobody@example.com'))
+
+    def test_not_found_expires(self):
+        with mock.patch('goal_tools.foundation.lookup_member') as f:
+            f.return_value = None
+            self.f.fetch('nobody@example.com')
+        f2 = foundation.MemberFactory(self.cache, negative_ttl=-1)
+        with mock.patch('goal_tools.foundation.lookup_member') as f:
+            f.return_value = _member_data
+            results = f2.fetch('nobody@example.com')
+        self.assertEqual(_member_data, results._data)
+        self.assertEqual(_member_data,
+                         self.cache[('member', 'nobody@example.com')])
+
+    def test_prefetch(self):
+        self.cache[('member', 'doug@doughellmann.com')] = _member_data
+        with mock.patch('goal_tools.foundation.lookup_members') as f:
+            f.return_value = {'a@example.com': None}
+            self.f.prefetch(['doug@doughellmann.com', 'a@example.com',
+                             'a@example.com'])
+        f.assert_called_once_with(['a@example.com'])
+        with mock.patch('goal_tools.foundation.lookup_member') as f:
+            f.side_effect = AssertionError('should not be called')
+            self.assertIsNone(self.f.fetch('a@example.com'))
+
+
+class TestLookupMembers(base.TestCase):
+
+    def _lookup(self, emails, members):
+        "Look up emails against a directory of members by email."
+        requests = []
+
+        def query_members(batch):
+            requests.append(list(batch))
+            return [members[e] for e in batch if e in members]
+
+        with mock.patch('goal_tools.foundation._query_members',
+                        side_effect=query_members):
+            results = foundation.lookup_members(emails)
+        return results, requests
+
+    def test_none_found(self):
+        emails = ['{}@example.com'.format(i) for i in range(250)]
+        results, requests = self._lookup(emails, {})
+        self.assertEqual(dict.fromkeys(emails), results)
+        self.assertEqual(3, len(requests))
+
+    def test_matched_by_email(self):
+        emails = ['{}@example.com'.format(i) for i in range(100)]
+        members = {
+            '7@example.com': {'id': 7, 'email': '7@Example.com'},
+            '42@example.com': {'id': 42, 'second_email': '42@example.com'},
+        }
+        results, requests = self._lookup(emails, members)
+        self.assertEqual(1, len(requests))
+        self.assertEqual(members['7@example.com'], results['7@example.com'])
+        self.assertEqual(members['42@example.com'],
+                         results['42@example.com'])
+        self.assertIsNone(results['8@example.com'])
+
+    def test_split_without_email(self):
+        emails = ['{}@example.com'.format(i) for i in range(100)]
+        members = {'7@example.com': {'id': 7}}
+        results, requests = self._lookup(emails, members)
+        self.assertEqual({'id': 7}, results['7@example.com'])
+        self.assertEqual(
+            [None] * 99,
+            [v for k, v in results.items() if k != '7@example.com'],
+        )
+        self.assertEqual(100, len(results))
+        self.assertLess(len(requests), 20)
+
+    def test_mostly_members_one_at_a_time(self):
+        emails = ['{}@example.com'.format(i) for i in range(8)]
+        members = {e: {'id': e} for e in emails[:6]}
+        results, requests = self._lookup(emails, members)
+        self.assertEqual(1 + 8, len(requests))
+        self.assertEqual({'id': emails[0]}, results[emails[0]])
+        self.assertIsNone(results[emails[7]])
@@ -12,9 +12,12 @@
 
 import datetime
 import json
+import copy
 import os.path
+import pickle
 import pkgutil
 import textwrap
+import timeit
 from unittest import mock
 
 from goal_tools import gerrit
@@ -35,6 +38,46 @@ _data_566433 = json.loads(
 )
 
 
+def _strptime_to_datetime(s):
+    # The implementation _to_datetime() replaced.
+    if s is None:
+        return None
+    s = s.rpartition('.')[0]
+    return datetime.datetime.strptime(s, '%Y-%m-%d %H:%M:%S')
+
+
+class TestToDatetime(base.TestCase):
+
+    _SAMPLES = [
+        '2018-04-10 06:07:47.000000000',
+        '2018-03-22 16:05:45.000000000',
+        '2016-02-29 00:00:00.123456789',
+        '2018-12-31 23:59:59.999999999',
+    ]
+
+    def test_none(self):
+        self.assertIsNone(gerrit._to_datetime(None))
+
+    def test_matches_strptime(self):
+        for s in self._SAMPLES:
+            self.assertEqual(_strptime_to_datetime(s), gerrit._to_datetime(s))
+
+    def test_memo(self):
+        s = '2001-02-03 04:05:06.000000000'
+        self.assertIs(gerrit._to_datetime(s), gerrit._to_datetime(s))
+
+    def test_benchmark(self):
+        # Compare the parser, without the memo, to strptime.
+        parse = gerrit._parse_timestamp.__wrapped__
+        s = self._SAMPLES[0]
+        number = 2000
+        old = min(timeit.repeat(lambda: _strptime_to_datetime(s),
+                                number=number, repeat=3))
+        new = min(timeit.repeat(lambda: parse(s),
+                                number=number, repeat=3))
+        self.assertLess(new, old)
+
+
 class TestParseReviewLists(base.TestCase):
 
     def setUp(self):
@@ -103,6 +146,9 @@ class TestReview(base.TestCase):
             self.rev.created,
         )
 
+    def test_updated(self):
+        self.assertEqual('2018-04-19 12:57:36.000000000', self.rev2.updated)
+
     def test_is_merged(self):
         self.assertFalse(self.rev.is_merged)
         self.assertTrue(self.rev2.is_merged)
@@ -191,7 +237,7 @@ class TestFetchReview(base.TestCase):
     def setUp(self):
         super().setUp()
         self.cache = {}
-        self.f = gerrit.ReviewFactory(self.cache)
+        self.f = gerrit.ReviewFactory(self.cache, keep_raw=True)
 
     def test_not_in_cache_new(self):
         with mock.patch('goal_tools.gerrit.query_gerrit') as f:
@@ -215,3 +261,454 @@ class TestFetchReview(base.TestCase):
             results = self.f.fetch('561507')
         self.assertIn(('review', '561507'), self.cache)
         self.assertEqual(_data_561507, results._data)
+
+
+class TestCompactReview(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.rev = gerrit.Review('561507', copy.deepcopy(_data_561507))
+        self.compact = gerrit.CompactReview.from_change(
+            '561507', copy.deepcopy(_data_561507))
+
+    def test_properties(self):
+        for name in ['id', 'url', 'created', 'updated', 'is_merged',
+                     'project', 'branch', 'owner']:
+            self.assertEqual(getattr(self.rev, name),
+                             getattr(self.compact, name), name)
+
+    def test_participants(self):
+        for name in ['participants', 'reviewers', 'uploaders', 'plus_ones']:
+            self.assertEqual(list(getattr(self.rev, name)),
+                             list(getattr(self.compact, name)), name)
+
+    def test_no_dict(self):
+        self.assertFalse(hasattr(self.compact, '__dict__'))
+
+    def test_pickle(self):
+        copied = pickle.loads(pickle.dumps(self.compact))
+        self.assertEqual(list(self.compact.participants),
+                         list(copied.participants))
+        self.assertEqual('full', copied.profile)
+
+    def test_smaller(self):
+        raw = pickle.dumps(_data_561507, pickle.HIGHEST_PROTOCOL)
+        compact = pickle.dumps(self.compact, pickle.HIGHEST_PROTOCOL)
+        self.assertLess(len(compact) * 5, len(raw))
+
+    def test_fetch_compact(self):
+        cache = {}
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = copy.deepcopy(_data_561507)
+            review = gerrit.ReviewFactory(cache).fetch('561507')
+        self.assertIsInstance(review, gerrit.CompactReview)
+        self.assertIsNone(review.raw_change)
+        self.assertIsInstance(cache[('review', '561507')],
+                              gerrit.CompactReview)
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = AssertionError('should not be called')
+            again = gerrit.ReviewFactory(cache).fetch('561507')
+        self.assertEqual(list(review.participants),
+                         list(again.participants))
+
+    def test_id_from_request(self):
+        cache = {}
+        gerrit.ReviewFactory(cache).add('561507', copy.deepcopy(_data_561507))
+        review = gerrit.ReviewFactory(cache).fetch(561507)
+        self.assertEqual(561507, review.id)
+        self.assertEqual('561507', cache[('review', '561507')].id)
+
+    def test_repr(self):
+        text = repr(self.compact)
+        self.assertTrue(text.startswith("CompactReview(id='561507', "))
+        self.assertIn("status='MERGED'", text)
+        self.assertIn('participants=(', text)
+
+
+class TestQueryProfiles(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = {}
+
+    def _thin(self):
+        return {
+            '_number': 561507,
+            'status': 'MERGED',
+            'project': 'openstack/releases',
+        }
+
+    def test_has_profile_defaults_to_full(self):
+        self.assertTrue(gerrit.has_profile({}, 'full'))
+        self.assertTrue(gerrit.has_profile(
+            {gerrit.PROFILE_KEY: 'labels'}, 'ids-only'))
+        self.assertFalse(gerrit.has_profile(
+            {gerrit.PROFILE_KEY: 'labels'}, 'full'))
+
+    def test_cache_records_profile(self):
+        gerrit.cache_review(561507, self._thin(), self.cache, 'ids-only')
+        self.assertEqual(
+            'ids-only', self.cache[('review', '561507')].profile)
+
+    def test_cache_does_not_downgrade(self):
+        full = dict(_data_561507)
+        gerrit.cache_review(561507, full, self.cache, keep_raw=True)
+        gerrit.cache_review(561507, self._thin(), self.cache, 'ids-only')
+        self.assertIs(full, self.cache[('review', '561507')])
+
+    def test_fetch_upgrades(self):
+        gerrit.cache_review(561507, self._thin(), self.cache, 'ids-only')
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = dict(_data_561507)
+            review = gerrit.ReviewFactory(self.cache).fetch('561507')
+        f.assert_called_once_with(
+            'changes/561507/detail',
+            params={'o': gerrit.QUERY_OPTIONS},
+        )
+        self.assertEqual(4, len(list(review.participants)))
+        self.assertEqual(
+            'full', self.cache[('review', '561507')].profile)
+
+    def test_fetch_thin_profile_uses_richer_cache(self):
+        gerrit.cache_review(561507, dict(_data_561507), self.cache)
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = AssertionError('should not be called')
+            gerrit.ReviewFactory(self.cache, 'labels').fetch('561507')
+
+    def test_fetch_many_upgrades(self):
+        gerrit.cache_review(561507, self._thin(), self.cache, 'ids-only')
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [dict(_data_561507)]
+            reviews = list(gerrit.ReviewFactory(self.cache).fetch_many(
+                ['561507'], workers=2))
+        f.assert_called_once()
+        self.assertEqual(
+            gerrit.QUERY_OPTIONS, f.call_args[1]['params']['o'])
+        self.assertEqual(4, len(list(reviews[0].participants)))
+
+    def test_query_options(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [self._thin()]
+            list(gerrit.ReviewFactory(self.cache, 'ids-only').query('q'))
+        self.assertEqual([], f.call_args[1]['params']['o'])
+
+
+class TestFetchManyReviews(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = {}
+        self.f = gerrit.ReviewFactory(self.cache)
+        self.responses = {
+            str(d['_number']): d
+            for d in [_data_55535, _data_561507, _data_566433]
+        }
+        self.queries = []
+
+    def _query_gerrit(self, method, params={}):
+        if method == 'changes/':
+            self.queries.append(params['q'])
+            return [
+                self.responses[term.partition(':')[-1]]
+                for term in params['q'].split(' OR ')
+                if term.partition(':')[-1] in self.responses
+            ]
+        return self.responses[method.split('/')[1]]
+
+    def test_serial(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = self._query_gerrit
+            results = list(self.f.fetch_many(['561507', '555353']))
+        self.assertEqual(['561507', '555353'], [r.id for r in results])
+        self.assertEqual(['change:561507 OR change:555353'], self.queries)
+
+    def test_bulk_size(self):
+        review_ids = ['566433', '555353', '561507']
+        with mock.patch('goal_tools.gerrit.BULK_SIZE', 2):
+            with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+                f.side_effect = self._query_gerrit
+                results = list(self.f.fetch_many(review_ids))
+        self.assertEqual(review_ids, [r.id for r in results])
+        self.assertEqual(
+            ['change:566433 OR change:555353', 'change:561507'],
+            self.queries,
+        )
+
+    def test_duplicates_fetched_once(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = self._query_gerrit
+            results = list(self.f.fetch_many(['555353', '555353']))
+        self.assertEqual(['555353', '555353'], [r.id for r in results])
+        self.assertEqual(['change:555353'], self.queries)
+
+    def test_missing_fetched_alone(self):
+        self.responses['I0123'] = _data_566433
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = self._query_gerrit
+            results = list(self.f.fetch_many(['555353', 'I0123']))
+        self.assertEqual(['555353', 'I0123'], [r.id for r in results])
+        self.assertEqual(['change:555353 OR change:I0123'], self.queries)
+        f.assert_called_with(
+            'changes/I0123/detail',
+            params={'o': gerrit.QUERY_OPTIONS},
+        )
+
+    def test_concurrent_keeps_order(self):
+        review_ids = ['566433', '555353', '561507'] * 5
+        with mock.patch('goal_tools.gerrit.BULK_SIZE', 2):
+            with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+                f.side_effect = self._query_gerrit
+                results = list(self.f.fetch_many(review_ids, workers=3))
+        self.assertEqual(review_ids, [r.id for r in results])
+        self.assertEqual(
+            [list(gerrit.Review(i, self.responses[i]).participants)
+             for i in review_ids],
+            [list(r.participants) for r in results],
+        )
+
+    def test_concurrent_caches_merged(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = self._query_gerrit
+            list(self.f.fetch_many(['555353', '561507'], workers=2))
+        self.assertIn(('review', '561507'), self.cache)
+        self.assertNotIn(('review', '555353'), self.cache)
+
+    def test_concurrent_cached_skips_query(self):
+        self.cache[('review', '561507')] = _data_561507
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = self._query_gerrit
+            results = list(self.f.fetch_many(['561507', '555353'], workers=2))
+        self.assertEqual(['change:555353'], self.queries)
+        self.assertEqual(['561507', '555353'], [r.id for r in results])
+
+
+class TestQueryChanges(base.TestCase):
+
+    def test_pages(self):
+        first = [{'_number': 1}, {'_number': 2, '_more_changes': True}]
+        second = [{'_number': 3}]
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = [first, second]
+            results = list(gerrit.query_changes('topic:x', batch_size=2))
+        self.assertEqual([1, 2, 3], [c['_number'] for c in results])
+        self.assertEqual(
+            [0, 2], [c[1]['params']['start'] for c in f.call_args_list])
+
+    def test_query_caches_merged(self):
+        cache = {}
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [_data_561507, _data_55535]
+            results = list(gerrit.ReviewFactory(cache).query('topic:x'))
+        self.assertEqual(
+            [561507, _data_55535['_number']], [r.id for r in results])
+        self.assertEqual([('review', '561507')], list(cache))
+
+
+class TestQueryTimeRange(base.TestCase):
+
+    def test_none(self):
+        self.assertEqual((None, None),
+                         gerrit.query_time_range('project:openstack/nova'))
+
+    def test_dates(self):
+        self.assertEqual(
+            (datetime.datetime(2018, 2, 28),
+             datetime.datetime(2018, 8, 30)),
+            gerrit.query_time_range('after:2018-02-28\nbefore:2018-08-30'),
+        )
+
+    def test_quoted_with_zone(self):
+        self.assertEqual(
+            (datetime.datetime(2018, 4, 19, 12, 57, 36), None),
+            gerrit.query_time_range(
+                '(topic:x) after:"2018-04-19 12:57:36 +0000"'),
+        )
+
+    def test_narrowest(self):
+        self.assertEqual(
+            (datetime.datetime(2018, 3, 1),
+             datetime.datetime(2018, 5, 1)),
+            gerrit.query_time_range(
+                'since:2018-01-01 after:2018-03-01 '
+                'until:2018-05-01 before:2018-06-01'),
+        )
+
+    def test_ignore_unparsable_and_negated(self):
+        self.assertEqual(
+            (None, None),
+            gerrit.query_time_range('after:yesterday -before:2018-01-01'),
+        )
+
+
+class TestSplitQuery(base.TestCase):
+
+    def test_no_range(self):
+        self.assertEqual(['topic:x'], gerrit.split_query('topic:x', 4))
+
+    def test_split(self):
+        self.assertEqual(
+            [
+                '(after:2018-01-01 before:2018-01-04) '
+                'after:"2018-01-03 00:00:00 +0000"',
+                '(after:2018-01-01 before:2018-01-04) '
+                'after:"2018-01-02 00:00:00 +0000" '
+                'before:"2018-01-03 00:00:00 +0000"',
+                '(after:2018-01-01 before:2018-01-04) '
+                'before:"2018-01-02 00:00:00 +0000"',
+            ],
+            gerrit.split_query('after:2018-01-01 before:2018-01-04', 3),
+        )
+
+    def test_open_ended(self):
+        queries = gerrit.split_query(
+            'after:2018-01-01', 2,
+            now=datetime.datetime(2018, 1, 3),
+        )
+        self.assertEqual(
+            [
+                '(after:2018-01-01) after:"2018-01-02 00:00:00 +0000"',
+                '(after:2018-01-01) before:"2018-01-02 00:00:00 +0000"',
+            ],
+            queries,
+        )
+
+
+class TestQueryChangesConcurrent(base.TestCase):
+
+    def test_merges_and_deduplicates(self):
+        results = {
+            'newer': [{'_number': 3}, {'_number': 2}],
+            'older': [{'_number': 2}, {'_number': 1}],
+        }
+        with mock.patch('goal_tools.gerrit.split_query') as split:
+            split.return_value = ['newer', 'older']
+            with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+                f.side_effect = lambda m, params: results[params['q']]
+                changes = list(gerrit.query_changes('q', workers=2))
+        self.assertEqual([3, 2, 1], [c['_number'] for c in changes])
+        split.assert_called_once_with('q', 2 * gerrit.SLICES_PER_WORKER)
+
+    def test_serial_without_range(self):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.return_value = [{'_number': 1}]
+            changes = list(gerrit.query_changes('topic:x', workers=4))
+        self.assertEqual([1], [c['_number'] for c in changes])
+        f.assert_called_once()
+
+
+class TestUpdatedSince(base.TestCase):
+
+    def test_drops_fraction(self):
+        self.assertEqual(
+            'after:"2018-04-19 12:57:36 +0000"',
+            gerrit.updated_since('2018-04-19 12:57:36.000000000'),
+        )
+
+
+class TestChangeStore(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = {}
+        self.store = gerrit.ChangeStore(self.cache, 'topic:x')
+
+    def _changes(self, results, refresh=False):
+        with mock.patch('goal_tools.gerrit.query_gerrit') as f:
+            f.side_effect = results
+            changes = self.store.changes(refresh=refresh)
+        return (changes, [c[1]['params']['q'] for c in f.call_args_list])
+
+    def test_first_run(self):
+        changes, queries = self._changes([[
+            {'_number': 1, 'updated': '2018-01-01 00:00:00.000000000'},
+            {'_number': 2, 'updated': '2018-01-02 00:00:00.000000000',
+             '_more_changes': True},
+        ], []])
+        self.assertEqual(['topic:x', 'topic:x'], queries)
+        self.assertEqual([2, 1], [c['_number'] for c in changes])
+        self.assertNotIn('_more_changes', changes[0])
+
+    def test_incremental(self):
+        self._changes([[
+            {'_number': 1, 'updated': '2018-01-01 00:00:00.000000000',
+             'status': 'NEW'},
+            {'_number': 2, 'updated': '2018-01-02 00:00:00.000000000',
+             'status': 'NEW'},
+        ]])
+        changes, queries = self._changes([[
+            {'_number': 1, 'updated': '2018-01-03 00:00:00.000000000',
+             'status': 'MERGED'},
+            {'_number': 2, 'updated': '2018-01-02 00:00:00.000000000',
+             'status': 'NEW'},
+        ]])
+        self.assertEqual(
+            ['(topic:x) after:"2018-01-02 00:00:00 +0000"'], queries)
+        self.assertEqual(
+            [(1, 'MERGED'), (2, 'NEW')],
+            [(c['_number'], c['status']) for c in changes],
+        )
+        # The next run starts from the newest change.
+        changes, queries = self._changes([[]])
+        self.assertEqual(
+            ['(topic:x) after:"2018-01-03 00:00:00 +0000"'], queries)
+        self.assertEqual(2, len(changes))
+
+    def test_refresh(self):
+        self._changes([[
+            {'_number': 1, 'updated': '2018-01-01 00:00:00.000000000'},
+        ]])
+        changes, queries = self._changes([[]], refresh=True)
+        self.assertEqual(['topic:x'], queries)
+        self.assertEqual([], changes)
+
+    def test_changes_stored_separately(self):
+        self._changes([[
+            {'_number': 1, 'updated': '2018-01-01 00:00:00.000000000'},
+            {'_number': 2, 'updated': '2018-01-02 00:00:00.000000000'},
+        ]])
+        self.assertEqual(
+            {('change-store-state', 'labels', 'all', 'topic:x'),
+             ('change-store', 'labels', 'all', 'topic:x', '1'),
+             ('change-store', 'labels', 'all', 'topic:x', '2')},
+            set(self.cache),
+        )
+
+    def test_nothing_new_not_written(self):
+        newest = {'_number': 2, 'updated': '2018-01-02 00:00:00.000000000'}
+        self._changes([[
+            {'_number': 1, 'updated': '2018-01-01 00:00:00.000000000'},
+            dict(newest),
+        ]])
+        cache = mock.MagicMock(wraps=self.cache)
+        cache.__getitem__.side_effect = self.cache.__getitem__
+        self.store = gerrit.ChangeStore(cache, 'topic:x')
+        # The change at the high-water mark comes back again.
+        changes, queries = self._changes([[dict(newest)]])
+        self.assertEqual(2, len(changes))
+        cache.__setitem__.assert_not_called()
+        cache.update.assert_not_called()
+
+    def test_only_open(self):
+        self.store = gerrit.ChangeStore(self.cache, 'topic:x',
+                                        only_open=True)
+        changes, queries = self._changes([[
+            {'_number': 1, 'updated': '2018-01-01 00:00:00.000000000',
+             'status': 'NEW'},
+            {'_number': 2, 'updated': '2018-01-02 00:00:00.000000000',
+             'status': 'NEW'},
+        ]])
+        self.assertEqual(['(topic:x) is:open'], queries)
+        changes, queries = self._changes([[
+            {'_number': 1, 'updated': '2018-01-03 00:00:00.000000000',
+             'status': 'ABANDONED'},
+        ]])
+        self.assertEqual(
+            ['(topic:x) after:"2018-01-02 00:00:00 +0000"'], queries)
+        self.assertEqual([2], [c['_number'] for c in changes])
+        self.assertNotIn(
+            ('change-store', 'labels', 'open', 'topic:x', '1'), self.cache)
+
+    def test_empty_result_not_incremental(self):
+        self._changes([[]])
+        changes, queries = self._changes([[]])
+        self.assertEqual(['topic:x'], queries)
@@ -12,6 +12,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import os
+from unittest import mock
+
 from goal_tools.tests import base
 
 from goal_tools import governance
@@ -115,3 +118,96 @@ class TestGovernance(base.TestCase):
             set(),
             self.gov.get_repo_tags('openstack/no-such-repo'),
         )
+
+
+class TestSnapshotCache(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        governance.configure(cache_dir=self.tmpdir)
+        self.addCleanup(governance.configure)
+        self.texts = {
+            governance.PROJECTS_LIST: _team_data_yaml,
+            governance.TC_LIST: (
+                'Technical Committee:\n  - repo: openstack/governance\n'),
+            governance.SIGS_LIST: _sigs_data_yaml,
+        }
+        self.requests = []
+
+    def _requester(self, url, params={}, headers={}, **kwargs):
+        self.requests.append((url, dict(headers)))
+        if headers.get('If-None-Match') == '"v1"':
+            return mock.Mock(status_code=304, headers={})
+        return mock.Mock(
+            status_code=200,
+            text=self.texts[url],
+            headers={'ETag': '"v1"'},
+        )
+
+    def _load(self):
+        with mock.patch('goal_tools.apis.requester') as r:
+            r.side_effect = self._requester
+            return governance.Governance()
+
+    def test_downloads_and_saves(self):
+        gov = self._load()
+        self.assertEqual('Release Management',
+                         gov.get_repo_owner('openstack/releases'))
+        self.assertEqual(3, len(self.requests))
+        self.assertEqual({}, self.requests[0][1])
+        self.assertEqual(
+            1, len([n for n in os.listdir(self.tmpdir)
+                    if n.endswith('.pickle')]))
+
+    def test_loaded_once_per_process(self):
+        self._load()
+        self._load()
+        self.assertEqual(3, len(self.requests))
+
+    def test_revalidates(self):
+        self._load()
+        governance.configure(cache_dir=self.tmpdir)
+        with mock.patch('goal_tools.yamlutils.load') as load:
+            load.side_effect = AssertionError('should not parse')
+            gov = self._load()
+        self.assertEqual(6, len(self.requests))
+        self.assertEqual({'If-None-Match': '"v1"'}, self.requests[-1][1])
+        self.assertEqual('Technical Committee',
+                         gov.get_repo_owner('openstack/governance'))
+
+    def test_changed_data_rebuilds_index(self):
+        self._load()
+        governance.configure(cache_dir=self.tmpdir)
+        self.texts[governance.TC_LIST] = (
+            'Technical Committee:\n  - repo: openstack/other\n')
+        with mock.patch('goal_tools.apis.requester') as r:
+            r.side_effect = lambda url, **kw: mock.Mock(
+                status_code=200, text=self.texts[url], headers={})
+            gov = governance.Governance()
+        self.assertEqual('Technical Committee',
+                         gov.get_repo_owner('openstack/other'))
+        self.assertEqual(
+            1, len([n for n in os.listdir(self.tmpdir)
+                    if n.endswith('.pickle')]))
+
+    def test_server_unavailable(self):
+        self._load()
+        governance.configure(cache_dir=self.tmpdir)
+        with mock.patch('goal_tools.apis.requester') as r:
+            r.side_effect = IOError('no network')
+            gov = governance.Governance()
+        self.assertEqual('Release Management',
+                         gov.get_repo_owner('openstack/releases'))
+
+    def test_offline(self):
+        self._load()
+        governance.configure(cache_dir=self.tmpdir, offline=True)
+        with mock.patch('goal_tools.apis.requester') as r:
+            r.side_effect = AssertionError('should not be called')
+            gov = governance.Governance()
+        self.assertEqual('Release Management',
+                         gov.get_repo_owner('openstack/releases'))
+
+    def test_offline_without_copy(self):
+        governance.configure(cache_dir=self.tmpdir, offline=True)
+        self.assertRaises(RuntimeError, governance.Governance)
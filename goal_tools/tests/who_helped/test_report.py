@@ -0,0 +1,137 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import csv
+import os.path
+from unittest import mock
+
+import fixtures
+
+from goal_tools.tests import base
+from goal_tools.tests.who_helped import test_governance
+from goal_tools.who_helped import columnar
+from goal_tools.who_helped import contributions
+from goal_tools.who_helped import summarize
+
+_ROWS = [
+    ('1', 'openstack/releases', 'Release Management', 'owner',
+     'Alice', 'Red Hat'),
+    ('1', 'openstack/releases', 'Release Management', 'reviewer',
+     'Bob', 'Example Inc'),
+    ('2', 'openstack/release-test', 'Release Management', 'owner',
+     'Carol', 'Huawei'),
+    ('3', 'openstack/nova', 'Nova', 'approver',
+     'Alice', 'Red Hat'),
+]
+
+
+def _full_row(row):
+    review, project, team, role, name, org = row
+    return (
+        review, 'https://review.openstack.org/{}/'.format(review),
+        'master', project, team, 'yes', role, name,
+        name.lower() + '@example.com', '2018-04-19 12:57:36', org,
+    )
+
+
+class TestGetContributionTable(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.filename = os.path.join(self.tmpdir, 'contributions.dat')
+        with open(self.filename, 'w', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(contributions._COLUMNS)
+            writer.writerows(_full_row(r) for r in _ROWS)
+        self.get_team_data = self.useFixture(fixtures.MockPatch(
+            'goal_tools.governance.Governance._get_team_data',
+            return_value=test_governance.TEAM_DATA,
+        )).mock
+        self.cmd = summarize.SummarizeContributions(mock.Mock(), None)
+
+    def _table(self, *args):
+        parser = self.cmd.get_parser('summarize')
+        parsed_args = parser.parse_args(list(args) + [self.filename])
+        return self.cmd.get_contribution_table(parsed_args)
+
+    def _names(self, table):
+        return sorted(table.column('Name'))
+
+    def test_no_filters(self):
+        t = self._table()
+        self.assertEqual(4, len(t))
+        self.assertTrue(
+            os.path.exists(columnar.sidecar_name(self.filename)))
+
+    def test_no_column_cache(self):
+        self._table('--no-column-cache')
+        self.assertFalse(
+            os.path.exists(columnar.sidecar_name(self.filename)))
+
+    def test_role(self):
+        t = self._table('--role', 'owner')
+        self.assertEqual(['Alice', 'Carol'], self._names(t))
+
+    def test_ignore_team(self):
+        t = self._table('--ignore-team', 'nova')
+        self.assertEqual(['Alice', 'Bob', 'Carol'], self._names(t))
+
+    def test_only_team(self):
+        t = self._table('--only-team', 'Nova')
+        self.assertEqual(['Alice'], self._names(t))
+
+    def test_only_sponsors(self):
+        t = self._table('--only-sponsors')
+        self.assertEqual(['Alice', 'Alice', 'Carol'], self._names(t))
+
+    def test_highlight_sponsors(self):
+        t = self._table('--highlight-sponsors')
+        self.assertEqual(
+            {('Red Hat',): 2, ('Huawei',): 1, ('*other',): 1},
+            t.count_distinct(['Organization'], []),
+        )
+
+    def test_ignore_tag(self):
+        t = self._table('--ignore-tag', 'asserts:stable-policy')
+        self.assertEqual(['Alice', 'Alice', 'Bob'], self._names(t))
+
+    def test_only_tag(self):
+        t = self._table('--only-tag', 'team:diverse-affiliation')
+        self.assertEqual(['Alice', 'Bob', 'Carol'], self._names(t))
+
+    def test_ignore_and_only_tag_share_governance(self):
+        t = self._table('--only-tag', 'team:diverse-affiliation',
+                        '--ignore-tag', 'asserts:stable-policy')
+        self.assertEqual(['Alice', 'Bob'], self._names(t))
+        self.get_team_data.assert_called_once_with()
+
+    def test_ignore_and_only_team(self):
+        t = self._table('--only-team', 'nova', '--only-team',
+                        'release management', '--ignore-team', 'nova')
+        self.assertEqual(['Alice', 'Bob', 'Carol'], self._names(t))
+
+    def test_combined_filters(self):
+        t = self._table('--role', 'owner', '--role', 'approver',
+                        '--only-sponsors', '--ignore-team', 'nova')
+        self.assertEqual(['Alice', 'Carol'], self._names(t))
+
+    def test_cached_matches_parsed(self):
+        expected = list(self._table('--role', 'owner').dicts())
+        actual = list(self._table('--role', 'owner').dicts())
+        self.assertEqual(expected, actual)
+
+    def test_empty_file(self):
+        with open(self.filename, 'w', encoding='utf-8'):
+            pass
+        t = self._table('--role', 'owner')
+        self.assertEqual(0, len(t))
+        self.assertEqual({}, t.count_distinct(['Organization'], []))
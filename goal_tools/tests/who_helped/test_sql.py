@@ -0,0 +1,126 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import argparse
+import copy
+import json
+import os.path
+import pkgutil
+import sqlite3
+from unittest import mock
+
+import fixtures
+
+from goal_tools import gerrit
+from goal_tools.tests import base
+from goal_tools.tests.who_helped import test_governance
+from goal_tools.who_helped import sql
+
+_data_561507 = json.loads(
+    pkgutil.get_data('goal_tools.tests.who_helped',
+                     'data/561507.json').decode('utf-8')
+)
+
+
+class TestDBCreate(base.TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db_file = os.path.join(self.tmpdir, 'test.db')
+        self.app = mock.Mock()
+        self.app.cache = {}
+        self.app.options.keep_raw_reviews = False
+        self.cmd = sql.DBCreate(self.app, None)
+        self.useFixture(fixtures.MockPatch(
+            'goal_tools.governance.Governance._get_team_data',
+            return_value=test_governance.TEAM_DATA,
+        ))
+        self.useFixture(fixtures.MockPatch(
+            'goal_tools.foundation._query_members',
+            return_value=[],
+        ))
+        data = copy.deepcopy(_data_561507)
+        data['project'] = 'openstack/releases'
+        self.review = gerrit.Review(561507, data)
+
+    def _args(self, **kwds):
+        args = dict(
+            governance_project_list='',
+            include_unofficial=False,
+            include_plus_one=False,
+            force=False,
+            update=False,
+            workers=1,
+            query_string='topic:test',
+            db_file=self.db_file,
+        )
+        args.update(kwds)
+        return argparse.Namespace(**args)
+
+    def _run(self, reviews, **kwds):
+        with mock.patch('goal_tools.gerrit.ReviewFactory.query') as q:
+            q.return_value = iter(reviews)
+            result = self.cmd.take_action(self._args(**kwds))
+        return result, q
+
+    def _rows(self):
+        db = sqlite3.connect(self.db_file)
+        return db.execute(
+            'select review, role, email from contribution '
+            'order by role, email').fetchall()
+
+    def test_create(self):
+        self._run([self.review])
+        self.assertEqual(4, len(self._rows()))
+
+    def test_exists_without_flags(self):
+        self._run([self.review])
+        result, q = self._run([self.review])
+        self.assertEqual(1, result)
+        q.assert_not_called()
+
+    def test_records_high_water_mark(self):
+        self._run([self.review])
+        db = sqlite3.connect(self.db_file)
+        self.assertEqual(
+            [('topic:test', '2018-04-19 12:57:36.000000000')],
+            db.execute('select query, updated from query_state').fetchall(),
+        )
+
+    def test_update_queries_since_high_water_mark(self):
+        self._run([self.review])
+        result, q = self._run([], update=True)
+        q.assert_called_once_with(
+            '(topic:test) after:"2018-04-19 12:57:36 +0000"', workers=1)
+
+    def test_update_replaces_rows(self):
+        self._run([self.review])
+        before = self._rows()
+        data = copy.deepcopy(self.review.raw_change)
+        data['updated'] = '2018-05-01 00:00:00.000000000'
+        data['labels']['Workflow']['all'] = []
+        self._run([gerrit.Review(561507, data)], update=True)
+        after = self._rows()
+        self.assertEqual(
+            [r for r in before if r[1] != 'approver'],
+            after,
+        )
+        db = sqlite3.connect(self.db_file)
+        self.assertEqual(
+            ('2018-05-01 00:00:00.000000000',),
+            db.execute('select updated from query_state').fetchone(),
+        )
+
+    def test_update_new_database(self):
+        result, q = self._run([self.review], update=True)
+        q.assert_called_once_with('topic:test', workers=1)
+        self.assertEqual(4, len(self._rows()))
@@ -0,0 +1,76 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import io
+import os.path
+import textwrap
+
+import yaml
+
+from goal_tools.tests import base
+from goal_tools import yamlutils
+
+_ZUUL = textwrap.dedent('''
+- secret:
+    name: site_logs
+    data:
+      key: !encrypted/pkcs1-oaep
+        - first
+        - second
+- project:
+    name: openstack/releases
+    templates:
+      - publish-to-pypi
+    check:
+      jobs:
+        - openstack-tox-py35:
+            voting: false
+''')
+
+
+class TestYAMLUtils(base.TestCase):
+
+    def test_uses_libyaml(self):
+        self.assertEqual(
+            yaml.__with_libyaml__,
+            issubclass(yamlutils.Loader, yaml.CSafeLoader),
+        )
+
+    def test_load(self):
+        data = yamlutils.load(_ZUUL)
+        self.assertEqual(['first', 'second'],
+                         data[0]['secret']['data']['key'])
+        self.assertEqual({'voting': False},
+                         data[1]['project']['check']['jobs'][0]
+                         ['openstack-tox-py35'])
+
+    def test_load_stream(self):
+        self.assertEqual(yamlutils.load(_ZUUL),
+                         yamlutils.load(io.StringIO(_ZUUL)))
+
+    def test_load_file(self):
+        filename = os.path.join(self.tmpdir, 'zuul.yaml')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(_ZUUL)
+        self.assertEqual(yamlutils.load(_ZUUL),
+                         yamlutils.load_file(filename))
+
+    def test_not_unsafe(self):
+        self.assertRaises(
+            yaml.constructor.ConstructorError,
+            yamlutils.load,
+            '!!python/object/apply:os.getcwd []',
+        )
+
+    def test_round_trip(self):
+        data = yamlutils.load(_ZUUL)
+        self.assertEqual(data, yamlutils.load(yamlutils.dump(data)))
@@ -11,6 +11,8 @@
 # under the License.
 
 import logging
+import os
+import tempfile
 
 LOG = logging.getLogger(__name__)
 
@@ -34,3 +36,26 @@ def unique(iterator):
             continue
         yield i
         seen.add(i)
+
+
+def write_atomic(filename, data):
+    """Replace the contents of a file in one step.
+
+    The data is written to a temporary file in the same directory,
+    which is then renamed, so readers never see a partial file.
+
+    :param filename: The file to write.
+    :type filename: str
+    :param data: The new contents.
+    :type data: bytes
+
+    """
+    fd, tmpname = tempfile.mkstemp(
+        dir=os.path.dirname(filename) or '.', prefix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmpname, filename)
+    except BaseException:
+        os.unlink(tmpname)
+        raise
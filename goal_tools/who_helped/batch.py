@@ -0,0 +1,240 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import concurrent.futures
+import logging
+import os.path
+
+from cliff import lister
+
+from goal_tools import apis
+from goal_tools import foundation
+from goal_tools import gerrit
+from goal_tools import governance
+from goal_tools.who_helped import changes
+from goal_tools.who_helped import contributions
+from goal_tools.who_helped import sql
+
+LOG = logging.getLogger(__name__)
+
+
+def read_query(filename):
+    "Return the gerrit query string saved in a .qry file."
+    with open(filename, 'r', encoding='utf-8') as f:
+        # Match the shell's "$(cat $input)", which drops the
+        # trailing newlines.
+        return f.read().rstrip('\n')
+
+
+class _ReviewContributions:
+    "The contributions to one review, worked out once per batch."
+
+    def __init__(self, review, team_name, participants):
+        self.review = review
+        self.team_name = team_name
+        # List of (participant, organization) pairs.
+        self.participants = participants
+
+    def dat_rows(self):
+        review = self.review
+        for participant, organization in self.participants:
+            yield (
+                review.id,
+                review.url,
+                review.branch,
+                review.project,
+                self.team_name or '*unknown',
+                'yes' if self.team_name else 'no',
+                participant.role,
+                participant.name,
+                participant.email,
+                contributions.DateColumn(participant.date),
+                organization,
+            )
+
+    def db_rows(self):
+        review = self.review
+        for participant, organization in self.participants:
+            yield (
+                review.id, review.url, review.branch,
+                review.project, self.team_name, participant.role,
+                participant.name, participant.email,
+                participant.date, organization,
+            )
+
+
+class BatchRun(lister.Lister):
+    """Gather the contribution data for several query files at once.
+
+    For each input file "name.qry", write the review list
+    "name.txt", the contribution list "name.dat" and the database
+    "name.db", like running "changes query", "contributions list"
+    and "database create" for each file.
+
+    """
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            '--governance-project-list',
+            default=governance.PROJECTS_LIST,
+            help='location of governance project list',
+        )
+        parser.add_argument(
+            '--include-unofficial',
+            default=False,
+            action='store_true',
+            help='include projects not under governance in the output',
+        )
+        parser.add_argument(
+            '--include-plus-one',
+            default=False,
+            action='store_true',
+            help='include +1 votes',
+        )
+        parser.add_argument(
+            '--workers',
+            default=4,
+            type=int,
+            help=('number of queries or reviews to fetch from gerrit '
+                  'concurrently (defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--max-host-requests',
+            default=4,
+            type=int,
+            help=('maximum number of concurrent requests to send to '
+                  'one server (defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            'query_files',
+            nargs='+',
+            help='name(s) of files containing gerrit query strings',
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        team_data = governance.Governance(
+            url=parsed_args.governance_project_list)
+        member_factory = foundation.MemberFactory(self.app.cache)
+        review_factory = gerrit.ReviewFactory(
+            self.app.cache,
+            keep_raw=self.app.options.keep_raw_reviews,
+        )
+        find_organization = contributions.OrganizationResolver(
+            member_factory)
+
+        queries = [
+            (filename, read_query(filename))
+            for filename in parsed_args.query_files
+        ]
+
+        apis.set_host_limit(gerrit.GERRIT_API_URL,
+                            parsed_args.max_host_requests)
+
+        def is_wanted(change):
+            if parsed_args.include_unofficial:
+                return True
+            if team_data.get_repo_owner(change['project']):
+                return True
+            LOG.debug(
+                'filtered out %s based on repo governance status',
+                change['project'],
+            )
+            return False
+
+        def run_query(query_string):
+            # Only the IDs are needed here. The details of each review
+            # are fetched once below, even if several queries match it.
+            return list(gerrit.query_changes(query_string,
+                                             profile='ids-only'))
+
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=parsed_args.workers) as pool:
+            # Files with the same query only need it run once.
+            futures = {}
+            for filename, query_string in queries:
+                if query_string not in futures:
+                    futures[query_string] = pool.submit(
+                        run_query, query_string)
+            query_results = {
+                query_string: future.result()
+                for query_string, future in futures.items()
+            }
+
+        # The reviews to report for each query, and the union of all
+        # of them in the order they were first seen.
+        wanted = {}
+        all_ids = {}
+        for query_string, results in query_results.items():
+            ids = []
+            for change in results:
+                if is_wanted(change):
+                    ids.append(change['_number'])
+                    all_ids.setdefault(change['_number'], None)
+            wanted[query_string] = ids
+
+        LOG.info('fetching %d reviews', len(all_ids))
+        # Key the reviews by the IDs asked for, since the ones from the
+        # cache may have been stored by other commands.
+        reviews = dict(zip(all_ids, review_factory.fetch_many(
+            all_ids, workers=parsed_args.workers)))
+        member_factory.prefetch(
+            participant.email
+            for review in reviews.values()
+            for participant in contributions.get_participants(
+                review, parsed_args.include_plus_one)
+        )
+
+        # Contributions to each review seen by any of the queries,
+        # worked out once.
+        by_review = {}
+        for review_id, review in reviews.items():
+            by_review[review_id] = _ReviewContributions(
+                review,
+                team_data.get_repo_owner(review.project),
+                [
+                    (participant, find_organization(participant))
+                    for participant in contributions.get_participants(
+                        review, parsed_args.include_plus_one)
+                ],
+            )
+
+        summary = []
+        for filename, query_string in queries:
+            LOG.info('processing %s', filename)
+            results = query_results[query_string]
+            high_water_mark = None
+            for change in results:
+                updated = change.get('updated')
+                if updated and (high_water_mark is None or
+                                updated > high_water_mark):
+                    high_water_mark = updated
+            review_ids = sorted(set(wanted[query_string]))
+            selected = [by_review[rid] for rid in review_ids]
+
+            base = os.path.splitext(filename)[0]
+            changes.write_review_list(base + '.txt', query_string, review_ids)
+            dat_rows = [
+                row for r in selected for row in r.dat_rows()
+            ]
+            contributions.write_dat(base + '.dat', dat_rows)
+            sql.write_db(
+                base + '.db',
+                query_string,
+                (row for r in selected for row in r.db_rows()),
+                high_water_mark,
+            )
+            summary.append((filename, len(selected), len(dat_rows)))
+
+        find_organization.log_stats()
+        return (('Query', 'Reviews', 'Contributions'), summary)
@@ -17,6 +17,8 @@ import pprint
 
 from cliff import command
 
+from goal_tools import caching
+
 LOG = logging.getLogger(__name__)
 
 
@@ -37,7 +39,7 @@ class CacheRemove(command.Command):
         return parser
 
     def take_action(self, parsed_args):
-        cache = self.app._load_cache_file(preload=False)
+        cache = self.app.cache
         del cache[(parsed_args.type, parsed_args.id)]
 
 
@@ -58,10 +60,32 @@ class CacheShow(command.Command):
         return parser
 
     def take_action(self, parsed_args):
-        cache = self.app._load_cache_file(preload=False)
+        cache = self.app.cache
         try:
             data = cache[(parsed_args.type, parsed_args.id)]
             pprint.pprint(data)
         except KeyError:
             msg = 'no {} with id {}'.format(parsed_args.type, parsed_args.id)
             raise RuntimeError(msg)
+
+
+class CacheMigrate(command.Command):
+    "Copy the entries from an old shelve cache file into the cache."
+
+    def get_parser(self, prog_name):
+        parser = super().get_parser(prog_name)
+        parser.add_argument(
+            'shelve_file',
+            nargs='?',
+            default='./who_helped.db',
+            help='the old cache file (defaults to %(default)s)',
+        )
+        return parser
+
+    def take_action(self, parsed_args):
+        if not isinstance(self.app.cache, caching.Cache):
+            raise RuntimeError('no cache file to migrate into')
+        count = caching.migrate_shelve(parsed_args.shelve_file,
+                                       self.app.cache)
+        print('copied {} entries from {} to {}'.format(
+            count, parsed_args.shelve_file, self.app.options.cache_file))
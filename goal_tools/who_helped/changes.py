@@ -22,6 +22,14 @@ from goal_tools import governance
 LOG = logging.getLogger(__name__)
 
 
+def write_review_list(filename, query_string, review_ids):
+    "Write a review ID file, with the query as a comment."
+    with open(filename, 'w', encoding='utf-8') as f:
+        f.write('# QUERY: {}\n'.format(query_string.replace('\n', ' ')))
+        for rid in sorted(review_ids):
+            f.write('{}\n'.format(rid))
+
+
 class QueryChanges(command.Command):
     "Query gerrit for a set of changes and build a review ID file."
 
@@ -38,6 +46,13 @@ class QueryChanges(command.Command):
             action='store_true',
             help='include projects not under governance in the output',
         )
+        parser.add_argument(
+            '--workers',
+            default=1,
+            type=int,
+            help=('number of time windows of the query to fetch from '
+                  'gerrit concurrently (defaults to %(default)s)'),
+        )
         parser.add_argument(
             'query_string',
             help='gerrit query string',
@@ -54,11 +69,19 @@ class QueryChanges(command.Command):
 
         review_ids = []
 
-        cache = self.app._load_cache_file(preload=False)
+        cache = self.app.cache
 
-        factory = gerrit.ReviewFactory(cache)
+        # Only the IDs and projects of the changes are needed.
+        factory = gerrit.ReviewFactory(
+            cache,
+            profile='ids-only',
+            keep_raw=self.app.options.keep_raw_reviews,
+        )
 
-        review_source = factory.query(parsed_args.query_string)
+        review_source = factory.query(
+            parsed_args.query_string,
+            workers=parsed_args.workers,
+        )
         for review in review_source:
             team_name = team_data.get_repo_owner(review.project)
             if not parsed_args.include_unofficial and not team_name:
@@ -69,8 +92,8 @@ class QueryChanges(command.Command):
                 continue
             review_ids.append(review.id)
 
-        with open(parsed_args.review_list, 'w', encoding='utf-8') as f:
-            f.write('# QUERY: {}\n'.format(
-                parsed_args.query_string.replace('\n', ' ')))
-            for rid in sorted(review_ids):
-                f.write('{}\n'.format(rid))
+        write_review_list(
+            parsed_args.review_list,
+            parsed_args.query_string,
+            review_ids,
+        )
@@ -0,0 +1,606 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Column-oriented storage for contribution data.
+
+Each column is dictionary-encoded: the distinct strings are stored
+once and every row holds an integer code. Grouping and counting work
+on whole columns of codes at a time using map() and zip(), so the
+per-row work happens in C instead of in Python loops.
+"""
+
+import array
+import collections
+import csv
+import datetime
+import functools
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import operator
+import os
+import shutil
+import sys
+
+LOG = logging.getLogger(__name__)
+
+# Number of rows to encode at a time when building a table.
+CHUNK_SIZE = 100000
+
+# Version of the on-disk format written by save().
+FORMAT_VERSION = 1
+
+# Columns holding timestamps that can be stored as integers.
+DATE_COLUMNS = ('Date',)
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+
+
+class Column:
+    "A dictionary-encoded column of strings."
+
+    def __init__(self, values, codes):
+        self.values = values
+        self.codes = codes
+
+    def __repr__(self):
+        return 'Column({} rows, {} values)'.format(
+            len(self.codes), len(self.values))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return map(self.values.__getitem__, self.codes)
+
+    def __getitem__(self, i):
+        return self.values[self.codes[i]]
+
+
+class _SelectedColumn(Column):
+    """A column with some rows removed.
+
+    The codes are only copied the first time they are used, so
+    filtering a table does not pay for columns nothing reads.
+
+    """
+
+    def __init__(self, column, mask):
+        self.values = column.values
+        self._source = column
+        self._mask = mask
+        self._codes = None
+
+    @property
+    def codes(self):
+        if self._codes is None:
+            self._codes = array.array('i')
+            self._codes.fromlist(list(
+                itertools.compress(self._source.codes, self._mask)))
+            self._source = self._mask = None
+        return self._codes
+
+
+class _Encoder:
+    "Build the dictionary and codes for a column incrementally."
+
+    def __init__(self):
+        # The default factory is called before the new key is
+        # inserted, so each new value gets the next code.
+        self.index = collections.defaultdict()
+        self.index.default_factory = self.index.__len__
+        self.codes = array.array('i')
+
+    def extend(self, values):
+        self.codes.extend(map(self.index.__getitem__, values))
+
+    def column(self):
+        return Column(list(self.index), self.codes)
+
+
+def _combine(columns):
+    """Combine the codes of several columns into one key per row.
+
+    The key is a mixed-radix number using the size of each column's
+    dictionary, so it can be decoded again with _split().
+
+    """
+    keys = columns[0].codes
+    for col in columns[1:]:
+        keys = list(map(
+            operator.add,
+            map(operator.mul, keys, itertools.repeat(len(col.values))),
+            col.codes,
+        ))
+    return keys
+
+
+def _split(columns, key):
+    "Turn a key built by _combine() back into a tuple of values."
+    values = []
+    for col in reversed(columns[1:]):
+        key, code = divmod(key, len(col.values))
+        values.append(col.values[code])
+    values.append(columns[0].values[key])
+    return tuple(reversed(values))
+
+
+class Table:
+    """A set of named columns of the same length.
+
+    If row_ids is given, it holds one code per row identifying the
+    distinct combinations of all of the values in the source rows,
+    so rows can be counted without encoding every column.
+
+    """
+
+    def __init__(self, columns, row_ids=None):
+        self.columns = columns
+        self._row_ids = row_ids
+
+    @property
+    def row_ids(self):
+        if isinstance(self._row_ids, Column):
+            return self._row_ids.codes
+        return self._row_ids
+
+    def __repr__(self):
+        return 'Table({} rows, columns={})'.format(len(self), self.names)
+
+    def __len__(self):
+        for col in self.columns.values():
+            return len(col)
+        return 0
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def column(self, name):
+        return self.columns[name]
+
+    @classmethod
+    def _build(cls, rows, columns, keys, row_ids, row_values):
+        encoders = [_Encoder() for c in columns]
+        row_encoder = _Encoder() if row_ids else None
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            for key, encoder in zip(keys, encoders):
+                encoder.extend(map(operator.itemgetter(key), chunk))
+            if row_encoder is not None:
+                row_encoder.extend(row_values(chunk))
+        return cls(
+            {c: e.column() for c, e in zip(columns, encoders)},
+            row_ids=row_encoder.codes if row_encoder else None,
+        )
+
+    @classmethod
+    def from_rows(cls, names, rows, columns=None, row_ids=False):
+        """Build a table from an iterable of sequences.
+
+        :param names: The names of the values in each row.
+        :param rows: Iterable of sequences of strings.
+        :param columns: The names of the columns to keep. Defaults
+            to all of them.
+        :param row_ids: Boolean indicating whether to record the
+            distinct rows.
+
+        """
+        if columns is None:
+            columns = names
+        return cls._build(
+            rows, columns, [names.index(c) for c in columns], row_ids,
+            lambda chunk: map(tuple, chunk),
+        )
+
+    @classmethod
+    def from_dicts(cls, rows, columns=None, row_ids=False):
+        """Build a table from an iterable of dicts, like csv.DictReader.
+
+        :param rows: Iterable of dicts with the same keys.
+        :param columns: The keys to keep. Defaults to all of them.
+        :param row_ids: Boolean indicating whether to record the
+            distinct rows.
+
+        """
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return cls({c: Column([], []) for c in (columns or [])},
+                       row_ids=[] if row_ids else None)
+        if columns is None:
+            columns = list(first.keys())
+        return cls._build(
+            itertools.chain([first], rows), columns, columns, row_ids,
+            lambda chunk: map(tuple, map(dict.values, chunk)),
+        )
+
+    def rows(self):
+        "Generator for the rows as tuples."
+        return zip(*self.columns.values())
+
+    def dicts(self):
+        "Generator for the rows as dicts, like csv.DictReader."
+        names = self.names
+        for row in self.rows():
+            yield dict(zip(names, row))
+
+    @classmethod
+    def concat(cls, tables):
+        "Combine tables with the same columns into one."
+        tables = list(tables)
+        if len(tables) == 1:
+            return tables[0]
+        names = tables[0].names
+        for t in tables[1:]:
+            if t.names != names:
+                raise ValueError(
+                    'cannot combine tables with columns {} and {}'.format(
+                        names, t.names))
+        columns = {}
+        for name in names:
+            encoder = _Encoder()
+            for t in tables:
+                col = t.columns[name]
+                # Translate the codes from each table to the codes
+                # of the combined dictionary.
+                translate = list(map(encoder.index.__getitem__, col.values))
+                encoder.codes.extend(map(translate.__getitem__, col.codes))
+            columns[name] = encoder.column()
+        return cls(columns)
+
+    def _select(self, mask):
+        "Return a new table with the rows where mask is true."
+        mask = list(mask)
+        columns = {
+            name: _SelectedColumn(col, mask)
+            for name, col in self.columns.items()
+        }
+        row_ids = None
+        if self.row_ids is not None:
+            row_ids = _SelectedColumn(Column(None, self.row_ids), mask)
+        return Table(columns, row_ids=row_ids)
+
+    def filter(self, predicates):
+        """Return a new table with the rows where every predicate is true.
+
+        :param predicates: dict mapping column names to functions
+            called once for each distinct value in the column.
+
+        The results for all of the columns are combined and checked
+        in a single pass over the rows.
+
+        """
+        masks = []
+        for name, predicate in predicates.items():
+            col = self.columns[name]
+            keep = list(map(bool, map(predicate, col.values)))
+            if all(keep):
+                continue
+            masks.append(map(keep.__getitem__, col.codes))
+        if not masks:
+            return self
+        return self._select(functools.reduce(
+            lambda a, b: map(operator.and_, a, b), masks))
+
+    def where(self, name, predicate):
+        "Return a new table with the rows where predicate is true."
+        return self.filter({name: predicate})
+
+    def map_values(self, name, func):
+        """Return a new table with func applied to a column.
+
+        The function is called once for each distinct value in the
+        column, and rows with values that map to the same result are
+        combined under one code.
+
+        """
+        col = self.columns[name]
+        encoder = _Encoder()
+        translate = list(map(encoder.index.__getitem__, map(func, col.values)))
+        encoder.codes.extend(map(translate.__getitem__, col.codes))
+        columns = dict(self.columns)
+        columns[name] = encoder.column()
+        # Rows that only differed in this column are now the same, so
+        # the old row ids no longer apply.
+        return Table(columns)
+
+    def distinct(self, by_names):
+        "Return the set of distinct combinations of values in columns."
+        if not len(self):
+            return set()
+        cols = [self.columns[n] for n in by_names]
+        return set(
+            tuple(col.values[code] for col, code in zip(cols, key))
+            for key in set(zip(*(c.codes for c in cols)))
+        )
+
+    def count_distinct(self, by_names, to_count):
+        """Count the distinct values of some columns, grouped by others.
+
+        :param by_names: The columns to group by. At least one is
+            required.
+        :param to_count: The columns whose combined values are
+            counted. If empty, the distinct rows are counted.
+        :returns: dict mapping tuples of the group values to counts
+
+        """
+        if not len(self):
+            return {}
+        group_cols = [self.columns[n] for n in by_names]
+        group_keys = _combine(group_cols)
+        if to_count:
+            count_keys = [self.columns[n].codes for n in to_count]
+        elif self.row_ids is not None:
+            count_keys = [self.row_ids]
+        else:
+            count_keys = [c.codes for c in self.columns.values()]
+        # Counting the distinct pairs for each group is the same as
+        # counting the distinct values in each group.
+        pairs = set(zip(group_keys, *count_keys))
+        counts = collections.Counter(map(operator.itemgetter(0), pairs))
+        return {
+            _split(group_cols, key): count
+            for key, count in counts.items()
+        }
+
+
+class _EpochValues:
+    "Read-only sequence of timestamp strings stored as epoch seconds."
+
+    def __init__(self, epochs):
+        self._epochs = epochs
+
+    def __len__(self):
+        return len(self._epochs)
+
+    def __getitem__(self, i):
+        dt = _EPOCH + datetime.timedelta(seconds=self._epochs[i])
+        return str(dt)
+
+    def __iter__(self):
+        return map(self.__getitem__, range(len(self)))
+
+
+def _to_epochs(values):
+    """Convert timestamp strings to epoch seconds.
+
+    Returns None unless every value converts back to exactly the
+    same string.
+
+    """
+    epochs = array.array('q')
+    for value in values:
+        try:
+            dt = datetime.datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+        if dt.tzinfo is not None or str(dt) != value:
+            return None
+        epochs.append((dt - _EPOCH) // datetime.timedelta(seconds=1))
+    return epochs
+
+
+def _code_type(n_values):
+    "Pick the smallest array type able to hold codes for n_values."
+    if n_values <= 0x100:
+        return 'B'
+    if n_values <= 0x10000:
+        return 'H'
+    return 'i'
+
+
+def _file_hash(filename):
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_info(filename, digest=None):
+    st = os.stat(filename)
+    return {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': digest or _file_hash(filename),
+    }
+
+
+def sidecar_name(filename):
+    "Return the name of the column cache directory for a data file."
+    return filename + '.cols'
+
+
+def save(table, dirname, source=None):
+    """Write the table to a directory of column files.
+
+    Each column is stored as a dictionary of values and a binary file
+    of codes in native byte order, which load() maps into memory.
+    Columns in DATE_COLUMNS are stored as epoch seconds when the
+    values allow it.
+
+    :param table: The Table to save.
+    :param dirname: Name of the directory to create or replace.
+    :param source: Optional name of the file the table was read from,
+        recorded so load() can tell when the table is out of date.
+
+    """
+    tmpdir = '{}.tmp{}'.format(dirname, os.getpid())
+    if os.path.exists(tmpdir):
+        shutil.rmtree(tmpdir)
+    os.makedirs(tmpdir)
+    meta = {
+        'version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'rows': len(table),
+        'source': _source_info(source) if source else None,
+        'columns': [],
+        'row_ids': None,
+    }
+    if table.row_ids is not None:
+        typecode = _code_type(max(table.row_ids, default=0) + 1)
+        with open(os.path.join(tmpdir, 'rows.codes'), 'wb') as f:
+            array.array(typecode, table.row_ids).tofile(f)
+        meta['row_ids'] = typecode
+    for i, (name, col) in enumerate(table.columns.items()):
+        typecode = _code_type(len(col.values))
+        values = list(col.values)
+        epochs = _to_epochs(values) if name in DATE_COLUMNS else None
+        if epochs is not None:
+            with open(os.path.join(tmpdir, '{}.epochs'.format(i)),
+                      'wb') as f:
+                epochs.tofile(f)
+            encoding = 'epoch'
+        else:
+            with open(os.path.join(tmpdir, '{}.values'.format(i)),
+                      'w', encoding='utf-8') as f:
+                json.dump(values, f)
+            encoding = 'string'
+        with open(os.path.join(tmpdir, '{}.codes'.format(i)), 'wb') as f:
+            array.array(typecode, col.codes).tofile(f)
+        meta['columns'].append({
+            'name': name,
+            'encoding': encoding,
+            'typecode': typecode,
+        })
+    with open(os.path.join(tmpdir, 'meta.json'), 'w',
+              encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    if os.path.exists(dirname):
+        shutil.rmtree(dirname)
+    os.rename(tmpdir, dirname)
+
+
+def _map_file(filename, typecode):
+    "Return a read-only memoryview of the contents of a binary file."
+    with open(filename, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return array.array(typecode)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
+
+def _read_meta(dirname):
+    try:
+        with open(os.path.join(dirname, 'meta.json'), 'r',
+                  encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_current(dirname, source):
+    """Return whether the saved table still matches its source file.
+
+    The size and modification time of the source are checked first.
+    If only the time differs, the contents are hashed to decide.
+
+    """
+    meta = _read_meta(dirname)
+    if not meta or meta.get('version') != FORMAT_VERSION:
+        return False
+    if meta.get('byteorder') != sys.byteorder:
+        return False
+    expected = meta.get('source')
+    if not expected:
+        return False
+    st = os.stat(source)
+    if st.st_size != expected['size']:
+        return False
+    if st.st_mtime_ns == expected['mtime_ns']:
+        return True
+    if _file_hash(source) != expected['sha256']:
+        return False
+    # The contents have not changed, so remember the new time to
+    # avoid hashing the file again next time.
+    LOG.debug('%s touched but unchanged', source)
+    meta['source'] = _source_info(source, expected['sha256'])
+    try:
+        with open(os.path.join(dirname, 'meta.json'), 'w',
+                  encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+    except OSError:
+        pass
+    return True
+
+
+def load(dirname):
+    "Read a table written by save()."
+    meta = _read_meta(dirname)
+    if not meta:
+        raise ValueError('no column data in {}'.format(dirname))
+    columns = {}
+    for i, info in enumerate(meta['columns']):
+        if info['encoding'] == 'epoch':
+            values = _EpochValues(_map_file(
+                os.path.join(dirname, '{}.epochs'.format(i)), 'q'))
+        else:
+            with open(os.path.join(dirname, '{}.values'.format(i)), 'r',
+                      encoding='utf-8') as f:
+                values = json.load(f)
+        codes = _map_file(
+            os.path.join(dirname, '{}.codes'.format(i)), info['typecode'])
+        columns[info['name']] = Column(values, codes)
+    row_ids = None
+    if meta.get('row_ids'):
+        row_ids = _map_file(
+            os.path.join(dirname, 'rows.codes'), meta['row_ids'])
+    return Table(columns, row_ids=row_ids)
+
+
+def _fill_rows(rows, width):
+    # Treat the rows the way csv.DictReader does: skip blank lines
+    # and fill in the missing values of short rows with None.
+    for row in rows:
+        if not row:
+            continue
+        if len(row) < width:
+            row = row + [None] * (width - len(row))
+        yield row
+
+
+def read_csv(filename):
+    "Read a contribution data file into a table."
+    with open(filename, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        names = next(reader, [])
+        return Table.from_rows(
+            names, _fill_rows(reader, len(names)), row_ids=True)
+
+
+def load_file(filename, use_cache=True):
+    """Read a contribution data file, using its column cache if possible.
+
+    The cache is rebuilt when it is missing or older than the data
+    file. Failing to write it is not an error.
+
+    """
+    if not use_cache:
+        return read_csv(filename)
+    dirname = sidecar_name(filename)
+    if is_current(dirname, filename):
+        LOG.debug('reading columns from %s', dirname)
+        return load(dirname)
+    table = read_csv(filename)
+    try:
+        save(table, dirname, source=filename)
+    except OSError as err:
+        LOG.warning('could not save columns for %s: %s', filename, err)
+    else:
+        LOG.debug('saved columns to %s', dirname)
+    return table
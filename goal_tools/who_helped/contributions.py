@@ -12,17 +12,20 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import csv
 import itertools
 import logging
 
 from cliff import columns
 from cliff import lister
 
+from goal_tools import apis
 from goal_tools import foundation
 from goal_tools import gerrit
 from goal_tools import governance
 from goal_tools import organizations
 from goal_tools import utils
+from goal_tools.who_helped import columnar
 
 LOG = logging.getLogger(__name__)
 
@@ -45,6 +48,114 @@ _COLUMNS = (
 )
 
 
+def get_participants(review, include_plus_one=False):
+    "Return the participants in a review to count as contributors."
+    if include_plus_one:
+        return itertools.chain(review.participants, review.plus_ones)
+    return review.participants
+
+
+def prefetch_members(reviews, member_factory, include_plus_one=False,
+                     chunk_size=100):
+    """Generator passing reviews through after looking up their members.
+
+    The memberships of the participants in each chunk of reviews are
+    looked up together, so OrganizationResolver finds them cached.
+
+    """
+    reviews = iter(reviews)
+    while True:
+        chunk = list(itertools.islice(reviews, chunk_size))
+        if not chunk:
+            break
+        member_factory.prefetch(
+            participant.email
+            for review in chunk
+            for participant in get_participants(review, include_plus_one)
+        )
+        yield from chunk
+
+
+class OrganizationResolver:
+    """Find the organization each participant worked for at the time.
+
+    The foundation membership data is used when the participant is a
+    member, otherwise the organization is guessed from their email
+    address. Answers are remembered per person per day, since
+    affiliations do not change more often than that.
+
+    """
+
+    def __init__(self, member_factory, canonical_orgs=None):
+        self._member_factory = member_factory
+        if canonical_orgs is None:
+            canonical_orgs = organizations.Organizations()
+        self._canonical_orgs = canonical_orgs
+        self._known = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, participant):
+        "Return the organization name, or \"*unknown\"."
+        date = participant.date
+        # Gerrit does not always report when something happened.
+        key = (participant.email, date.toordinal() if date else None)
+        try:
+            organization = self._known[key]
+        except KeyError:
+            self.misses += 1
+            organization = self._known[key] = self._lookup(
+                participant.email, date)
+        else:
+            self.hits += 1
+        return organization
+
+    def _lookup(self, email, date):
+        organization = None
+        member = self._member_factory.fetch(email)
+        if member:
+            # Without a date there is no way to pick the affiliation.
+            affiliation = member.find_affiliation(date) if date else None
+            if affiliation and affiliation.organization:
+                organization = self._canonical_orgs[affiliation.organization]
+        else:
+            organization = self._canonical_orgs.from_email(email)
+        return organization or '*unknown'
+
+    def log_stats(self):
+        LOG.debug('organization lookups: %d hits, %d misses',
+                  self.hits, self.misses)
+
+
+def write_dat(filename, rows):
+    """Write rows to a CSV file and save its column cache.
+
+    The CSV matches the output of "contributions list -f csv".
+
+    """
+    LOG.info('writing %s', filename)
+    with open(filename, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(
+            f,
+            quoting=csv.QUOTE_NONNUMERIC,
+            lineterminator='\n',
+            escapechar='\\',
+        )
+        writer.writerow(_COLUMNS)
+        for row in rows:
+            writer.writerow([
+                c.machine_readable()
+                if isinstance(c, columns.FormattableColumn)
+                else c
+                for c in row
+            ])
+    columnar.save(
+        columnar.read_csv(filename),
+        columnar.sidecar_name(filename),
+        source=filename,
+    )
+
+
 class ListContributions(lister.Lister):
     "List the contributions to a set of reviews."
 
@@ -61,6 +172,26 @@ class ListContributions(lister.Lister):
             action='store_true',
             help='include +1 votes',
         )
+        parser.add_argument(
+            '--workers',
+            default=1,
+            type=int,
+            help=('number of reviews to fetch from gerrit concurrently '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--max-host-requests',
+            default=4,
+            type=int,
+            help=('maximum number of concurrent requests to send to '
+                  'one server (defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--output-dat',
+            metavar='FILENAME',
+            help=('also write the contributions to FILENAME as CSV, '
+                  'with a column cache for the reporting commands'),
+        )
         parser.add_argument(
             'review_list',
             nargs='+',
@@ -75,43 +206,37 @@ class ListContributions(lister.Lister):
                 url=parsed_args.governance_project_list)
 
             member_factory = foundation.MemberFactory(self.app.cache)
-            review_factory = gerrit.ReviewFactory(self.app.cache)
-            canonical_orgs = organizations.Organizations()
+            review_factory = gerrit.ReviewFactory(
+                self.app.cache,
+                keep_raw=self.app.options.keep_raw_reviews,
+            )
+            find_organization = OrganizationResolver(member_factory)
 
             review_ids = utils.unique(
                 gerrit.parse_review_lists(parsed_args.review_list)
             )
 
-            for review_id in review_ids:
+            apis.set_host_limit(gerrit.GERRIT_API_URL,
+                                parsed_args.max_host_requests)
+            reviews = prefetch_members(
+                review_factory.fetch_many(
+                    review_ids,
+                    workers=parsed_args.workers,
+                ),
+                member_factory,
+                parsed_args.include_plus_one,
+            )
 
-                review = review_factory.fetch(review_id)
+            for review in reviews:
+                review_id = review.id
 
                 team_name = team_data.get_repo_owner(review.project)
 
-                if parsed_args.include_plus_one:
-                    participants = itertools.chain(
-                        review.participants,
-                        review.plus_ones,
-                    )
-                else:
-                    participants = review.participants
+                participants = get_participants(
+                    review, parsed_args.include_plus_one)
 
                 for participant in participants:
-
-                    # Figure out which organization the user was
-                    # affiliated with at the time of the work.
-                    organization = None
-                    member = member_factory.fetch(participant.email)
-                    if member:
-                        affiliation = member.find_affiliation(participant.date)
-                        if affiliation and affiliation.organization:
-                            organization = canonical_orgs[
-                                affiliation.organization]
-                    else:
-                        organization = canonical_orgs.from_email(
-                            participant.email)
-                    if not organization:
-                        organization = "*unknown"
+                    organization = find_organization(participant)
 
                     yield (
                         review_id,
@@ -127,4 +252,10 @@ class ListContributions(lister.Lister):
                         organization,
                     )
 
-        return (_COLUMNS, make_rows())
+            find_organization.log_stats()
+
+        rows = make_rows()
+        if parsed_args.output_dat:
+            rows = list(rows)
+            write_dat(parsed_args.output_dat, rows)
+        return (_COLUMNS, rows)
@@ -12,6 +12,7 @@
 
 import logging
 
+from goal_tools.who_helped import columnar
 from goal_tools.who_helped import contributions
 from goal_tools.who_helped import report
 
@@ -19,10 +20,8 @@ LOG = logging.getLogger(__name__)
 
 
 def _get_distinct(by_names, data_source):
-    return set(
-        tuple(row[b] for b in by_names)
-        for row in data_source
-    )
+    table = columnar.Table.from_dicts(data_source, by_names)
+    return table.distinct(by_names)
 
 
 class DistinctContributions(report.ContributionsReportBase):
@@ -45,9 +44,9 @@ class DistinctContributions(report.ContributionsReportBase):
         if not group_by:
             group_by.append('Organization')
 
-        data = self.get_contributions(parsed_args)
+        table = self.get_contribution_table(parsed_args)
 
-        values = _get_distinct(group_by, data)
+        values = table.distinct(group_by)
 
         output_rows = sorted(values)
 
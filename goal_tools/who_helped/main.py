@@ -19,7 +19,9 @@ from cliff import app
 from cliff import commandmanager
 import pbr.version
 
+from goal_tools import apis
 from goal_tools import caching
+from goal_tools import governance
 
 
 class WhoHelped(app.App):
@@ -41,19 +43,62 @@ class WhoHelped(app.App):
                                              argparse_kwargs)
         parser.add_argument(
             '--cache-file',
-            default='./who_helped.db',
+            default='./who_helped.sqlite',
             help=('cache file for data fetched from APIs '
                   '(defaults to %(default)s)'),
         )
+        parser.add_argument(
+            '--keep-raw-reviews',
+            default=False,
+            action='store_true',
+            help=('cache all of the review data returned by gerrit, '
+                  'instead of only the participants, so "review show" '
+                  'can use it'),
+        )
+        parser.add_argument(
+            '--http-pool-size',
+            default=apis.POOL_SIZE,
+            type=int,
+            help=('number of connections to keep open to each server '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--http-timeout',
+            default=apis.TIMEOUT,
+            type=float,
+            help=('seconds to wait for a server to respond '
+                  '(defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--governance-cache-dir',
+            default=governance.CACHE_DIR,
+            help=('directory for saved copies of the governance data, '
+                  'empty to always download it (defaults to %(default)s)'),
+        )
+        parser.add_argument(
+            '--offline',
+            default=False,
+            action='store_true',
+            help=('use the saved copies of the governance data without '
+                  'checking for updates'),
+        )
         return parser
 
     def initialize_app(self, argv):
         # Quiet the urllib3 module output coming out of requests.
         logging.getLogger('urllib3').setLevel(logging.WARNING)
+        apis.configure(
+            pool_size=self.options.http_pool_size,
+            timeout=self.options.http_timeout,
+        )
+        governance.configure(
+            cache_dir=self.options.governance_cache_dir,
+            offline=self.options.offline,
+        )
         self._cache = None
 
-    def _load_cache_file(self, preload=True):
-        return caching.Cache(self.options.cache_file, preload=preload)
+    def _load_cache_file(self):
+        return caching.Cache(self.options.cache_file)
 
     @property
     def cache(self):
@@ -66,6 +111,12 @@ class WhoHelped(app.App):
                 self._cache = {}
         return self._cache
 
+    def clean_up(self, cmd, result, err):
+        # Save anything written to the cache by the command.
+        if isinstance(self._cache, caching.Cache):
+            self._cache.close()
+            self._cache = None
+
 
 def main(argv=sys.argv[1:]):
     return WhoHelped().run(argv)
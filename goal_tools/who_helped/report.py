@@ -10,17 +10,25 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import csv
+import collections
 import logging
 
 from cliff import lister
 
 from goal_tools import governance
 from goal_tools import sponsors
+from goal_tools.who_helped import columnar
 
 LOG = logging.getLogger(__name__)
 
 
+def _all_of(predicates):
+    "Return a predicate that is true when all of the others are."
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda value: all(p(value) for p in predicates)
+
+
 class ContributionsReportBase(lister.Lister):
     "Base class for commands that report about contributions."
 
@@ -92,6 +100,14 @@ class ContributionsReportBase(lister.Lister):
             default=governance.PROJECTS_LIST,
             help='location of governance project list',
         )
+        parser.add_argument(
+            '--no-column-cache',
+            dest='column_cache',
+            default=True,
+            action='store_false',
+            help=('always parse the contribution files instead of '
+                  'using or updating their column caches'),
+        )
         parser.add_argument(
             'contribution_list',
             nargs='+',
@@ -99,68 +115,89 @@ class ContributionsReportBase(lister.Lister):
         )
         return parser
 
-    def get_contributions(self, parsed_args):
+    def get_contribution_table(self, parsed_args):
+        "Return a columnar.Table with the filtered contributions."
+        tables = []
+        for filename in parsed_args.contribution_list:
+            LOG.debug('reading %s', filename)
+            tables.append(columnar.load_file(
+                filename, use_cache=parsed_args.column_cache))
+        # Skip empty files, which do not even have a header.
+        table = columnar.Table.concat(
+            [t for t in tables if t.names] or tables[:1]
+        )
+        if not len(table):
+            return table
+
+        table = table.filter(self._compile_filters(parsed_args))
+
+        if parsed_args.highlight_sponsors:
+            sponsor_map = sponsors.Sponsors(parsed_args.sponsor_level)
+            table = table.map_values(
+                'Organization', lambda o: sponsor_map[o])
+
+        return table
+
+    def get_governance(self, parsed_args):
+        "Return the governance data, loading it only once per command."
+        if getattr(self, '_governance', None) is None:
+            self._governance = governance.Governance(
+                url=parsed_args.governance_project_list)
+        return self._governance
 
-        def rows():
-            for filename in parsed_args.contribution_list:
-                LOG.debug('reading %s', filename)
-                with open(filename, 'r', encoding='utf-8') as f:
-                    reader = csv.DictReader(f)
-                    yield from reader
+    def _compile_filters(self, parsed_args):
+        """Combine the filter options into one predicate per column.
 
-        data = rows()
+        Returns a dict mapping column names to functions that take a
+        value from the column and return whether to keep the rows
+        with that value.
 
-        roles = parsed_args.role
+        """
+        predicates = collections.defaultdict(list)
+
+        roles = set(parsed_args.role)
         if roles:
-            data = (d for d in data if d['Role'] in roles)
+            predicates['Role'].append(roles.__contains__)
 
         ignore_teams = set(t.lower() for t in parsed_args.ignore_team)
         if ignore_teams:
-            data = (d for d in data if d['Team'].lower() not in ignore_teams)
+            predicates['Team'].append(
+                lambda t: t.lower() not in ignore_teams)
 
         only_teams = set(t.lower() for t in parsed_args.only_team)
         if only_teams:
-            data = (d for d in data if d['Team'].lower() in only_teams)
+            predicates['Team'].append(lambda t: t.lower() in only_teams)
 
         if parsed_args.only_sponsors:
             sponsor_map = sponsors.Sponsors(parsed_args.sponsor_level)
+            predicates['Organization'].append(sponsor_map.__contains__)
 
-            data = (
-                d
-                for d in data
-                if d['Organization'] in sponsor_map
-            )
-
+        # Resolve the tag filters to sets of repositories up front,
+        # instead of looking up the tags for each project.
         ignore_tags = set(parsed_args.ignore_tag)
         if ignore_tags:
-            team_data = governance.Governance(
-                url=parsed_args.governance_project_list)
-
-            data = (
-                d
-                for d in data
-                if not team_data.get_repo_tags(d['Project']).intersection(
-                    ignore_tags)
+            team_data = self.get_governance(parsed_args)
+            ignore_repos = set(
+                r for r in team_data.get_repos()
+                if team_data.get_repo_tags(r).intersection(ignore_tags)
             )
+            predicates['Project'].append(
+                lambda p: p not in ignore_repos)
 
         only_tags = set(parsed_args.only_tag)
         if only_tags:
-            team_data = governance.Governance(
-                url=parsed_args.governance_project_list)
-
-            data = (
-                d
-                for d in data
-                if only_tags.issubset(team_data.get_repo_tags(d['Project']))
+            team_data = self.get_governance(parsed_args)
+            only_repos = set(
+                r for r in team_data.get_repos()
+                if only_tags.issubset(team_data.get_repo_tags(r))
             )
+            predicates['Project'].append(only_repos.__contains__)
 
-        if parsed_args.highlight_sponsors:
-            sponsor_map = sponsors.Sponsors(parsed_args.sponsor_level)
-
-            def filter_sponsors(row):
-                row['Organization'] = sponsor_map[row['Organization']]
-                return row
-
-            data = (filter_sponsors(d) for d in data)
+        return {
+            name: _all_of(funcs)
+            for name, funcs in predicates.items()
+        }
 
-        return data
+    def get_contributions(self, parsed_args):
+        "Return a generator of dicts with the filtered contributions."
+        return self.get_contribution_table(parsed_args).dicts()
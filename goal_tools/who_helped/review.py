@@ -42,12 +42,16 @@ class ReviewShow(command.Command):
 
     def take_action(self, parsed_args):
         review_id = gerrit.parse_review_id(parsed_args.id)
-        cache = self.app._load_cache_file(preload=False)
+        cache = self.app.cache
         try:
             data = cache[('review', review_id)]
         except KeyError:
-            rev = gerrit.ReviewFactory({}).fetch(review_id)
-            data = rev._data
+            data = None
+        if not isinstance(data, dict):
+            # Only the participants were cached, unless the data was
+            # saved with --keep-raw-reviews.
+            rev = gerrit.ReviewFactory({}, keep_raw=True).fetch(review_id)
+            data = rev.raw_change
         if parsed_args.json:
             print(json.dumps(data, sort_keys=True, indent=2))
         else:
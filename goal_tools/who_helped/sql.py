@@ -17,11 +17,11 @@ import sqlite3
 
 from cliff import command
 
+from goal_tools.who_helped import contributions
 from goal_tools.who_helped import report
 from goal_tools import foundation
 from goal_tools import gerrit
 from goal_tools import governance
-from goal_tools import organizations
 
 LOG = logging.getLogger(__name__)
 
@@ -52,6 +52,55 @@ values (
 )
 """
 
+SQL_CREATE_INDEX = """
+create index if not exists contribution_review on contribution (review)
+"""
+
+SQL_DELETE_REVIEW = """
+delete from contribution where review = ?
+"""
+
+# The high-water mark of the 'updated' timestamps of the changes
+# found by each query, for updating the database incrementally.
+SQL_CREATE_QUERY_STATE = """
+create table if not exists query_state (
+  query text primary key,
+  updated text
+)
+"""
+
+SQL_GET_QUERY_STATE = """
+select updated from query_state where query = ?
+"""
+
+SQL_SET_QUERY_STATE = """
+insert or replace into query_state (query, updated) values (?, ?)
+"""
+
+
+def write_db(db_file, query_string, rows, high_water_mark=None):
+    """Create a contribution database, replacing any existing file.
+
+    The query state is recorded so the database can be refreshed
+    later with "database create --update".
+
+    """
+    tmp_file = db_file + '.tmp'
+    if os.path.exists(tmp_file):
+        os.unlink(tmp_file)
+    db = sqlite3.connect(tmp_file)
+    try:
+        db.execute(SQL_CREATE)
+        db.execute(SQL_CREATE_INDEX)
+        db.execute(SQL_CREATE_QUERY_STATE)
+        db.executemany(SQL_INSERT, rows)
+        if high_water_mark:
+            db.execute(SQL_SET_QUERY_STATE, (query_string, high_water_mark))
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmp_file, db_file)
+
 
 class QueryContributions(report.ContributionsReportBase):
     "Run an SQL query against the dataset."
@@ -115,12 +164,28 @@ class DBCreate(command.Command):
             action='store_true',
             help='include +1 votes',
         )
-        parser.add_argument(
+        mode_group = parser.add_mutually_exclusive_group()
+        mode_group.add_argument(
             '--force',
             default=False,
             action='store_true',
             help='force recreating the database',
         )
+        mode_group.add_argument(
+            '--update',
+            default=False,
+            action='store_true',
+            help=('only fetch the changes updated since the database '
+                  'was last built with the same query, and replace '
+                  'their contributions'),
+        )
+        parser.add_argument(
+            '--workers',
+            default=1,
+            type=int,
+            help=('number of time windows of the query to fetch from '
+                  'gerrit concurrently (defaults to %(default)s)'),
+        )
         parser.add_argument(
             'query_string',
             help='gerrit query string',
@@ -135,25 +200,52 @@ class DBCreate(command.Command):
         team_data = governance.Governance(
             url=parsed_args.governance_project_list)
 
-        cache = self.app._load_cache_file(preload=False)
-        factory = gerrit.ReviewFactory(cache)
+        cache = self.app.cache
+        factory = gerrit.ReviewFactory(
+            cache,
+            keep_raw=self.app.options.keep_raw_reviews,
+        )
         member_factory = foundation.MemberFactory(cache)
-        canonical_orgs = organizations.Organizations()
+        find_organization = contributions.OrganizationResolver(member_factory)
 
-        if os.path.exists(parsed_args.db_file):
+        db_exists = os.path.exists(parsed_args.db_file)
+        if db_exists and not parsed_args.update:
             if not parsed_args.force:
                 print('ERROR: {} already exists. '
-                      'Use the --force flag to overwrite.'.format(
+                      'Use the --force flag to overwrite '
+                      'or --update to refresh it.'.format(
                           parsed_args.db_file))
                 return 1
             else:
                 os.unlink(parsed_args.db_file)
+                db_exists = False
 
         db = sqlite3.connect(parsed_args.db_file)
-        db.execute(SQL_CREATE)
+        if not db_exists:
+            db.execute(SQL_CREATE)
+        db.execute(SQL_CREATE_INDEX)
+        db.execute(SQL_CREATE_QUERY_STATE)
+
+        query_string = parsed_args.query_string
+        high_water_mark = None
+        if db_exists:
+            row = db.execute(SQL_GET_QUERY_STATE, (query_string,)).fetchone()
+            if row:
+                high_water_mark = row[0]
+                LOG.info('fetching changes updated since %s',
+                         high_water_mark)
+                query_string = '({}) {}'.format(
+                    query_string, gerrit.updated_since(high_water_mark))
 
         def get_data():
-            review_source = factory.query(parsed_args.query_string)
+            review_source = contributions.prefetch_members(
+                factory.query(
+                    query_string,
+                    workers=parsed_args.workers,
+                ),
+                member_factory,
+                parsed_args.include_plus_one,
+            )
             for review in review_source:
 
                 team_name = team_data.get_repo_owner(review.project)
@@ -163,36 +255,23 @@ class DBCreate(command.Command):
                         'filtered out %s based on repo governance status',
                         review.project,
                     )
+                    yield (review, [])
                     continue
 
-                if parsed_args.include_plus_one:
-                    participants = itertools.chain(
-                        review.participants,
-                        review.plus_ones,
-                    )
-                else:
-                    participants = review.participants
+                participants = contributions.get_participants(
+                    review, parsed_args.include_plus_one)
 
+                rows = []
                 for participant in participants:
-                    # Figure out which organization the user was
-                    # affiliated with at the time of the work.
-                    organization = None
-                    member = member_factory.fetch(participant.email)
-                    if member:
-                        affiliation = member.find_affiliation(participant.date)
-                        if affiliation and affiliation.organization:
-                            organization = canonical_orgs[
-                                affiliation.organization]
-                    else:
-                        organization = canonical_orgs.from_email(
-                            participant.email)
-                    if not organization:
-                        organization = "*unknown"
-
-                    yield (review.id, review.url, review.branch,
-                           review.project, team_name, participant.role,
-                           participant.name, participant.email,
-                           participant.date, organization)
+                    organization = find_organization(participant)
+                    rows.append(
+                        (review.id, review.url, review.branch,
+                         review.project, team_name, participant.role,
+                         participant.name, participant.email,
+                         participant.date, organization)
+                    )
+
+                yield (review, rows)
 
         cursor = db.cursor()
         data = get_data()
@@ -200,6 +279,31 @@ class DBCreate(command.Command):
             chunk = list(itertools.islice(data, 100))
             if not chunk:
                 break
-            LOG.debug('inserting %d', len(chunk))
-            cursor.executemany(SQL_INSERT, chunk)
+            if db_exists:
+                # Replace the contributions for the reviews we have
+                # seen before, so a participant whose vote changed is
+                # not counted twice.
+                LOG.debug('replacing %d reviews', len(chunk))
+                cursor.executemany(
+                    SQL_DELETE_REVIEW,
+                    ((str(review.id),) for review, rows in chunk),
+                )
+            to_insert = [row for review, rows in chunk for row in rows]
+            LOG.debug('inserting %d', len(to_insert))
+            cursor.executemany(SQL_INSERT, to_insert)
+            for review, rows in chunk:
+                if review.updated and (high_water_mark is None or
+                                       review.updated > high_water_mark):
+                    high_water_mark = review.updated
+            db.commit()
+
+        find_organization.log_stats()
+
+        # Only record the new high-water mark once all of the changes
+        # have been saved, so an interrupted run starts over.
+        if high_water_mark:
+            cursor.execute(
+                SQL_SET_QUERY_STATE,
+                (parsed_args.query_string, high_water_mark),
+            )
             db.commit()
@@ -10,10 +10,10 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-import collections
 import itertools
 import logging
 
+from goal_tools.who_helped import columnar
 from goal_tools.who_helped import contributions
 from goal_tools.who_helped import report
 
@@ -21,17 +21,14 @@ LOG = logging.getLogger(__name__)
 
 
 def _count_distinct(by_names, to_count, data_source):
-    counts = collections.defaultdict(set)
-    for row in data_source:
-        # Build the grouping key for this row. We always have at least
-        # one column name in by_names.
-        by_key = tuple(row[by] for by in by_names)
-        # Build a unique value based on what we were told to count,
-        # using the to_count names for columns if we have any or
-        # taking all of the column names to count the row itself.
-        count_key = tuple(row[c] for c in (to_count or row.keys()))
-        counts[by_key].add(count_key)
-    return {k: len(v) for k, v in counts.items()}
+    # Only encode the columns we need. If we were not told what to
+    # count, record the distinct rows instead of encoding every
+    # column to count the rows themselves.
+    names = list(dict.fromkeys(list(by_names) + list(to_count)))
+    table = columnar.Table.from_dicts(
+        data_source, names, row_ids=not to_count,
+    )
+    return table.count_distinct(by_names, to_count)
 
 
 class Anonymizer:
@@ -107,9 +104,9 @@ class SummarizeContributions(report.ContributionsReportBase):
         to_count = parsed_args.count[:]
         to_count_column = ', '.join(to_count) or 'Contributions'
 
-        data = self.get_contributions(parsed_args)
+        table = self.get_contribution_table(parsed_args)
 
-        counts = _count_distinct(group_by, to_count, data)
+        counts = table.count_distinct(group_by, to_count)
 
         output_rows = reversed(sorted(
             (by_key + (count_value,)
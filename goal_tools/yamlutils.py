@@ -0,0 +1,100 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Read and write YAML with libyaml when it is available.
+
+The pure-Python parser in PyYAML is several times slower than the one
+built on libyaml, which matters for large inputs like the zuul
+settings in project-config. Use these functions instead of calling
+yaml directly, unless the data needs to be written back out with its
+comments and formatting intact (see projectconfig_ruamellib).
+"""
+
+import functools
+import logging
+
+LOG = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _classes():
+    # yaml is slow to import, so wait until it is used.
+    import yaml
+
+    try:
+        base_loader = yaml.CSafeLoader
+        base_dumper = yaml.CSafeDumper
+        have_libyaml = True
+    except AttributeError:
+        LOG.debug('libyaml is not available, using the pure-Python parser')
+        base_loader = yaml.SafeLoader
+        base_dumper = yaml.SafeDumper
+        have_libyaml = False
+
+    class Loader(base_loader):
+        "Safe loader that also understands the tags used in zuul settings."
+
+    # Zuul secrets are encrypted values tagged in the YAML. Treat them
+    # as lists of strings, like projectconfig_ruamellib does.
+    Loader.add_constructor(
+        '!encrypted/pkcs1-oaep',
+        yaml.SafeLoader.construct_yaml_seq,
+    )
+
+    class Dumper(base_dumper):
+        "Safe dumper using libyaml when it is available."
+
+    return {
+        'Loader': Loader,
+        'Dumper': Dumper,
+        'HAVE_LIBYAML': have_libyaml,
+    }
+
+
+def __getattr__(name):
+    # Provide Loader, Dumper and HAVE_LIBYAML without importing yaml
+    # along with this module.
+    try:
+        return _classes()[name]
+    except KeyError:
+        raise AttributeError(
+            'module {!r} has no attribute {!r}'.format(__name__, name))
+
+
+def load(stream):
+    """Parse the YAML in stream.
+
+    :param stream: The text to parse, or an open file.
+    :type stream: str or file
+
+    """
+    import yaml
+
+    return yaml.load(stream, Loader=_classes()['Loader'])
+
+
+def load_file(filename):
+    "Parse the YAML in the named file."
+    with open(filename, 'r', encoding='utf-8') as f:
+        return load(f)
+
+
+def dump(data, stream=None, **kwargs):
+    """Write data as YAML.
+
+    Extra keyword arguments are passed to yaml.dump(). Returns the
+    text if stream is None.
+
+    """
+    import yaml
+
+    return yaml.dump(data, stream, Dumper=_classes()['Dumper'], **kwargs)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare stacked per-row filters with the compiled table filters.
+
+The time for each includes pulling out the Organization values for
+the rows that are kept, as "contributions summarize" would.
+
+Builds a synthetic contribution file and applies the filters used by
+tools/run_contributor_report.sh, plus a few more, with both
+implementations.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+import benchmark_summarize
+
+from goal_tools import governance
+from goal_tools import sponsors
+from goal_tools.who_helped import columnar
+from goal_tools.who_helped import summarize
+
+ARGS = [
+    ['--ignore-single-vendor'],
+    ['--ignore-single-vendor', '--only-sponsors'],
+    ['--role', 'owner', '--role', 'reviewer', '--ignore-team', 'Team 3',
+     '--only-tag', 'team:diverse-affiliation'],
+]
+
+
+def team_data():
+    "Governance data for the projects in the synthetic file."
+    teams = {}
+    for i in range(900):
+        team = teams.setdefault('Team {}'.format(i % 60), {
+            'deliverables': {},
+            'tags': (['team:single-vendor'] if i % 7 == 0
+                     else ['team:diverse-affiliation']),
+        })
+        team['deliverables']['project-{}'.format(i)] = {
+            'repos': ['openstack/project-{}'.format(i)],
+        }
+    return governance.Governance._organize_team_data(
+        teams,
+        {'Technical Committee': []},
+        {},
+    )
+
+
+def row_filters(parsed_args, data, team_data):
+    "The original stacked generators, one per option."
+    roles = parsed_args.role
+    if roles:
+        data = (d for d in data if d['Role'] in roles)
+    ignore_teams = set(t.lower() for t in parsed_args.ignore_team)
+    if ignore_teams:
+        data = (d for d in data if d['Team'].lower() not in ignore_teams)
+    only_teams = set(t.lower() for t in parsed_args.only_team)
+    if only_teams:
+        data = (d for d in data if d['Team'].lower() in only_teams)
+    if parsed_args.only_sponsors:
+        sponsor_map = sponsors.Sponsors(parsed_args.sponsor_level)
+        data = (d for d in data if d['Organization'] in sponsor_map)
+    ignore_tags = set(parsed_args.ignore_tag)
+    if ignore_tags:
+        data = (
+            d for d in data
+            if not team_data.get_repo_tags(d['Project']).intersection(
+                ignore_tags)
+        )
+    only_tags = set(parsed_args.only_tag)
+    if only_tags:
+        data = (
+            d for d in data
+            if only_tags.issubset(team_data.get_repo_tags(d['Project']))
+        )
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'contributions.dat')
+        print('writing {} rows'.format(args.rows))
+        benchmark_summarize.write_data(filename, args.rows)
+        rows = benchmark_summarize.read_data(filename)
+        table = columnar.load_file(filename, use_cache=False)
+
+    gov = governance.Governance(team_data=team_data())
+    cmd = summarize.SummarizeContributions(mock.Mock(), None)
+    cmd._governance = gov
+    cmd_parser = cmd.get_parser('summarize')
+
+    for filter_args in ARGS:
+        parsed_args = cmd_parser.parse_args(filter_args + [filename])
+
+        start = time.perf_counter()
+        expected = len([
+            r['Organization']
+            for r in row_filters(parsed_args, rows, gov)
+        ])
+        row_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        filtered = table.filter(cmd._compile_filters(parsed_args))
+        # Include copying the column a default summary reads.
+        filtered.column('Organization').codes
+        table_time = time.perf_counter() - start
+
+        if expected != len(filtered):
+            raise RuntimeError('results differ for {}'.format(filter_args))
+
+        print('{}: {} rows kept, per row {:.0f}ns stacked, '
+              '{:.0f}ns compiled, {:.1f}x'.format(
+                  ' '.join(filter_args), expected,
+                  row_time / len(rows) * 1e9,
+                  table_time / len(rows) * 1e9,
+                  row_time / table_time))
+
+
+if __name__ == '__main__':
+    main()
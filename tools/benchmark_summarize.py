@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare the row-based and columnar contribution summaries.
+
+Builds a synthetic contribution file and runs the summaries from
+tools/run_contributor_report.sh over it with both implementations.
+"""
+
+import argparse
+import collections
+import csv
+import os
+import random
+import tempfile
+import time
+
+from goal_tools.who_helped import columnar
+from goal_tools.who_helped import contributions
+
+SUMMARIES = [
+    (['Organization'], []),
+    (['Organization'], ['Name']),
+    (['Organization', 'Team'], []),
+    (['Team'], ['Name', 'Organization']),
+]
+
+
+def row_count_distinct(by_names, to_count, data_source):
+    "The original row-at-a-time implementation."
+    counts = collections.defaultdict(set)
+    for row in data_source:
+        by_key = tuple(row[by] for by in by_names)
+        count_key = tuple(row[c] for c in (to_count or row.keys()))
+        counts[by_key].add(count_key)
+    return {k: len(v) for k, v in counts.items()}
+
+
+def write_data(filename, n_rows, seed=42):
+    r = random.Random(seed)
+    people = ['Person {}'.format(i) for i in range(20000)]
+    orgs = ['Org {}'.format(i) for i in range(800)]
+    teams = ['Team {}'.format(i) for i in range(60)]
+    projects = ['openstack/project-{}'.format(i) for i in range(900)]
+    roles = ['owner', 'reviewer', 'approver', 'uploader', 'plus_one']
+    with open(filename, 'w', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(contributions._COLUMNS)
+        for i in range(n_rows):
+            review = str(500000 + i // 8)
+            person = r.choice(people)
+            writer.writerow((
+                review,
+                'https://review.openstack.org/{}/'.format(review),
+                'master',
+                r.choice(projects),
+                r.choice(teams),
+                'yes',
+                r.choice(roles),
+                person,
+                person.lower().replace(' ', '.') + '@example.com',
+                '2018-{:02d}-{:02d} 12:00:00'.format(
+                    r.randint(1, 12), r.randint(1, 28)),
+                r.choice(orgs),
+            ))
+
+
+def read_data(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        filename = os.path.join(tmpdir, 'contributions.dat')
+        print('writing {} rows'.format(args.rows))
+        write_data(filename, args.rows)
+
+        start = time.perf_counter()
+        rows = read_data(filename)
+        parse_time = time.perf_counter() - start
+        print('parsing CSV: {:.2f}s'.format(parse_time))
+
+        start = time.perf_counter()
+        columnar.load_file(filename)
+        print('parsing CSV and saving column cache: {:.2f}s'.format(
+            time.perf_counter() - start))
+        start = time.perf_counter()
+        cached = columnar.load_file(filename)
+        print('loading column cache: {:.2f}s'.format(
+            time.perf_counter() - start))
+        for by_names, to_count in SUMMARIES:
+            start = time.perf_counter()
+            cached.count_distinct(by_names, to_count)
+            print('--by {} --count {} from column cache: {:.2f}s'.format(
+                by_names, to_count, time.perf_counter() - start))
+
+    for by_names, to_count in SUMMARIES:
+        start = time.perf_counter()
+        expected = row_count_distinct(by_names, to_count, rows)
+        row_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        names = list(dict.fromkeys(by_names + to_count))
+        table = columnar.Table.from_dicts(rows, names, row_ids=not to_count)
+        encode_time = time.perf_counter() - start
+        start = time.perf_counter()
+        actual = table.count_distinct(by_names, to_count)
+        count_time = time.perf_counter() - start
+
+        if expected != actual:
+            raise RuntimeError('results differ for --by {} --count {}'.format(
+                by_names, to_count))
+
+        print('--by {} --count {}: rows {:.2f}s, columnar {:.2f}s '
+              '(encode {:.2f}s + count {:.2f}s), {:.1f}x'.format(
+                  by_names, to_count, row_time,
+                  encode_time + count_time, encode_time, count_time,
+                  row_time / (encode_time + count_time)))
+
+
+if __name__ == '__main__':
+    main()
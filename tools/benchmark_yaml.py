@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Compare the YAML parsers on zuul settings the size of project-config.
+
+Builds synthetic zuul.d/projects.yaml and jobs.yaml files and times
+the pure-Python PyYAML loader, the ruamel.yaml round-trip loader used
+for settings that are written back out, and goal_tools.yamlutils.
+"""
+
+import argparse
+import random
+import time
+
+import yaml
+
+from goal_tools import yamlutils
+from goal_tools.python3_first import projectconfig_ruamellib
+
+PIPELINES = ['check', 'gate', 'post', 'periodic', 'experimental']
+
+
+def make_projects(n_projects, seed=42):
+    r = random.Random(seed)
+    settings = []
+    for i in range(n_projects):
+        project = {
+            'name': 'openstack/project-{}'.format(i),
+            'templates': [
+                'template-{}'.format(r.randint(0, 300))
+                for _ in range(r.randint(1, 6))
+            ],
+        }
+        for pipeline in r.sample(PIPELINES, r.randint(1, 4)):
+            project[pipeline] = {
+                'jobs': [
+                    'job-{}'.format(r.randint(0, 3000))
+                    if r.random() < 0.7 else
+                    {'job-{}'.format(r.randint(0, 3000)): {
+                        'branches': ['^stable/.*', 'master'],
+                        'voting': False,
+                    }}
+                    for _ in range(r.randint(1, 8))
+                ],
+            }
+        settings.append({'project': project})
+    return yamlutils.dump(settings, default_flow_style=False)
+
+
+def make_jobs(n_jobs, seed=42):
+    r = random.Random(seed)
+    settings = []
+    for i in range(n_jobs):
+        settings.append({'job': {
+            'name': 'job-{}'.format(i),
+            'parent': 'job-{}'.format(r.randint(0, max(i - 1, 0))),
+            'description': 'Run the tests for job {}.\n'.format(i) * 3,
+            'branches': '^(?!stable/(newton|ocata)).*$',
+            'vars': {
+                'tox_envlist': 'py{}'.format(r.choice([27, 35, 36])),
+                'zuul_work_dir': 'src/{}'.format(i),
+            },
+            'required-projects': [
+                'openstack/project-{}'.format(r.randint(0, 2000))
+                for _ in range(r.randint(0, 4))
+            ],
+        }})
+    return yamlutils.dump(settings, default_flow_style=False)
+
+
+def timed(label, func, text):
+    start = time.perf_counter()
+    result = func(text)
+    elapsed = time.perf_counter() - start
+    print('  {:<24} {:.2f}s'.format(label, elapsed))
+    return result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--jobs', type=int, default=3000)
+    args = parser.parse_args()
+
+    ruamel = projectconfig_ruamellib.YAML()
+    for name, text in [('projects.yaml', make_projects(args.projects)),
+                       ('jobs.yaml', make_jobs(args.jobs))]:
+        print('{}: {:.1f} MB'.format(name, len(text) / 1024 / 1024))
+        expected, slow = timed(
+            'yaml.safe_load', yaml.safe_load, text)
+        timed('ruamel round-trip', ruamel.load, text)
+        actual, fast = timed(
+            'yamlutils.load (libyaml)' if yamlutils.HAVE_LIBYAML
+            else 'yamlutils.load', yamlutils.load, text)
+        if expected != actual:
+            raise RuntimeError('results differ for {}'.format(name))
+        print('  {:.1f}x faster than yaml.safe_load'.format(slow / fast))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,7 @@ do
     db_file=${input%.qry}.db
 
     who-helped -v --debug database create \
-               --force \
+               --update \
                "$(cat $input)" \
                "$db_file"
 done
@@ -5,15 +5,6 @@ if [ ! -f .tox/venv/bin/activate ]; then
 fi
 source .tox/venv/bin/activate
 
-for input in $*
-do
-    txt_file=${input%.qry}.txt
-    dat_file=${input%.qry}.dat
-
-    # Query gerrit
-    who-helped -v --debug changes query "$(cat $input)" $txt_file
-
-    # Build the raw contribution data file
-    who-helped --debug contributions list -f csv $txt_file \
-        | tee $dat_file
-done
+# Query gerrit and build the review list, raw contribution data file
+# and database for every query in one process.
+who-helped -v --debug batch run "$@"